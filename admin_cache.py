@@ -0,0 +1,174 @@
+"""
+Кэш данных административной панели в процессе приложения.
+
+Streamlit перезапускает скрипт страницы при каждом действии с виджетом, поэтому без кэша
+все запросы обеих вкладок выполняются заново. Сводки и агрегаты хранятся ttl_seconds.
+Первые (самые новые) страницы таблиц дополняются инкрементально: не чаще раза в refresh_seconds
+догружаются только строки с id больше сохраненного, а раз в ttl_seconds страница загружается
+заново, чтобы учесть изменения и удаление уже показанных строк.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+import pandas as pd
+
+from pagination import PAGE_NEXT, keyset_page_frame
+
+
+class AdminDataCache:
+    """
+    Кэш сводок и первых страниц таблиц административной панели с ключом по значениям фильтров
+    """
+
+    def __init__(self, ttl_seconds: float = 60, refresh_seconds: float = 5, settle_seconds: float = 5,
+                 max_entries: int = 256):
+        """
+        Args:
+            ttl_seconds: Время жизни значения и полной загрузки страницы (0 - кэш отключен)
+            refresh_seconds: Интервал догрузки новых строк страницы
+            settle_seconds: Строки не старше newest - settle_seconds догружаются повторно
+                            (транзакции, получившие меньший id, могли зафиксироваться позже)
+            max_entries: Максимальное количество ключей в кэше
+        """
+        self.ttl_seconds = ttl_seconds
+        self.refresh_seconds = refresh_seconds
+        self.settle_seconds = settle_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._full_loads = 0
+        self._incremental_loads = 0
+        self._incremental_rows = 0
+
+    def _get_entry(self, key):
+        """Запись кэша по ключу (None, если ее нет или она устарела)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry['loaded_at'] >= self.ttl_seconds:
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def _put_entry(self, key, entry: dict):
+        """Сохранение записи кэша с вытеснением самых давно использованных"""
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_load(self, key, loader):
+        """
+        Значение из кэша или результат loader() (сохраняется на ttl_seconds)
+
+        Args:
+            key: Ключ (имя данных и значения фильтров)
+            loader: Функция загрузки значения
+
+        Returns:
+            Значение
+        """
+        entry = self._get_entry(key)
+        if entry is not None:
+            with self._lock:
+                self._hits += 1
+            return entry['value']
+
+        value = loader()
+        with self._lock:
+            self._full_loads += 1
+        self._put_entry(key, {'value': value, 'loaded_at': time.monotonic()})
+        return value
+
+    def get_page(self, key, load, load_newer, limit: int, sort_key: str, since=None) -> dict:
+        """
+        Первая (самая новая) страница таблицы с инкрементальной догрузкой новых строк
+
+        В кэше хранится результат запроса страницы как есть (до limit + 1 строк): лишняя строка
+        означает, что есть следующая страница, и сохраняется этот признак после слияния.
+
+        Args:
+            key: Ключ (имя таблицы и значения фильтров)
+            load: Функция загрузки первой страницы: () -> DataFrame до limit + 1 строк,
+                  от новых к старым
+            load_newer: Функция догрузки: (max_id, settle_since) -> DataFrame строк с id больше max_id
+                        или значением сортировки не меньше settle_since, в том же порядке
+            limit: Записей на странице
+            sort_key: Столбец сортировки
+            since: Начало периода (строки старше отбрасываются при каждом обращении, опционально)
+
+        Returns:
+            dict: frame, next_cursor и prev_cursor (как keyset_page_frame)
+        """
+        now = time.monotonic()
+        entry = self._get_entry(key)
+
+        if entry is None:
+            frame = load()
+            loaded_at = now
+            refreshed_at = now
+            with self._lock:
+                self._full_loads += 1
+        elif now - entry['refreshed_at'] >= self.refresh_seconds:
+            frame = entry['frame']
+            max_id = int(frame['id'].max()) if not frame.empty else 0
+            settle_since = None
+            if not frame.empty:
+                settle_since = frame[sort_key].max().to_pydatetime() - timedelta(seconds=self.settle_seconds)
+            newer = load_newer(max_id, settle_since)
+            frame = self._merge(newer, frame, limit, sort_key)
+            loaded_at = entry['loaded_at']
+            refreshed_at = now
+            with self._lock:
+                self._incremental_loads += 1
+                self._incremental_rows += len(newer)
+        else:
+            frame = entry['frame']
+            loaded_at = entry['loaded_at']
+            refreshed_at = entry['refreshed_at']
+            with self._lock:
+                self._hits += 1
+
+        if since is not None and not frame.empty:
+            frame = frame[frame[sort_key] >= since]
+
+        self._put_entry(key, {'frame': frame, 'loaded_at': loaded_at, 'refreshed_at': refreshed_at})
+        return keyset_page_frame(frame, PAGE_NEXT, None, limit, sort_key)
+
+    @staticmethod
+    def _merge(newer: pd.DataFrame, frame: pd.DataFrame, limit: int, sort_key: str) -> pd.DataFrame:
+        """Слияние догруженных строк с сохраненными (догруженная версия строки важнее)"""
+        if newer.empty:
+            return frame
+        if frame.empty:
+            return newer.head(limit + 1).reset_index(drop=True)
+        merged = pd.concat([newer, frame], ignore_index=True).drop_duplicates('id', keep='first')
+        merged = merged.sort_values([sort_key, 'id'], ascending=False, kind='stable')
+        return merged.head(limit + 1).reset_index(drop=True)
+
+    def clear(self):
+        """Удаление всех значений (после очистки таблиц)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Получение статистики кэша
+
+        Returns:
+            dict: Размер кэша, попадания, полные и инкрементальные загрузки, догруженные строки
+        """
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'hits': self._hits,
+                'full_loads': self._full_loads,
+                'incremental_loads': self._incremental_loads,
+                'incremental_rows': self._incremental_rows,
+            }
@@ -0,0 +1,267 @@
+"""
+Подготовка таблиц административной панели из страниц в виде pandas.DataFrame.
+
+Статус, усечение длинных строк, подстановка значений по умолчанию и сводки по пользователям и IP
+для больших выборок выполняются над столбцами целиком. У операций pandas большие постоянные
+накладные расходы, поэтому страницы панели (не больше LOOP_MAX_ROWS строк) обрабатываются циклом
+по значениям столбцов - результат тот же. Даты остаются столбцами datetime64, формат их вывода
+задается в column_config таблицы.
+"""
+
+import numpy as np
+import pandas as pd
+
+NOT_SPECIFIED = 'Не указан'
+USER_AGENT_DISPLAY_LENGTH = 50
+SESSION_ID_DISPLAY_LENGTH = 20
+DATETIME_DISPLAY_FORMAT = 'YYYY-MM-DD HH:mm:ss'
+
+SESSION_STATUS_LABELS = {True: '🟢 Активна', False: '🔴 Неактивна'}
+
+# Выборка первых значений второго столбца в анализе по пользователям и IP
+SAMPLE_SIZE = 5
+
+# До этого числа строк цикл по значениям быстрее операций над столбцами (python bench_admin_frames.py)
+LOOP_MAX_ROWS = 2000
+
+
+def _is_missing(value) -> bool:
+    """NULL, NaN или NaT"""
+    return value is None or value is pd.NaT or value != value
+
+
+def truncate_text(values: pd.Series, max_length: int, placeholder: str = None) -> pd.Series:
+    """
+    Усечение строк столбца до max_length символов с добавлением '...'
+
+    Args:
+        values: Столбец строк
+        max_length: Максимальная длина без усечения
+        placeholder: Значение для пустых строк и NULL (None - оставить как есть)
+
+    Returns:
+        pd.Series: Столбец строк
+    """
+    if len(values) <= LOOP_MAX_ROWS:
+        return pd.Series(
+            [_truncate_value(value, max_length, placeholder) for value in values.tolist()],
+            index=values.index, dtype=object
+        )
+    truncated = values.astype(object)
+    too_long = truncated.str.len().gt(max_length)
+    if too_long.any():
+        truncated = truncated.copy()
+        truncated[too_long] = truncated[too_long].str.slice(0, max_length) + '...'
+    if placeholder is not None:
+        truncated = fill_missing(truncated, placeholder)
+    return truncated
+
+
+def fill_missing(values: pd.Series, placeholder: str) -> pd.Series:
+    """
+    Подстановка значения вместо пустых строк и NULL
+
+    Args:
+        values: Столбец строк
+        placeholder: Подставляемое значение
+
+    Returns:
+        pd.Series: Столбец строк
+    """
+    if len(values) <= LOOP_MAX_ROWS:
+        return pd.Series(
+            [placeholder if _is_missing(value) or value == '' else value for value in values.tolist()],
+            index=values.index, dtype=object
+        )
+    text = values.astype(object)
+    return text.mask(text.isna() | (text == ''), placeholder)
+
+
+def _truncate_value(value, max_length: int, placeholder: str = None):
+    """Усечение одного значения, как в truncate_text"""
+    if isinstance(value, str):
+        if value == '' and placeholder is not None:
+            return placeholder
+        return value[:max_length] + '...' if len(value) > max_length else value
+    if placeholder is not None and _is_missing(value):
+        return placeholder
+    return value
+
+
+def _session_status(is_active: pd.Series) -> pd.Series:
+    """Подпись статуса сессии (NULL считается неактивной сессией)"""
+    if len(is_active) <= LOOP_MAX_ROWS:
+        return pd.Series(
+            [SESSION_STATUS_LABELS[value is True] for value in is_active.tolist()], index=is_active.index
+        )
+    return is_active.eq(True).map(SESSION_STATUS_LABELS)
+
+
+def format_sessions_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Таблица сессий для отображения
+
+    Args:
+        frame: Страница сессий (столбцы UserSession)
+
+    Returns:
+        pd.DataFrame: Столбцы с подписями для st.dataframe
+    """
+    return pd.DataFrame({
+        'ID': frame['id'],
+        'Пользователь': frame['username'],
+        'Статус': _session_status(frame['is_active']),
+        'IP адрес': fill_missing(frame['ip_address'], NOT_SPECIFIED),
+        'User Agent': truncate_text(frame['user_agent'], USER_AGENT_DISPLAY_LENGTH, NOT_SPECIFIED),
+        'Создана': frame['created_at'],
+        'Последняя активность': frame['last_activity'],
+        'Session ID': truncate_text(frame['session_id'], SESSION_ID_DISPLAY_LENGTH),
+    })
+
+
+def format_attempts_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Таблица попыток неавторизованного входа для отображения
+
+    Args:
+        frame: Страница попыток (столбцы UnauthorizedLoginAttempt)
+
+    Returns:
+        pd.DataFrame: Столбцы с подписями для st.dataframe
+    """
+    return pd.DataFrame({
+        'ID': frame['id'],
+        'Пользователь': frame['username'],
+        'IP адрес': fill_missing(frame['ip_address'], NOT_SPECIFIED),
+        'User Agent': truncate_text(frame['user_agent'], USER_AGENT_DISPLAY_LENGTH, NOT_SPECIFIED),
+        'Время попытки': frame['attempted_at'],
+        'Причина': frame['reason'],
+    })
+
+
+def _first_values(frame: pd.DataFrame, key: str, column: str, keys: pd.Index) -> pd.Series:
+    """
+    Первые SAMPLE_SIZE различных непустых значений column для значений key из keys
+
+    Returns:
+        pd.Series: Списки значений по keys (пустой список, если значений нет)
+    """
+    values = frame.loc[frame[key].isin(keys), [key, column]].dropna().drop_duplicates()
+    samples = values.groupby(key).head(SAMPLE_SIZE).groupby(key)[column].agg(list)
+    return samples.reindex(keys).apply(lambda value: value if isinstance(value, list) else [])
+
+
+def _datetime_values(values: pd.Series) -> list:
+    """Значения столбца datetime64 объектами datetime (NaT - None): их сравнение быстрее, чем pd.Timestamp"""
+    return values.to_numpy(dtype='datetime64[us]').tolist()
+
+
+def _summarize_rows(frame: pd.DataFrame, key: str, counterpart: str, unique_column: str, sample_column: str,
+                    limit: int, first_session: bool = False) -> pd.DataFrame:
+    """
+    Сводка страницы сессий по значениям key циклом по строкам (путь для страниц панели)
+
+    Строки с пустым key не учитываются. Порядок строк и типы столбцов совпадают с путем через groupby:
+    по убыванию числа сессий, при равенстве - по значению key.
+
+    Args:
+        frame: Страница сессий
+        key: Столбец группировки
+        counterpart: Столбец, различные непустые значения которого считаются и выбираются
+        unique_column: Имя столбца с количеством различных значений counterpart
+        sample_column: Имя столбца с первыми SAMPLE_SIZE значениями counterpart
+        limit: Количество значений key с наибольшим числом сессий
+        first_session: Добавить столбец first_session (самая ранняя created_at)
+
+    Returns:
+        pd.DataFrame: key, total_sessions, active_sessions, unique_column, [first_session,]
+                      last_activity, sample_column
+    """
+    summary = {}
+    for key_value, counterpart_value, is_active, created_at, last_activity in zip(
+        frame[key].tolist(), frame[counterpart].tolist(), frame['is_active'].tolist(),
+        _datetime_values(frame['created_at']), _datetime_values(frame['last_activity'])
+    ):
+        if _is_missing(key_value):
+            continue
+        stats = summary.get(key_value)
+        if stats is None:
+            # [всего, активных, различные counterpart, выборка, первая сессия, последняя активность]
+            stats = summary[key_value] = [0, 0, set(), [], None, None]
+        stats[0] += 1
+        if is_active is True:
+            stats[1] += 1
+        if not _is_missing(counterpart_value) and counterpart_value not in stats[2]:
+            stats[2].add(counterpart_value)
+            if len(stats[3]) < SAMPLE_SIZE:
+                stats[3].append(counterpart_value)
+        if created_at is not None and (stats[4] is None or created_at < stats[4]):
+            stats[4] = created_at
+        if last_activity is not None and (stats[5] is None or last_activity > stats[5]):
+            stats[5] = last_activity
+
+    ordered = sorted(summary.items(), key=lambda item: item[0])
+    top = sorted(ordered, key=lambda item: item[1][0], reverse=True)[:limit]
+    columns = {
+        key: pd.array([key_value for key_value, _ in top], dtype=frame[key].dtype),
+        'total_sessions': np.array([stats[0] for _, stats in top], dtype=np.int64),
+        'active_sessions': np.array([stats[1] for _, stats in top], dtype=np.int64),
+        unique_column: np.array([len(stats[2]) for _, stats in top], dtype=np.int64),
+    }
+    if first_session:
+        columns['first_session'] = pd.array([stats[4] for _, stats in top], dtype=frame['created_at'].dtype)
+    columns['last_activity'] = pd.array([stats[5] for _, stats in top], dtype=frame['last_activity'].dtype)
+    columns[sample_column] = [stats[3] for _, stats in top]
+    return pd.DataFrame(columns)
+
+
+def summarize_sessions_by_user(frame: pd.DataFrame, limit: int = 10) -> pd.DataFrame:
+    """
+    Сводка страницы сессий по пользователям
+
+    Args:
+        frame: Страница сессий
+        limit: Количество пользователей с наибольшим числом сессий
+
+    Returns:
+        pd.DataFrame: username, total_sessions, active_sessions, unique_ips, first_session,
+                      last_activity, ip_addresses (список)
+    """
+    if len(frame) <= LOOP_MAX_ROWS:
+        return _summarize_rows(frame, 'username', 'ip_address', 'unique_ips', 'ip_addresses', limit, first_session=True)
+    grouped = frame.assign(active=frame['is_active'].eq(True)).groupby('username').agg(
+        total_sessions=('id', 'size'),
+        active_sessions=('active', 'sum'),
+        unique_ips=('ip_address', 'nunique'),
+        first_session=('created_at', 'min'),
+        last_activity=('last_activity', 'max'),
+    )
+    top = grouped.sort_values('total_sessions', ascending=False, kind='stable').head(limit)
+    top['ip_addresses'] = _first_values(frame, 'username', 'ip_address', top.index)
+    return top.reset_index()
+
+
+def summarize_sessions_by_ip(frame: pd.DataFrame, limit: int = 10) -> pd.DataFrame:
+    """
+    Сводка страницы сессий по IP адресам (сессии без IP не учитываются)
+
+    Args:
+        frame: Страница сессий
+        limit: Количество IP с наибольшим числом сессий
+
+    Returns:
+        pd.DataFrame: ip_address, total_sessions, active_sessions, unique_users,
+                      last_activity, usernames (список)
+    """
+    if len(frame) <= LOOP_MAX_ROWS:
+        return _summarize_rows(frame, 'ip_address', 'username', 'unique_users', 'usernames', limit)
+    with_ip = frame[frame['ip_address'].notna()]
+    grouped = with_ip.assign(active=with_ip['is_active'].eq(True)).groupby('ip_address').agg(
+        total_sessions=('id', 'size'),
+        active_sessions=('active', 'sum'),
+        unique_users=('username', 'nunique'),
+        last_activity=('last_activity', 'max'),
+    )
+    top = grouped.sort_values('total_sessions', ascending=False, kind='stable').head(limit)
+    top['usernames'] = _first_values(with_ip, 'ip_address', 'username', top.index)
+    return top.reset_index()
@@ -8,17 +8,241 @@ import pandas as pd
 from datetime import datetime, timedelta
 import sys
 import os
+import tempfile
+import time
 
 # Добавляем путь к модулям проекта
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from models import (
-    get_unauthorized_login_attempts, 
+    get_unauthorized_login_attempts_frame,
+    get_unauthorized_attempts_summary,
+    get_unauthorized_attempts_by_username,
+    get_unauthorized_attempts_by_ip,
+    get_unauthorized_attempts_by_subnet,
+    get_user_sessions_by_subnet,
     cleanup_old_unauthorized_attempts,
-    get_user_sessions,
+    get_user_sessions_frame,
+    get_recent_user_sessions_frame,
+    get_recent_unauthorized_login_attempts_frame,
+    get_admin_data_cache,
     get_user_sessions_stats,
-    cleanup_old_user_sessions
+    cleanup_old_user_sessions,
+    get_pool_telemetry_by_workload,
+    WORKLOAD_AUTH,
+    WORKLOAD_REPORTING,
+    WORKLOAD_MAINTENANCE,
+    get_unauthorized_attempts_trend,
+    get_user_sessions_trend,
+    truncate_to_granularity,
+    export_unauthorized_login_attempts,
+    export_user_sessions,
+    is_archive_enabled,
+    parse_ip_network
 )
+from exports import EXPORT_FORMATS, EXPORT_MIME_TYPES
+from admin_frames import (
+    DATETIME_DISPLAY_FORMAT,
+    format_attempts_frame,
+    format_sessions_frame,
+    summarize_sessions_by_user,
+    summarize_sessions_by_ip
+)
+
+# Периоды анализа попыток неавторизованного входа (None - за все время)
+UNAUTHORIZED_PERIODS = {
+    "Последний час": timedelta(hours=1),
+    "Последние 24 часа": timedelta(hours=24),
+    "Последние 7 дней": timedelta(days=7),
+    "Последние 30 дней": timedelta(days=30),
+    "Все время": None,
+}
+
+# Интервал графика динамики попыток для каждого периода
+UNAUTHORIZED_TREND_GRANULARITIES = {
+    "Последний час": "minute",
+    "Последние 24 часа": "hour",
+    "Последние 7 дней": "hour",
+    "Последние 30 дней": "day",
+    "Все время": "day",
+}
+
+# Период графика динамики входов на вкладке сессий
+SESSIONS_TREND_PERIOD = timedelta(days=7)
+
+# Варианты длины префикса подсети на вкладке подсетей
+SUBNET_IPV4_PREFIXES = [8, 16, 20, 22, 24, 26, 28, 32]
+SUBNET_IPV6_PREFIXES = [32, 40, 48, 56, 64, 80, 96, 128]
+
+# Варианты интервала автообновления (секунды)
+AUTO_REFRESH_INTERVALS = [5, 10, 30, 60]
+
+def cached(key: tuple, loader):
+    """Сводка или агрегаты из кэша административной панели (ключ - имя данных и значения фильтров)"""
+    return get_admin_data_cache().get_or_load(key, loader)
+
+def show_search_inputs(key_prefix: str, label_suffix: str = ""):
+    """
+    Поля поиска по подстроке User Agent и по IP адресу или сети
+    
+    Args:
+        key_prefix: Префикс ключей виджетов вкладки
+        label_suffix: Уточнение подписи поля (для различения вкладок)
+        
+    Returns:
+        tuple: Подстрока User Agent и IP адрес или сеть (пустые строки, если поиск не задан)
+    """
+    user_agent_filter = st.text_input(
+        f"User Agent содержит{label_suffix}",
+        placeholder="Например: curl или Chrome/120",
+        key=f"{key_prefix}_user_agent_filter"
+    )
+    ip_filter = st.text_input(
+        f"IP адрес или сеть{label_suffix}",
+        placeholder="Например: 10.0.0.0/8 или 192.168.1.15",
+        key=f"{key_prefix}_ip_filter"
+    )
+    return user_agent_filter, ip_filter
+
+def show_archive_checkbox(key_prefix: str, label_suffix: str = "") -> bool:
+    """
+    Флажок просмотра и выгрузки вместе с холодным архивом (только при включенном архиве)
+    
+    Args:
+        key_prefix: Префикс ключей виджетов вкладки
+        label_suffix: Уточнение подписи поля (для различения вкладок)
+        
+    Returns:
+        bool: Страницы и выгрузки читаются из базы и архива
+    """
+    if not is_archive_enabled():
+        return False
+    return st.checkbox(
+        f"Включая архив{label_suffix}",
+        value=False,
+        help="Страницы таблицы и выгрузка объединяют базу и архив Parquet; сводки считаются только по базе",
+        key=f"{key_prefix}_include_archive"
+    )
+
+def search_filters(username_filter: str, user_agent_filter: str, ip_filter: str) -> dict:
+    """
+    Параметры запросов по полям поиска. Имя со * ищется как шаблон, иначе - точное совпадение.
+    
+    Args:
+        username_filter: Имя пользователя или шаблон (например, admin* или *test*)
+        user_agent_filter: Подстрока User Agent
+        ip_filter: IP адрес или сеть CIDR
+        
+    Returns:
+        dict: username, username_pattern, user_agent_contains и ip_network (None для незаданных)
+        
+    Raises:
+        ValueError: Некорректный IP адрес или сеть
+    """
+    username_filter = username_filter.strip()
+    is_pattern = '*' in username_filter
+    return {
+        'username': username_filter if username_filter and not is_pattern else None,
+        'username_pattern': username_filter if is_pattern else None,
+        'user_agent_contains': user_agent_filter.strip() or None,
+        'ip_network': parse_ip_network(ip_filter) if ip_filter.strip() else None,
+    }
+
+def format_datetime(value) -> str:
+    """Дата и время для подписи (пустая строка для NULL)"""
+    return value.strftime('%Y-%m-%d %H:%M:%S') if pd.notna(value) else ''
+
+def show_trend_chart(points: list, columns: dict):
+    """
+    Отображение графика динамики по агрегатам
+    
+    Args:
+        points: Точки графика (словари с bucket_start)
+        columns: Ключ значения в точке -> подпись на графике
+    """
+    if not points:
+        st.caption("Агрегаты за период еще не рассчитаны")
+        return
+    
+    trend_df = pd.DataFrame(points).set_index('bucket_start')[list(columns)].rename(columns=columns)
+    st.line_chart(trend_df)
+    st.caption("Агрегаты обновляются фоновой задачей раз в минуту, последние минуты могут отсутствовать")
+
+def get_page_cursor(state_key: str, filters: tuple):
+    """
+    Курсор текущей страницы вкладки. При изменении фильтров листание начинается с первой страницы.
+    
+    Args:
+        state_key: Префикс ключей состояния вкладки
+        filters: Значения фильтров вкладки
+        
+    Returns:
+        str: Курсор страницы или None для первой страницы
+    """
+    if st.session_state.get(f"{state_key}_filters") != filters:
+        st.session_state[f"{state_key}_filters"] = filters
+        st.session_state[f"{state_key}_cursor"] = None
+    return st.session_state.get(f"{state_key}_cursor")
+
+def show_page_navigation(state_key: str, page: dict):
+    """Кнопки перехода к более новым и более старым записям"""
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        if st.button("⏮️ Самые новые", key=f"{state_key}_first", disabled=not page['prev_cursor']):
+            st.session_state[f"{state_key}_cursor"] = None
+            st.rerun()
+    
+    with col2:
+        if st.button("⬅️ Новее", key=f"{state_key}_prev", disabled=not page['prev_cursor']):
+            st.session_state[f"{state_key}_cursor"] = page['prev_cursor']
+            st.rerun()
+    
+    with col3:
+        if st.button("Старее ➡️", key=f"{state_key}_next", disabled=not page['next_cursor']):
+            st.session_state[f"{state_key}_cursor"] = page['next_cursor']
+            st.rerun()
+
+def show_export_controls(state_key: str, export_function, file_name: str, **filters):
+    """
+    Выгрузка всех записей по текущим фильтрам и кнопка скачивания файла
+    
+    Записи выгружаются потоково во временный файл на диске; для выгрузок в миллионы строк
+    предназначен CLI exports.py.
+    
+    Args:
+        state_key: Префикс ключей состояния вкладки
+        export_function: export_unauthorized_login_attempts или export_user_sessions
+        file_name: Имя скачиваемого файла без расширения
+        **filters: Фильтры выгрузки
+    """
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        export_format = st.selectbox("Формат выгрузки", options=EXPORT_FORMATS, key=f"{state_key}_format")
+    
+    with col2:
+        if st.button("📦 Подготовить выгрузку", key=f"{state_key}_prepare"):
+            descriptor, path = tempfile.mkstemp(suffix=f".{export_format}")
+            os.close(descriptor)
+            with st.spinner("Выгрузка записей..."):
+                rows = export_function(path, export_format=export_format, **filters)
+            
+            previous = st.session_state.get(f"{state_key}_file")
+            if previous and os.path.exists(previous['path']):
+                os.remove(previous['path'])
+            st.session_state[f"{state_key}_file"] = {'path': path, 'format': export_format, 'rows': rows}
+    
+    prepared = st.session_state.get(f"{state_key}_file")
+    if prepared and os.path.exists(prepared['path']):
+        with open(prepared['path'], 'rb') as export_file:
+            st.download_button(
+                f"⬇️ Скачать {prepared['format'].upper()} ({prepared['rows']} записей)",
+                data=export_file,
+                file_name=f"{file_name}.{prepared['format']}",
+                mime=EXPORT_MIME_TYPES[prepared['format']],
+                key=f"{state_key}_download"
+            )
 
 def show_user_sessions_tab():
     """Отображение вкладки с информацией о сессиях пользователей"""
@@ -31,13 +255,14 @@ def show_user_sessions_tab():
         # Фильтр по имени пользователя
         sessions_username_filter = st.text_input(
             "Имя пользователя (сессии)",
-            placeholder="Введите имя пользователя для фильтрации",
+            placeholder="Имя или шаблон со *, например admin*",
             key="sessions_username_filter"
         )
+        sessions_user_agent_filter, sessions_ip_filter = show_search_inputs("sessions", " (сессии)")
         
-        # Фильтр по количеству записей
+        # Количество записей на странице
         sessions_limit = st.slider(
-            "Количество записей (сессии)",
+            "Записей на странице (сессии)",
             min_value=10,
             max_value=1000,
             value=100,
@@ -51,6 +276,7 @@ def show_user_sessions_tab():
             value=False,
             key="show_active_only"
         )
+        sessions_include_archive = show_archive_checkbox("sessions", " (сессии)")
         
         # Кнопка очистки старых сессий
         st.header("🧹 Очистка сессий")
@@ -65,25 +291,38 @@ def show_user_sessions_tab():
         if st.button("🗑️ Очистить старые сессии", type="secondary", key="cleanup_sessions"):
             with st.spinner("Очистка старых сессий..."):
                 deleted_count = cleanup_old_user_sessions(sessions_days_to_keep)
+                get_admin_data_cache().clear()
                 st.success(f"Удалено {deleted_count} старых сессий")
                 st.rerun()
     
     # Основной контент для сессий
     try:
         # Получение данных о сессиях
+        search = search_filters(sessions_username_filter, sessions_user_agent_filter, sessions_ip_filter)
+        cursor = get_page_cursor(
+            "sessions_page", (tuple(search.values()), sessions_limit, show_active_only, sessions_include_archive)
+        )
+        sessions_filters = {
+            **search,
+            'limit': sessions_limit,
+            'active_only': show_active_only,
+        }
         with st.spinner("Загрузка данных о сессиях..."):
-            sessions = get_user_sessions(
-                username=sessions_username_filter if sessions_username_filter else None,
-                limit=sessions_limit,
-                active_only=show_active_only
-            )
-        
-        if not sessions:
+            # Первая страница берется из кэша с догрузкой новых сессий, остальные (и страницы с архивом) - из базы
+            if cursor or sessions_include_archive:
+                page = get_user_sessions_frame(cursor=cursor, include_archive=sessions_include_archive, **sessions_filters)
+            else:
+                page = get_recent_user_sessions_frame(**sessions_filters)
+        sessions = page['frame']
+        
+        if sessions.empty:
             st.info("📭 Нет записей сессий пользователей")
+            if cursor:
+                show_page_navigation("sessions_page", page)
             return
         
         # Статистика по сессиям
-        sessions_stats = get_user_sessions_stats()
+        sessions_stats = cached(('user_sessions_stats',), get_user_sessions_stats)
         
         col1, col2, col3, col4 = st.columns(4)
         
@@ -99,27 +338,21 @@ def show_user_sessions_tab():
         with col4:
             st.metric("За последние 24ч", sessions_stats['recent_sessions'])
         
+        # Динамика входов по агрегатам
+        st.header("📈 Динамика входов за 7 дней")
+        sessions_trend = cached(('user_sessions_trend',), lambda: get_user_sessions_trend(
+            since=truncate_to_granularity(datetime.now() - SESSIONS_TREND_PERIOD, "hour")
+        ))
+        show_trend_chart(
+            sessions_trend['points'],
+            {'logins': "Входы", 'peak_active_sessions': "Активные сессии (максимум)"}
+        )
+        
         # Таблица с данными о сессиях
         st.header("📊 Детальная информация о сессиях")
         
-        # Подготовка данных для DataFrame
-        sessions_df_data = []
-        for session in sessions:
-            status_icon = "🟢" if session['is_active'] else "🔴"
-            status_text = "Активна" if session['is_active'] else "Неактивна"
-            
-            sessions_df_data.append({
-                'ID': session['id'],
-                'Пользователь': session['username'],
-                'Статус': f"{status_icon} {status_text}",
-                'IP адрес': session['ip_address'] or 'Не указан',
-                'User Agent': session['user_agent'][:50] + '...' if session['user_agent'] and len(session['user_agent']) > 50 else session['user_agent'] or 'Не указан',
-                'Создана': session['created_at'].strftime('%Y-%m-%d %H:%M:%S'),
-                'Последняя активность': session['last_activity'].strftime('%Y-%m-%d %H:%M:%S') if session['last_activity'] else 'Не указана',
-                'Session ID': session['session_id'][:20] + '...' if len(session['session_id']) > 20 else session['session_id']
-            })
-        
-        sessions_df = pd.DataFrame(sessions_df_data)
+        # Статус, усечение строк и значения по умолчанию - операциями над столбцами
+        sessions_df = format_sessions_frame(sessions)
         
         # Отображение таблицы сессий
         st.dataframe(
@@ -132,91 +365,58 @@ def show_user_sessions_tab():
                 "Статус": st.column_config.TextColumn("Статус", width="small"),
                 "IP адрес": st.column_config.TextColumn("IP адрес", width="medium"),
                 "User Agent": st.column_config.TextColumn("User Agent", width="large"),
-                "Создана": st.column_config.DatetimeColumn("Создана", width="medium"),
-                "Последняя активность": st.column_config.DatetimeColumn("Последняя активность", width="medium"),
+                "Создана": st.column_config.DatetimeColumn("Создана", width="medium", format=DATETIME_DISPLAY_FORMAT),
+                "Последняя активность": st.column_config.DatetimeColumn(
+                    "Последняя активность", width="medium", format=DATETIME_DISPLAY_FORMAT
+                ),
                 "Session ID": st.column_config.TextColumn("Session ID", width="medium")
             }
         )
+        show_page_navigation("sessions_page", page)
+        
+        # Выгрузка всех сессий по фильтрам
+        st.header("📥 Выгрузка сессий")
+        show_export_controls(
+            "sessions_export",
+            export_user_sessions,
+            "user_sessions",
+            active_only=show_active_only,
+            include_archive=sessions_include_archive,
+            **search
+        )
         
         # Анализ по пользователям (сессии)
         st.header("👥 Анализ сессий по пользователям")
         
-        user_sessions_stats = {}
-        for session in sessions:
-            username = session['username']
-            if username not in user_sessions_stats:
-                user_sessions_stats[username] = {
-                    'total_sessions': 0,
-                    'active_sessions': 0,
-                    'ips': set(),
-                    'last_activity': session['last_activity'],
-                    'first_session': session['created_at']
-                }
-            user_sessions_stats[username]['total_sessions'] += 1
-            if session['is_active']:
-                user_sessions_stats[username]['active_sessions'] += 1
-            if session['ip_address']:
-                user_sessions_stats[username]['ips'].add(session['ip_address'])
-            if session['last_activity'] and (not user_sessions_stats[username]['last_activity'] or 
-                                           session['last_activity'] > user_sessions_stats[username]['last_activity']):
-                user_sessions_stats[username]['last_activity'] = session['last_activity']
-            if session['created_at'] < user_sessions_stats[username]['first_session']:
-                user_sessions_stats[username]['first_session'] = session['created_at']
-        
-        # Сортировка по количеству сессий
-        sorted_user_sessions = sorted(user_sessions_stats.items(), key=lambda x: x[1]['total_sessions'], reverse=True)
-        
-        for username, stats in sorted_user_sessions[:10]:  # Топ 10 пользователей
-            with st.expander(f"👤 {username} - {stats['total_sessions']} сессий ({stats['active_sessions']} активных)"):
+        for stats in summarize_sessions_by_user(sessions, limit=10).itertuples():  # Топ 10 пользователей
+            with st.expander(f"👤 {stats.username} - {stats.total_sessions} сессий ({stats.active_sessions} активных)"):
                 col1, col2 = st.columns(2)
                 with col1:
-                    st.write(f"**Всего сессий:** {stats['total_sessions']}")
-                    st.write(f"**Активных сессий:** {stats['active_sessions']}")
-                    st.write(f"**Уникальных IP:** {len(stats['ips'])}")
+                    st.write(f"**Всего сессий:** {stats.total_sessions}")
+                    st.write(f"**Активных сессий:** {stats.active_sessions}")
+                    st.write(f"**Уникальных IP:** {stats.unique_ips}")
                 with col2:
-                    st.write(f"**Первая сессия:** {stats['first_session'].strftime('%Y-%m-%d %H:%M:%S')}")
-                    if stats['last_activity']:
-                        st.write(f"**Последняя активность:** {stats['last_activity'].strftime('%Y-%m-%d %H:%M:%S')}")
-                    if stats['ips']:
-                        st.write(f"**IP адреса:** {', '.join(list(stats['ips'])[:5])}")
+                    st.write(f"**Первая сессия:** {format_datetime(stats.first_session)}")
+                    if pd.notna(stats.last_activity):
+                        st.write(f"**Последняя активность:** {format_datetime(stats.last_activity)}")
+                    if stats.ip_addresses:
+                        st.write(f"**IP адреса:** {', '.join(stats.ip_addresses)}")
         
         # Анализ по IP адресам (сессии)
         st.header("🌐 Анализ сессий по IP адресам")
         
-        ip_sessions_stats = {}
-        for session in sessions:
-            ip = session['ip_address']
-            if ip:
-                if ip not in ip_sessions_stats:
-                    ip_sessions_stats[ip] = {
-                        'total_sessions': 0,
-                        'active_sessions': 0,
-                        'users': set(),
-                        'last_activity': session['last_activity']
-                    }
-                ip_sessions_stats[ip]['total_sessions'] += 1
-                if session['is_active']:
-                    ip_sessions_stats[ip]['active_sessions'] += 1
-                ip_sessions_stats[ip]['users'].add(session['username'])
-                if session['last_activity'] and (not ip_sessions_stats[ip]['last_activity'] or 
-                                               session['last_activity'] > ip_sessions_stats[ip]['last_activity']):
-                    ip_sessions_stats[ip]['last_activity'] = session['last_activity']
-        
-        # Сортировка по количеству сессий
-        sorted_ip_sessions = sorted(ip_sessions_stats.items(), key=lambda x: x[1]['total_sessions'], reverse=True)
-        
-        for ip, stats in sorted_ip_sessions[:10]:  # Топ 10 IP
-            with st.expander(f"🌐 {ip} - {stats['total_sessions']} сессий ({stats['active_sessions']} активных)"):
+        for stats in summarize_sessions_by_ip(sessions, limit=10).itertuples():  # Топ 10 IP
+            with st.expander(f"🌐 {stats.ip_address} - {stats.total_sessions} сессий ({stats.active_sessions} активных)"):
                 col1, col2 = st.columns(2)
                 with col1:
-                    st.write(f"**Всего сессий:** {stats['total_sessions']}")
-                    st.write(f"**Активных сессий:** {stats['active_sessions']}")
-                    st.write(f"**Уникальных пользователей:** {len(stats['users'])}")
+                    st.write(f"**Всего сессий:** {stats.total_sessions}")
+                    st.write(f"**Активных сессий:** {stats.active_sessions}")
+                    st.write(f"**Уникальных пользователей:** {stats.unique_users}")
                 with col2:
-                    if stats['last_activity']:
-                        st.write(f"**Последняя активность:** {stats['last_activity'].strftime('%Y-%m-%d %H:%M:%S')}")
-                    if stats['users']:
-                        st.write(f"**Пользователи:** {', '.join(list(stats['users'])[:5])}")
+                    if pd.notna(stats.last_activity):
+                        st.write(f"**Последняя активность:** {format_datetime(stats.last_activity)}")
+                    if stats.usernames:
+                        st.write(f"**Пользователи:** {', '.join(stats.usernames)}")
         
     except Exception as e:
         st.error(f"❌ Ошибка при загрузке данных о сессиях: {e}")
@@ -234,13 +434,23 @@ def show_unauthorized_logins_tab():
         # Фильтр по имени пользователя
         username_filter = st.text_input(
             "Имя пользователя",
-            placeholder="Введите имя пользователя для фильтрации",
+            placeholder="Имя или шаблон со *, например admin*",
             key="unauthorized_username_filter"
         )
+        user_agent_filter, ip_filter = show_search_inputs("unauthorized")
+        include_archive = show_archive_checkbox("unauthorized")
+        
+        # Период анализа
+        period = st.selectbox(
+            "Период",
+            options=list(UNAUTHORIZED_PERIODS),
+            index=2,
+            key="unauthorized_period"
+        )
         
-        # Фильтр по количеству записей
+        # Количество записей на странице
         limit = st.slider(
-            "Количество записей",
+            "Записей на странице",
             min_value=10,
             max_value=1000,
             value=100,
@@ -261,19 +471,34 @@ def show_unauthorized_logins_tab():
         if st.button("🗑️ Очистить старые записи", type="secondary", key="cleanup_unauthorized"):
             with st.spinner("Очистка старых записей..."):
                 deleted_count = cleanup_old_unauthorized_attempts(days_to_keep)
+                get_admin_data_cache().clear()
                 st.success(f"Удалено {deleted_count} записей старше {days_to_keep} дней")
                 st.rerun()
     
     # Основной контент
     try:
-        # Получение данных
+        period_delta = UNAUTHORIZED_PERIODS[period]
+        search = search_filters(username_filter, user_agent_filter, ip_filter)
+        filters = {
+            **search,
+            'since': datetime.now() - period_delta if period_delta else None,
+        }
+        
+        # Получение данных: сводка и агрегаты считаются в базе по всему периоду,
+        # а детальная таблица выводится постранично
+        cursor = get_page_cursor("unauthorized_page", (tuple(search.values()), period, limit, include_archive))
+        cache_key = (tuple(search.values()), period)
         with st.spinner("Загрузка данных..."):
-            attempts = get_unauthorized_login_attempts(
-                username=username_filter if username_filter else None,
-                limit=limit
-            )
-        
-        if not attempts:
+            summary = cached(('unauthorized_summary',) + cache_key, lambda: get_unauthorized_attempts_summary(**filters))
+            # Первая страница берется из кэша с догрузкой новых попыток, остальные (и страницы с архивом) - из базы
+            if cursor or include_archive:
+                page = get_unauthorized_login_attempts_frame(
+                    limit=limit, cursor=cursor, include_archive=include_archive, **filters
+                )
+            else:
+                page = get_recent_unauthorized_login_attempts_frame(limit=limit, period=period_delta, **search)
+        
+        if not summary['total_attempts'] and page['frame'].empty:
             st.info("📭 Нет записей попыток неавторизованного входа")
             return
         
@@ -281,37 +506,32 @@ def show_unauthorized_logins_tab():
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            st.metric("Всего попыток", len(attempts))
+            st.metric("Всего попыток", summary['total_attempts'])
         
         with col2:
-            unique_users = len(set(attempt['username'] for attempt in attempts))
-            st.metric("Уникальных пользователей", unique_users)
+            st.metric("Уникальных пользователей", summary['unique_users'])
         
         with col3:
-            unique_ips = len(set(attempt['ip_address'] for attempt in attempts if attempt['ip_address']))
-            st.metric("Уникальных IP", unique_ips)
+            st.metric("Уникальных IP", summary['unique_ips'])
         
         with col4:
-            recent_attempts = len([a for a in attempts if 
-                                 datetime.now() - a['attempted_at'].replace(tzinfo=None) < timedelta(hours=24)])
-            st.metric("За последние 24ч", recent_attempts)
+            st.metric("За последние 24ч", summary['recent_attempts'])
+        
+        # Динамика попыток по агрегатам
+        st.header("📈 Динамика попыток")
+        trend_granularity = UNAUTHORIZED_TREND_GRANULARITIES[period]
+        attempts_trend = cached(('unauthorized_trend',) + cache_key, lambda: get_unauthorized_attempts_trend(
+            since=truncate_to_granularity(filters['since'], trend_granularity) if filters['since'] else None,
+            username=filters['username']
+        ))
+        show_trend_chart(attempts_trend['points'], {'attempts': "Попытки"})
+        if search['username_pattern'] or search['user_agent_contains'] or search['ip_network']:
+            st.caption("График по агрегатам учитывает только точное имя пользователя, без шаблона, User Agent и сети")
         
         # Таблица с данными
         st.header("📊 Детальная информация")
         
-        # Подготовка данных для DataFrame
-        df_data = []
-        for attempt in attempts:
-            df_data.append({
-                'ID': attempt['id'],
-                'Пользователь': attempt['username'],
-                'IP адрес': attempt['ip_address'] or 'Не указан',
-                'User Agent': attempt['user_agent'][:50] + '...' if attempt['user_agent'] and len(attempt['user_agent']) > 50 else attempt['user_agent'] or 'Не указан',
-                'Время попытки': attempt['attempted_at'].strftime('%Y-%m-%d %H:%M:%S'),
-                'Причина': attempt['reason']
-            })
-        
-        df = pd.DataFrame(df_data)
+        df = format_attempts_frame(page['frame'])
         
         # Отображение таблицы
         st.dataframe(
@@ -323,80 +543,230 @@ def show_unauthorized_logins_tab():
                 "Пользователь": st.column_config.TextColumn("Пользователь", width="medium"),
                 "IP адрес": st.column_config.TextColumn("IP адрес", width="medium"),
                 "User Agent": st.column_config.TextColumn("User Agent", width="large"),
-                "Время попытки": st.column_config.DatetimeColumn("Время попытки", width="medium"),
+                "Время попытки": st.column_config.DatetimeColumn(
+                    "Время попытки", width="medium", format=DATETIME_DISPLAY_FORMAT
+                ),
                 "Причина": st.column_config.TextColumn("Причина", width="large")
             }
         )
+        show_page_navigation("unauthorized_page", page)
+        
+        # Выгрузка всех попыток за период
+        st.header("📥 Выгрузка попыток")
+        show_export_controls(
+            "unauthorized_export", export_unauthorized_login_attempts, "unauthorized_login_attempts",
+            include_archive=include_archive, **filters
+        )
         
         # Анализ по пользователям
         st.header("👥 Анализ по пользователям")
         
-        user_stats = {}
-        for attempt in attempts:
-            username = attempt['username']
-            if username not in user_stats:
-                user_stats[username] = {
-                    'count': 0,
-                    'ips': set(),
-                    'last_attempt': attempt['attempted_at']
-                }
-            user_stats[username]['count'] += 1
-            if attempt['ip_address']:
-                user_stats[username]['ips'].add(attempt['ip_address'])
-            if attempt['attempted_at'] > user_stats[username]['last_attempt']:
-                user_stats[username]['last_attempt'] = attempt['attempted_at']
-        
-        # Сортировка по количеству попыток
-        sorted_users = sorted(user_stats.items(), key=lambda x: x[1]['count'], reverse=True)
-        
-        for username, stats in sorted_users[:10]:  # Топ 10 пользователей
-            with st.expander(f"👤 {username} - {stats['count']} попыток"):
+        by_username = cached(
+            ('unauthorized_by_username',) + cache_key, lambda: get_unauthorized_attempts_by_username(limit=10, **filters)
+        )
+        for stats in by_username:  # Топ 10 пользователей
+            with st.expander(f"👤 {stats['username']} - {stats['attempts']} попыток"):
                 col1, col2 = st.columns(2)
                 with col1:
-                    st.write(f"**Количество попыток:** {stats['count']}")
-                    st.write(f"**Уникальных IP:** {len(stats['ips'])}")
+                    st.write(f"**Количество попыток:** {stats['attempts']}")
+                    st.write(f"**За последние 24ч:** {stats['recent_attempts']}")
+                    st.write(f"**Уникальных IP:** {stats['unique_ips']}")
                 with col2:
                     st.write(f"**Последняя попытка:** {stats['last_attempt'].strftime('%Y-%m-%d %H:%M:%S')}")
-                    if stats['ips']:
-                        st.write(f"**IP адреса:** {', '.join(list(stats['ips'])[:5])}")
+                    if stats['ip_addresses']:
+                        st.write(f"**IP адреса:** {', '.join(stats['ip_addresses'])}")
         
         # Анализ по IP адресам
         st.header("🌐 Анализ по IP адресам")
         
-        ip_stats = {}
-        for attempt in attempts:
-            ip = attempt['ip_address']
-            if ip:
-                if ip not in ip_stats:
-                    ip_stats[ip] = {
-                        'count': 0,
-                        'users': set(),
-                        'last_attempt': attempt['attempted_at']
-                    }
-                ip_stats[ip]['count'] += 1
-                ip_stats[ip]['users'].add(attempt['username'])
-                if attempt['attempted_at'] > ip_stats[ip]['last_attempt']:
-                    ip_stats[ip]['last_attempt'] = attempt['attempted_at']
-        
-        # Сортировка по количеству попыток
-        sorted_ips = sorted(ip_stats.items(), key=lambda x: x[1]['count'], reverse=True)
-        
-        for ip, stats in sorted_ips[:10]:  # Топ 10 IP
-            with st.expander(f"🌐 {ip} - {stats['count']} попыток"):
+        by_ip = cached(('unauthorized_by_ip',) + cache_key, lambda: get_unauthorized_attempts_by_ip(limit=10, **filters))
+        for stats in by_ip:  # Топ 10 IP
+            with st.expander(f"🌐 {stats['ip_address']} - {stats['attempts']} попыток"):
                 col1, col2 = st.columns(2)
                 with col1:
-                    st.write(f"**Количество попыток:** {stats['count']}")
-                    st.write(f"**Уникальных пользователей:** {len(stats['users'])}")
+                    st.write(f"**Количество попыток:** {stats['attempts']}")
+                    st.write(f"**За последние 24ч:** {stats['recent_attempts']}")
+                    st.write(f"**Уникальных пользователей:** {stats['unique_users']}")
                 with col2:
                     st.write(f"**Последняя попытка:** {stats['last_attempt'].strftime('%Y-%m-%d %H:%M:%S')}")
-                    if stats['users']:
-                        st.write(f"**Пользователи:** {', '.join(list(stats['users'])[:5])}")
+                    if stats['usernames']:
+                        st.write(f"**Пользователи:** {', '.join(stats['usernames'])}")
         
     except Exception as e:
         st.error(f"❌ Ошибка при загрузке данных: {e}")
         import traceback
         st.code(traceback.format_exc())
 
+def show_subnets_tab():
+    """Отображение вкладки с агрегатами попыток входа и сессий по подсетям IP адресов"""
+    st.header("🌐 Подсети")
+    
+    # Боковая панель с параметрами подсетей
+    with st.sidebar:
+        st.header("🔍 Фильтры подсетей")
+        
+        subnets_period = st.selectbox(
+            "Период (подсети)",
+            options=list(UNAUTHORIZED_PERIODS),
+            index=1,
+            key="subnets_period"
+        )
+        
+        ipv4_prefix = st.selectbox(
+            "Префикс подсети IPv4",
+            options=SUBNET_IPV4_PREFIXES,
+            index=SUBNET_IPV4_PREFIXES.index(24),
+            format_func=lambda prefix: f"/{prefix}",
+            key="subnets_ipv4_prefix"
+        )
+        
+        ipv6_prefix = st.selectbox(
+            "Префикс подсети IPv6",
+            options=SUBNET_IPV6_PREFIXES,
+            index=SUBNET_IPV6_PREFIXES.index(64),
+            format_func=lambda prefix: f"/{prefix}",
+            key="subnets_ipv6_prefix"
+        )
+        
+        subnets_network_filter = st.text_input(
+            "Только внутри сети",
+            placeholder="Например: 10.0.0.0/8 или 2001:db8::/32",
+            key="subnets_network_filter"
+        )
+        
+        subnets_limit = st.slider(
+            "Подсетей в списке",
+            min_value=5,
+            max_value=100,
+            value=20,
+            step=5,
+            key="subnets_limit"
+        )
+    
+    try:
+        period_delta = UNAUTHORIZED_PERIODS[subnets_period]
+        filters = {
+            'since': datetime.now() - period_delta if period_delta else None,
+            'limit': subnets_limit,
+            'ipv4_prefix': ipv4_prefix,
+            'ipv6_prefix': ipv6_prefix,
+            'ip_network': parse_ip_network(subnets_network_filter) if subnets_network_filter.strip() else None,
+        }
+        cache_key = (subnets_period, subnets_limit, ipv4_prefix, ipv6_prefix, filters['ip_network'])
+        
+        # Попытки входа по подсетям: перебор с соседних адресов виден одной строкой
+        st.header("🔒 Попытки неавторизованного входа по подсетям")
+        with st.spinner("Загрузка агрегатов по подсетям..."):
+            attempts_by_subnet = cached(
+                ('unauthorized_by_subnet',) + cache_key, lambda: get_unauthorized_attempts_by_subnet(**filters)
+            )
+        
+        if not attempts_by_subnet:
+            st.info("📭 Нет попыток входа с известным IP адресом за период")
+        else:
+            attempts_df = pd.DataFrame(attempts_by_subnet)
+            attempts_df['ip_addresses'] = attempts_df['ip_addresses'].str.join(', ')
+            st.dataframe(
+                attempts_df.rename(columns={
+                    'subnet': 'Подсеть',
+                    'attempts': 'Попыток',
+                    'unique_ips': 'IP адресов',
+                    'unique_users': 'Пользователей',
+                    'recent_attempts': 'За 24ч',
+                    'first_attempt': 'Первая попытка',
+                    'last_attempt': 'Последняя попытка',
+                    'ip_addresses': 'IP адреса',
+                }),
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    "Первая попытка": st.column_config.DatetimeColumn(format=DATETIME_DISPLAY_FORMAT),
+                    "Последняя попытка": st.column_config.DatetimeColumn(format=DATETIME_DISPLAY_FORMAT),
+                }
+            )
+            
+            # IP адреса выбранной подсети (вхождение в сеть по индексу GiST)
+            selected_subnet = st.selectbox(
+                "Адреса подсети",
+                options=[stats['subnet'] for stats in attempts_by_subnet],
+                key="subnets_selected"
+            )
+            subnet_ips = cached(
+                ('unauthorized_subnet_ips', selected_subnet) + cache_key[:1],
+                lambda: get_unauthorized_attempts_by_ip(since=filters['since'], limit=50, ip_network=selected_subnet)
+            )
+            for stats in subnet_ips:
+                usernames = ', '.join(stats['usernames'])
+                st.write(f"🌐 **{stats['ip_address']}** - {stats['attempts']} попыток, "
+                         f"последняя {format_datetime(stats['last_attempt'])}; пользователи: {usernames}")
+        
+        # Сессии по подсетям
+        st.header("👥 Сессии пользователей по подсетям")
+        sessions_by_subnet = cached(
+            ('user_sessions_by_subnet',) + cache_key, lambda: get_user_sessions_by_subnet(**filters)
+        )
+        if not sessions_by_subnet:
+            st.info("📭 Нет сессий с известным IP адресом за период")
+            return
+        
+        sessions_df = pd.DataFrame(sessions_by_subnet)
+        sessions_df['usernames'] = sessions_df['usernames'].str.join(', ')
+        st.dataframe(
+            sessions_df.rename(columns={
+                'subnet': 'Подсеть',
+                'sessions': 'Сессий',
+                'active_sessions': 'Активных',
+                'unique_ips': 'IP адресов',
+                'unique_users': 'Пользователей',
+                'last_activity': 'Последняя активность',
+                'usernames': 'Пользователи',
+            }),
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "Последняя активность": st.column_config.DatetimeColumn(format=DATETIME_DISPLAY_FORMAT),
+            }
+        )
+    
+    except Exception as e:
+        st.error(f"❌ Ошибка при загрузке данных по подсетям: {e}")
+
+# Подписи пулов соединений по нагрузкам
+WORKLOAD_LABELS = {
+    WORKLOAD_AUTH: "Вход",
+    WORKLOAD_REPORTING: "Отчеты",
+    WORKLOAD_MAINTENANCE: "Обслуживание",
+}
+
+def show_pool_telemetry():
+    """Отображение состояния пулов соединений с базой данных по нагрузкам"""
+    with st.expander("⚙️ Пулы соединений с базой данных"):
+        for workload, telemetry in get_pool_telemetry_by_workload().items():
+            st.markdown(f"**{WORKLOAD_LABELS.get(workload, workload)}** (`{workload}`)")
+            
+            col1, col2, col3, col4 = st.columns(4)
+            
+            with col1:
+                st.metric("Выдано соединений", telemetry.get('checked_out', 0))
+            
+            with col2:
+                st.metric("Переполнений пула", telemetry.get('overflow_events', 0))
+            
+            with col3:
+                st.metric("Среднее ожидание, мс", f"{telemetry.get('avg_wait_seconds', 0) * 1000:.1f}")
+            
+            with col4:
+                st.metric("Таймауты ожидания", telemetry.get('timeouts', 0))
+            
+            st.caption(telemetry['status'])
+        
+        cache_stats = get_admin_data_cache().stats()
+        st.caption(
+            f"Кэш данных панели: {cache_stats['size']} ключей, попаданий {cache_stats['hits']}, "
+            f"полных загрузок {cache_stats['full_loads']}, догрузок {cache_stats['incremental_loads']} "
+            f"({cache_stats['incremental_rows']} строк)"
+        )
+
 def main():
     """Главная функция приложения с вкладками"""
     st.set_page_config(
@@ -407,14 +777,33 @@ def main():
     
     st.title("🔒 Администрирование системы")
     
+    show_pool_telemetry()
+    
+    # Автообновление: первые страницы догружаются из кэша, поэтому частый перезапуск дешев
+    with st.sidebar:
+        auto_refresh = st.checkbox("🔄 Автообновление", value=False, key="auto_refresh")
+        refresh_interval = st.selectbox(
+            "Интервал автообновления, с",
+            options=AUTO_REFRESH_INTERVALS,
+            key="auto_refresh_interval",
+            disabled=not auto_refresh
+        )
+    
     # Создание вкладок
-    tab1, tab2 = st.tabs(["🔒 Попытки неавторизованного входа", "👥 Сессии пользователей"])
+    tab1, tab2, tab3 = st.tabs(["🔒 Попытки неавторизованного входа", "👥 Сессии пользователей", "🌐 Подсети"])
     
     with tab1:
         show_unauthorized_logins_tab()
     
     with tab2:
         show_user_sessions_tab()
+    
+    with tab3:
+        show_subnets_tab()
+    
+    if auto_refresh:
+        time.sleep(refresh_interval)
+        st.rerun()
 
 if __name__ == "__main__":
     main()
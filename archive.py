@@ -0,0 +1,445 @@
+#!/usr/bin/env python3
+"""
+Холодный архив сессий и попыток входа в сжатых файлах Parquet на локальном диске.
+
+Строки старше срока хранения в PostgreSQL переносятся в каталоги по дням
+    <path>/<таблица>/date=YYYY-MM-DD/part-<запуск>.parquet
+(столбцы выгрузок из models.py, сжатие zstd). Файл пишется под временным именем и становится
+видимым после фиксации удаления строк из базы. Каждый перенос добавляет в каталог дня новый файл,
+поэтому закрытые дни, в которые уже не пишут, сливаются в один файл (compact_archive). Запросы
+к архиву выполняет встроенный DuckDB: каталоги вне запрошенного периода отбрасываются до чтения
+файлов, внутри файлов лишние группы строк пропускаются по статистике min/max столбца времени.
+
+Пример:
+    python archive.py archive
+    python archive.py days attempts
+    python archive.py compact
+    python archive.py prune
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import uuid
+from datetime import date, datetime, timedelta
+from itertools import groupby
+
+from exports import arrow_schema, record_batch
+from pagination import PAGE_NEXT, decode_page_cursor
+
+logger = logging.getLogger(__name__)
+
+# Префикс каталога дня (hive-разметка: date=YYYY-MM-DD)
+ARCHIVE_PARTITION_PREFIX = 'date='
+ARCHIVE_FILE_SUFFIX = '.parquet'
+# Файлы с этим окончанием еще не зафиксированы и запросами не читаются
+ARCHIVE_TEMP_SUFFIX = '.tmp'
+
+# Строк в одной пачке результата запроса к архиву
+ARCHIVE_QUERY_BATCH_SIZE = 10000
+
+# Каталоги слияния дня: новый каталог до замены и замененный до удаления (не начинаются с date= и не читаются)
+ARCHIVE_COMPACT_PREFIX = '.compact-'
+ARCHIVE_REPLACED_PREFIX = '.replaced-'
+
+
+def _import_pyarrow():
+    """Импорт pyarrow (необязательная зависимость)"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("Для архива в Parquet требуется пакет pyarrow") from e
+    return pa, pq
+
+
+def _import_duckdb():
+    """Импорт duckdb (необязательная зависимость)"""
+    try:
+        import duckdb
+    except ImportError as e:
+        raise RuntimeError("Для запросов к архиву требуется пакет duckdb") from e
+    return duckdb
+
+
+def archive_day_path(root: str, table: str, day: date) -> str:
+    """Каталог архива таблицы за день"""
+    return os.path.join(root, table, f"{ARCHIVE_PARTITION_PREFIX}{day.isoformat()}")
+
+
+def list_archive_days(root: str, table: str) -> list:
+    """
+    Дни, за которые в архиве таблицы есть каталоги
+
+    Args:
+        root: Корневой каталог архива
+        table: Имя таблицы
+
+    Returns:
+        list: Даты по возрастанию
+    """
+    table_path = os.path.join(root, table)
+    if not os.path.isdir(table_path):
+        return []
+    days = []
+    for name in os.listdir(table_path):
+        if not name.startswith(ARCHIVE_PARTITION_PREFIX):
+            continue
+        try:
+            days.append(date.fromisoformat(name[len(ARCHIVE_PARTITION_PREFIX):]))
+        except ValueError:
+            logger.warning("Пропущен каталог архива с некорректной датой: %s", os.path.join(table_path, name))
+    return sorted(days)
+
+
+def archive_files(root: str, table: str, since: datetime = None, until: datetime = None) -> list:
+    """
+    Зафиксированные файлы архива таблицы за период (отбор по каталогам дней)
+
+    Args:
+        root: Корневой каталог архива
+        table: Имя таблицы
+        since: Начало периода (опционально)
+        until: Конец периода (опционально)
+
+    Returns:
+        list: Пути к файлам Parquet
+    """
+    files = []
+    for day in list_archive_days(root, table):
+        if since is not None and day < since.date():
+            continue
+        if until is not None and day > until.date():
+            continue
+        files.extend(_day_files(archive_day_path(root, table, day)))
+    return files
+
+
+def _day_files(day_path: str) -> list:
+    """Зафиксированные файлы каталога дня по имени (в порядке запусков)"""
+    return [
+        os.path.join(day_path, name)
+        for name in sorted(os.listdir(day_path))
+        if name.endswith(ARCHIVE_FILE_SUFFIX)
+    ]
+
+
+class ArchiveWriter:
+    """
+    Запись строк одной таблицы в файлы Parquet по дням столбца времени
+
+    Строки передаются упорядоченными по столбцу времени, поэтому одновременно открыт один файл.
+    До commit() файлы имеют временные имена; abort() их удаляет.
+    """
+
+    def __init__(self, root: str, table: str, columns: list, time_column: str, compression: str = 'zstd'):
+        """
+        Args:
+            root: Корневой каталог архива
+            table: Имя таблицы
+            columns: Столбцы строк: список пар (имя, тип) как у выгрузок
+            time_column: Столбец времени, по дню которого выбирается каталог
+            compression: Сжатие страниц Parquet
+        """
+        self.root = root
+        self.table = table
+        self.compression = compression
+        self._pa, self._pq = _import_pyarrow()
+        self._schema = arrow_schema(self._pa, columns)
+        self._time_index = [name for name, _ in columns].index(time_column)
+        self._run_name = f"part-{datetime.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        self._day = None
+        self._writer = None
+        self._temp_files = []
+        self.rows = 0
+
+    def write(self, rows: list):
+        """
+        Запись пачки строк
+
+        Args:
+            rows: Кортежи в порядке столбцов, упорядоченные по столбцу времени
+        """
+        for day, day_rows in groupby(rows, key=lambda row: row[self._time_index].date()):
+            day_rows = list(day_rows)
+            if day != self._day:
+                self._open(day)
+            self._writer.write_batch(record_batch(self._pa, day_rows, self._schema))
+            self.rows += len(day_rows)
+
+    def _open(self, day: date):
+        """Закрытие файла предыдущего дня и создание временного файла дня day"""
+        self._close()
+        day_path = archive_day_path(self.root, self.table, day)
+        os.makedirs(day_path, exist_ok=True)
+        path = os.path.join(day_path, self._run_name + ARCHIVE_FILE_SUFFIX + ARCHIVE_TEMP_SUFFIX)
+        self._temp_files.append(path)
+        self._writer = self._pq.ParquetWriter(path, self._schema, compression=self.compression)
+        self._day = day
+
+    def _close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def commit(self) -> list:
+        """
+        Закрытие файлов и переименование временных файлов в постоянные
+
+        Returns:
+            list: Пути к записанным файлам
+        """
+        self._close()
+        files = []
+        for path in self._temp_files:
+            final_path = path[:-len(ARCHIVE_TEMP_SUFFIX)]
+            os.replace(path, final_path)
+            files.append(final_path)
+        self._temp_files = []
+        return files
+
+    def abort(self):
+        """Удаление незафиксированных файлов"""
+        self._close()
+        for path in self._temp_files:
+            if os.path.exists(path):
+                os.remove(path)
+        self._temp_files = []
+
+
+def prune_archive(root: str, table: str, retention_days: int, today: date = None) -> int:
+    """
+    Удаление каталогов архива старше срока хранения
+
+    Args:
+        root: Корневой каталог архива
+        table: Имя таблицы
+        retention_days: Срок хранения в днях
+        today: Текущая дата (для тестов)
+
+    Returns:
+        int: Количество удаленных каталогов дней
+    """
+    cutoff = (today or date.today()) - timedelta(days=retention_days)
+    removed = 0
+    for day in list_archive_days(root, table):
+        if day >= cutoff:
+            break
+        shutil.rmtree(archive_day_path(root, table, day))
+        removed += 1
+    return removed
+
+
+def _recover_compaction(table_path: str):
+    """
+    Завершение слияний, прерванных сбоем
+
+    Новый каталог дня записывается полностью до первого переименования, поэтому при наличии
+    замененного каталога новый каталог готов и ставится на место каталога дня.
+    """
+    for name in os.listdir(table_path):
+        if not name.startswith(ARCHIVE_REPLACED_PREFIX):
+            continue
+        day_name = ARCHIVE_PARTITION_PREFIX + name[len(ARCHIVE_REPLACED_PREFIX):]
+        compact_path = os.path.join(table_path, ARCHIVE_COMPACT_PREFIX + name[len(ARCHIVE_REPLACED_PREFIX):])
+        if not os.path.exists(os.path.join(table_path, day_name)) and os.path.isdir(compact_path):
+            os.rename(compact_path, os.path.join(table_path, day_name))
+        shutil.rmtree(os.path.join(table_path, name))
+    # Незаконченные новые каталоги (сбой до замены): каталог дня не тронут
+    for name in os.listdir(table_path):
+        if name.startswith(ARCHIVE_COMPACT_PREFIX):
+            shutil.rmtree(os.path.join(table_path, name))
+
+
+def _merge_files(files: list, path: str, compression: str):
+    """Запись строк файлов Parquet одного дня в файл path (схемы объединяются по именам столбцов)"""
+    pa, pq = _import_pyarrow()
+    schema = pa.unify_schemas([pq.read_schema(source) for source in files])
+    with pq.ParquetWriter(path, schema, compression=compression) as writer:
+        for source in files:
+            for batch in pq.ParquetFile(source).iter_batches(batch_size=ARCHIVE_QUERY_BATCH_SIZE):
+                arrays = [
+                    batch.column(field.name).cast(field.type) if field.name in batch.schema.names
+                    else pa.nulls(batch.num_rows, field.type)
+                    for field in schema
+                ]
+                writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+
+
+def compact_archive(root: str, table: str, before: date, open_days=(), compression: str = 'zstd') -> int:
+    """
+    Слияние файлов каждого закрытого дня архива в один файл
+
+    Новый файл записывается в отдельный каталог, который затем заменяет каталог дня
+    двумя переименованиями; прерванное сбоем слияние завершается при следующем вызове.
+    Вызывающий должен исключить одновременную запись в архив таблицы (models.py - advisory lock).
+
+    Args:
+        root: Корневой каталог архива
+        table: Имя таблицы
+        before: Сливаются дни раньше этой даты
+        open_days: Дни, в которые еще пишут (не сливаются)
+        compression: Сжатие страниц Parquet
+
+    Returns:
+        int: Количество слитых каталогов дней
+    """
+    table_path = os.path.join(root, table)
+    if not os.path.isdir(table_path):
+        return 0
+    _recover_compaction(table_path)
+
+    compacted = 0
+    for day in list_archive_days(root, table):
+        if day >= before:
+            break
+        day_path = archive_day_path(root, table, day)
+        files = _day_files(day_path)
+        if day in open_days or len(files) < 2:
+            continue
+        compact_path = os.path.join(table_path, ARCHIVE_COMPACT_PREFIX + day.isoformat())
+        replaced_path = os.path.join(table_path, ARCHIVE_REPLACED_PREFIX + day.isoformat())
+        os.makedirs(compact_path)
+        try:
+            _merge_files(
+                files,
+                os.path.join(compact_path, f"part-{datetime.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+                                           f"{ARCHIVE_FILE_SUFFIX}"),
+                compression
+            )
+        except BaseException:
+            shutil.rmtree(compact_path)
+            raise
+        os.rename(day_path, replaced_path)
+        os.rename(compact_path, day_path)
+        shutil.rmtree(replaced_path)
+        compacted += 1
+        logger.info("Архив %s за %s: %s файлов слито в один", table, day.isoformat(), len(files))
+    return compacted
+
+
+def archive_keyset(time_column: str, cursor: str = None) -> dict:
+    """
+    Условия страницы архива по ключу (time_column, id), как keyset_page_statement для базы
+
+    Args:
+        time_column: Столбец времени
+        cursor: Курсор страницы (None - первая страница)
+
+    Returns:
+        dict: conditions и params (условие курсора), order_by, since и until (отбор каталогов дней)
+    """
+    page = {'conditions': [], 'params': [], 'order_by': f"{time_column} DESC, id DESC", 'since': None, 'until': None}
+    if not cursor:
+        return page
+    direction, sort_value, row_id = decode_page_cursor(cursor)
+    if direction == PAGE_NEXT:
+        page['conditions'].append(f"{time_column} < ? OR ({time_column} = ? AND id < ?)")
+        page['until'] = sort_value
+    else:
+        page['conditions'].append(f"{time_column} > ? OR ({time_column} = ? AND id > ?)")
+        page['order_by'] = f"{time_column}, id"
+        page['since'] = sort_value
+    page['params'].extend([sort_value, sort_value, row_id])
+    return page
+
+
+def _sql_string(value: str) -> str:
+    """Строковый литерал SQL"""
+    return "'" + value.replace("'", "''") + "'"
+
+
+def query_archive(root: str, table: str, columns: list, conditions: list = (), params: list = (),
+                  since: datetime = None, until: datetime = None, order_by: str = None, limit: int = None,
+                  row_filter=None, batch_size: int = ARCHIVE_QUERY_BATCH_SIZE):
+    """
+    Пачки строк архива таблицы, выбранные запросом DuckDB
+
+    Args:
+        root: Корневой каталог архива
+        table: Имя таблицы
+        columns: Имена выбираемых столбцов
+        conditions: Условия WHERE на SQL DuckDB с параметрами ?
+        params: Значения параметров условий по порядку
+        since: Начало периода: отбор каталогов дней (условие по времени задается в conditions)
+        until: Конец периода: отбор каталогов дней
+        order_by: Выражение ORDER BY (опционально)
+        limit: Максимальное количество строк (опционально)
+        row_filter: Дополнительный отбор строк в Python: функция строки -> bool (опционально)
+        batch_size: Строк в одной пачке
+
+    Yields:
+        list: Кортежи в порядке columns
+    """
+    files = archive_files(root, table, since=since, until=until)
+    if not files or limit == 0:
+        return
+
+    duckdb = _import_duckdb()
+    sql = (
+        f"SELECT {', '.join(columns)} "
+        f"FROM read_parquet([{', '.join(_sql_string(path) for path in files)}], union_by_name = true)"
+    )
+    if conditions:
+        sql += " WHERE " + " AND ".join(f"({condition})" for condition in conditions)
+    if order_by:
+        sql += f" ORDER BY {order_by}"
+    # При отборе в Python лимит применяется после отбора
+    if limit is not None and row_filter is None:
+        sql += f" LIMIT {int(limit)}"
+
+    connection = duckdb.connect()
+    try:
+        result = connection.execute(sql, list(params))
+        remaining = limit
+        while remaining is None or remaining > 0:
+            rows = result.fetchmany(batch_size)
+            if not rows:
+                break
+            if row_filter is not None:
+                rows = [row for row in rows if row_filter(row)]
+            if remaining is not None:
+                rows = rows[:remaining]
+                remaining -= len(rows)
+            if rows:
+                yield rows
+    finally:
+        connection.close()
+
+
+def main():
+    from models import (
+        ARCHIVE_TABLES, get_archive_config, archive_old_records, compact_archived_records, prune_archived_records
+    )
+
+    parser = argparse.ArgumentParser(description="Холодный архив сессий и попыток входа")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    archive_parser = subparsers.add_parser('archive', help="Перенести в архив строки старше срока хранения")
+    archive_parser.add_argument('--days', type=int, default=30, help="Срок хранения в базе в днях")
+    days_parser = subparsers.add_parser('days', help="Дни в архиве таблицы")
+    days_parser.add_argument('table', choices=('attempts', 'sessions'))
+    compact_parser = subparsers.add_parser('compact', help="Слить файлы закрытых дней архива в один файл на день")
+    compact_parser.add_argument('--days', type=int, default=30,
+                                help="Срок хранения в базе в днях (день его границы не сливается)")
+    subparsers.add_parser('prune', help="Удалить из архива дни старше archive.retention_days")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    if args.command == 'archive':
+        for table, rows in archive_old_records(days=args.days).items():
+            logger.info("%s: перенесено в архив строк: %s", table, rows)
+    elif args.command == 'days':
+        table = ARCHIVE_TABLES[args.table]
+        for day in list_archive_days(get_archive_config()['path'], table):
+            logger.info("%s", day.isoformat())
+    elif args.command == 'compact':
+        for table, compacted in compact_archived_records(days=args.days).items():
+            logger.info("%s: слито дней: %s", table, compacted)
+    else:
+        for table, removed in prune_archived_records().items():
+            logger.info("%s: удалено дней: %s", table, removed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Сравнение построения таблицы сессий административной панели: прежний путь (словарь на каждую
+строку, форматирование в цикле Python), столбцовый (DataFrame из строк результата и операции
+над столбцами admin_frames) и выбор admin_frames по размеру (цикл по значениям столбцов
+до LOOP_MAX_ROWS строк). Страница панели - от 10 до 1000 строк.
+
+Пример:
+    python bench_admin_frames.py --rows 100 1000 2000 5000 10000 100000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import admin_frames
+from admin_frames import format_sessions_frame, summarize_sessions_by_user
+
+SESSION_COLUMNS = ['id', 'username', 'session_id', 'created_at', 'last_activity', 'ip_address', 'user_agent', 'is_active']
+
+USER_AGENT = 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36'
+
+
+def make_rows(count: int) -> list:
+    """
+    Синтетические строки результата запроса сессий (кортежи в порядке SESSION_COLUMNS)
+
+    Args:
+        count: Количество строк
+
+    Returns:
+        list: Строки результата
+    """
+    started = datetime(2026, 1, 1)
+    rows = []
+    for i in range(count):
+        created_at = started + timedelta(seconds=i * 37)
+        rows.append((
+            i + 1,
+            f"user{i % 500}",
+            f"{i:032x}",
+            created_at,
+            created_at + timedelta(minutes=5) if i % 4 else None,
+            f"10.{i % 256}.{i // 256 % 256}.{i % 7}" if i % 10 else None,
+            USER_AGENT if i % 3 else 'curl/8.0',
+            i % 5 == 0,
+        ))
+    return rows
+
+
+def build_rows_loop(rows: list) -> pd.DataFrame:
+    """Прежний путь: словарь на строку, форматирование каждой строки в цикле"""
+    sessions = [dict(zip(SESSION_COLUMNS, row)) for row in rows]
+    sessions_df_data = []
+    for session in sessions:
+        status_icon = "🟢" if session['is_active'] else "🔴"
+        status_text = "Активна" if session['is_active'] else "Неактивна"
+        sessions_df_data.append({
+            'ID': session['id'],
+            'Пользователь': session['username'],
+            'Статус': f"{status_icon} {status_text}",
+            'IP адрес': session['ip_address'] or 'Не указан',
+            'User Agent': session['user_agent'][:50] + '...' if session['user_agent'] and len(session['user_agent']) > 50 else session['user_agent'] or 'Не указан',
+            'Создана': session['created_at'].strftime('%Y-%m-%d %H:%M:%S'),
+            'Последняя активность': session['last_activity'].strftime('%Y-%m-%d %H:%M:%S') if session['last_activity'] else 'Не указана',
+            'Session ID': session['session_id'][:20] + '...' if len(session['session_id']) > 20 else session['session_id']
+        })
+    return pd.DataFrame(sessions_df_data)
+
+
+def analyze_rows_loop(rows: list) -> list:
+    """Прежний путь: сводка по пользователям циклом по словарям"""
+    user_sessions_stats = {}
+    for row in rows:
+        session = dict(zip(SESSION_COLUMNS, row))
+        stats = user_sessions_stats.setdefault(session['username'], {
+            'total_sessions': 0, 'active_sessions': 0, 'ips': set(),
+            'last_activity': session['last_activity'], 'first_session': session['created_at'],
+        })
+        stats['total_sessions'] += 1
+        if session['is_active']:
+            stats['active_sessions'] += 1
+        if session['ip_address']:
+            stats['ips'].add(session['ip_address'])
+        if session['last_activity'] and (not stats['last_activity'] or session['last_activity'] > stats['last_activity']):
+            stats['last_activity'] = session['last_activity']
+        if session['created_at'] < stats['first_session']:
+            stats['first_session'] = session['created_at']
+    return sorted(user_sessions_stats.items(), key=lambda x: x[1]['total_sessions'], reverse=True)[:10]
+
+
+def build_frame(rows: list) -> pd.DataFrame:
+    """Столбцовый путь: DataFrame из строк результата и векторное форматирование"""
+    frame = pd.DataFrame.from_records(rows, columns=SESSION_COLUMNS)
+    frame['created_at'] = pd.to_datetime(frame['created_at'])
+    frame['last_activity'] = pd.to_datetime(frame['last_activity'])
+    return frame
+
+
+def measure(function, rows: list, repeats: int, loop_max_rows: int = None) -> float:
+    """
+    Медиана времени выполнения в миллисекундах
+
+    Args:
+        loop_max_rows: Порог admin_frames.LOOP_MAX_ROWS на время замера (None - как в admin_frames)
+    """
+    default_loop_max_rows = admin_frames.LOOP_MAX_ROWS
+    if loop_max_rows is not None:
+        admin_frames.LOOP_MAX_ROWS = loop_max_rows
+    try:
+        timings = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            function(rows)
+            timings.append((time.perf_counter() - started) * 1000)
+    finally:
+        admin_frames.LOOP_MAX_ROWS = default_loop_max_rows
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сравнение построения таблицы сессий")
+    parser.add_argument('--rows', type=int, nargs='+', default=[100, 1000, 2000, 5000, 10000, 100000],
+                        help="Размеры выборки")
+    parser.add_argument('--repeats', type=int, default=5, help="Повторов на каждый замер")
+    args = parser.parse_args()
+
+    print(f"📊 Построение таблицы сессий (admin_frames.LOOP_MAX_ROWS = {admin_frames.LOOP_MAX_ROWS})")
+    print("=" * 96)
+    print(f"{'Строк':>8} | {'таблица: прежний':>16} | {'столбцы':>10} | {'admin_frames':>12} | "
+          f"{'сводка: прежний':>15} | {'groupby':>10} | {'admin_frames':>12}")
+    for count in args.rows:
+        rows = make_rows(count)
+        frame = build_frame(rows)
+        format_table = lambda r: format_sessions_frame(build_frame(r))
+        summarize = lambda _: summarize_sessions_by_user(frame)
+        results = [
+            measure(build_rows_loop, rows, args.repeats),
+            measure(format_table, rows, args.repeats, loop_max_rows=0),
+            measure(format_table, rows, args.repeats),
+            measure(analyze_rows_loop, rows, args.repeats),
+            measure(summarize, rows, args.repeats, loop_max_rows=0),
+            measure(summarize, rows, args.repeats),
+        ]
+        print(f"{count:>8} | {results[0]:>13.1f} мс | {results[1]:>7.1f} мс | {results[2]:>9.1f} мс | "
+              f"{results[3]:>12.1f} мс | {results[4]:>7.1f} мс | {results[5]:>9.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Сравнение синхронного (models) и асинхронного (models_async) API под нагрузкой
+из одновременных входов: аутентификация + создание сессии на каждый вход.
+
+Требует запущенный PostgreSQL из docker-compose.yml:
+    python bench_async_logins.py --logins 500 --username Ivan
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import models
+import models_async
+
+
+def _summary(latencies: list, elapsed: float) -> dict:
+    """Сводка по задержкам отдельных входов и общей пропускной способности"""
+    ordered = sorted(latencies)
+    return {
+        'total_seconds': elapsed,
+        'logins_per_second': len(ordered) / elapsed if elapsed else 0.0,
+        'p50_ms': statistics.median(ordered) * 1000,
+        'p95_ms': ordered[int(len(ordered) * 0.95) - 1] * 1000,
+        'max_ms': ordered[-1] * 1000,
+    }
+
+
+def run_sync(logins: int, username: str, workers: int) -> dict:
+    """
+    Одновременные входы через синхронный API в пуле потоков
+
+    Args:
+        logins: Количество входов
+        username: Пользователь с доступом к продуктам
+        workers: Количество потоков
+
+    Returns:
+        dict: Сводка по задержкам и пропускной способности
+    """
+    def login(_):
+        started = time.perf_counter()
+        user_info = models.authenticate_user(username, 'password', ip_address='127.0.0.1')
+        if user_info:
+            models.create_user_session(username, ip_address='127.0.0.1')
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        latencies = list(executor.map(login, range(logins)))
+    return _summary(latencies, time.perf_counter() - started)
+
+
+async def run_async(logins: int, username: str) -> dict:
+    """
+    Одновременные входы через асинхронный API в одном цикле событий
+
+    Args:
+        logins: Количество входов
+        username: Пользователь с доступом к продуктам
+
+    Returns:
+        dict: Сводка по задержкам и пропускной способности
+    """
+    async def login():
+        started = time.perf_counter()
+        user_info = await models_async.authenticate_user(username, 'password', ip_address='127.0.0.1')
+        if user_info:
+            await models_async.create_user_session(username, ip_address='127.0.0.1')
+        return time.perf_counter() - started
+
+    try:
+        started = time.perf_counter()
+        latencies = await asyncio.gather(*(login() for _ in range(logins)))
+        return _summary(latencies, time.perf_counter() - started)
+    finally:
+        await models_async.dispose_async_engine()
+
+
+def _print_result(title: str, result: dict):
+    print(f"{title}:")
+    print(f"   Всего:       {result['total_seconds']:.2f} с ({result['logins_per_second']:.0f} входов/с)")
+    print(f"   p50 / p95:   {result['p50_ms']:.1f} / {result['p95_ms']:.1f} мс")
+    print(f"   Максимум:    {result['max_ms']:.1f} мс")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сравнение sync и async API под нагрузкой входов")
+    parser.add_argument('--logins', type=int, default=500, help="Количество одновременных входов")
+    parser.add_argument('--username', default='Ivan', help="Пользователь с доступом к продуктам")
+    parser.add_argument('--workers', type=int, default=64, help="Потоков для синхронного варианта")
+    args = parser.parse_args()
+
+    print(f"🚀 {args.logins} одновременных входов пользователя {args.username}")
+    print("=" * 50)
+
+    _print_result(f"Синхронный API ({args.workers} потоков)", run_sync(args.logins, args.username, args.workers))
+    print(f"   Пул: {models.get_pool_telemetry()['status']}")
+
+    _print_result("Асинхронный API (asyncio)", asyncio.run(run_async(args.logins, args.username)))
+
+
+if __name__ == "__main__":
+    main()
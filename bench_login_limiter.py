@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Замер стоимости проверки и учета неудачного входа в LoginRateLimiter и памяти на отслеживаемые ключи
+
+Пример:
+    python bench_login_limiter.py --keys 1000 100000 --threads 4
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from login_limiter import LoginRateLimiter
+
+
+def measure_per_call(function, arguments: list) -> float:
+    """Среднее время одного вызова в микросекундах"""
+    started = time.perf_counter()
+    for ip_address, username in arguments:
+        function(ip_address, username)
+    return (time.perf_counter() - started) / len(arguments) * 1e6
+
+
+def measure_limiter(keys: int, calls: int) -> dict:
+    """
+    Стоимость операций ограничителя при заданном количестве отслеживаемых ключей
+
+    Args:
+        keys: Количество различных IP (и имен пользователей)
+        calls: Количество вызовов в каждом замере
+
+    Returns:
+        dict: Время check (разрешенный и заблокированный вход), record_failure в микросекундах
+              и память на один ключ в байтах
+    """
+    limiter = LoginRateLimiter(max_failures_per_ip=20, max_failures_per_username=10, max_keys=keys * 2)
+    arguments = [(f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}", f"user{i}") for i in range(keys)]
+    workload = [arguments[i % keys] for i in range(calls)]
+
+    failure_us = measure_per_call(limiter.record_failure, workload)
+
+    # Память - отдельным заполнением, чтобы tracemalloc не искажал время
+    tracemalloc.start()
+    measured = LoginRateLimiter(max_failures_per_ip=20, max_failures_per_username=10, max_keys=keys * 2)
+    for ip_address, username in arguments:
+        measured.record_failure(ip_address, username)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    allowed_us = measure_per_call(limiter.check, workload)
+
+    # Блокировка одного имени, проверки с разных IP
+    for _ in range(10):
+        limiter.record_failure(None, 'victim')
+    locked = [(ip_address, 'victim') for ip_address, _ in workload]
+    locked_us = measure_per_call(limiter.check, locked)
+
+    return {
+        'record_failure_us': failure_us,
+        'check_allowed_us': allowed_us,
+        'check_locked_us': locked_us,
+        'bytes_per_key': memory / max(measured.stats()['keys'], 1),
+    }
+
+
+def measure_contention(threads: int, calls: int) -> float:
+    """
+    Пропускная способность проверок из нескольких потоков (вызовов в секунду)
+
+    Args:
+        threads: Количество потоков
+        calls: Вызовов check в каждом потоке
+    """
+    limiter = LoginRateLimiter()
+
+    def worker(offset: int):
+        for i in range(calls):
+            limiter.check(f"10.0.{offset}.{i % 256}", f"user{i % 1000}")
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return threads * calls / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замер стоимости ограничителя неудачных входов")
+    parser.add_argument('--keys', type=int, nargs='+', default=[1000, 100000], help="Количество отслеживаемых ключей")
+    parser.add_argument('--calls', type=int, default=200000, help="Вызовов в каждом замере")
+    parser.add_argument('--threads', type=int, default=4, help="Потоков в замере конкурентных проверок")
+    args = parser.parse_args()
+
+    print("🛡️ Ограничитель неудачных входов")
+    print("=" * 72)
+    print(f"{'Ключей':>8} | {'record_failure':>14} | {'check (разрешен)':>16} | {'check (блок)':>12} | {'байт/ключ':>9}")
+    for keys in args.keys:
+        result = measure_limiter(keys, args.calls)
+        print(f"{keys:>8} | {result['record_failure_us']:>10.2f} мкс | {result['check_allowed_us']:>12.2f} мкс | "
+              f"{result['check_locked_us']:>8.2f} мкс | {result['bytes_per_key']:>9.0f}")
+
+    throughput = measure_contention(args.threads, args.calls // args.threads)
+    print(f"check из {args.threads} потоков: {throughput:,.0f} вызовов/с")
+
+
+if __name__ == "__main__":
+    main()
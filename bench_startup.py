@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Замер времени холодного импорта models и накладных расходов на перезапуск скрипта Streamlit
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def measure_cold_import(runs: int = 10) -> dict:
+    """
+    Время импорта models в отдельном процессе и время первого создания движка
+
+    Args:
+        runs: Количество запусков
+
+    Returns:
+        dict: Медианы времени импорта и создания движка в миллисекундах
+    """
+    code = (
+        "import time\n"
+        "started = time.perf_counter()\n"
+        "import models\n"
+        "imported = time.perf_counter()\n"
+        "models.get_engine()\n"
+        "print(imported - started, time.perf_counter() - imported)\n"
+    )
+    import_times = []
+    engine_times = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.split()
+        import_times.append(float(output[0]) * 1000)
+        engine_times.append(float(output[1]) * 1000)
+    return {
+        'import_ms': statistics.median(import_times),
+        'first_engine_ms': statistics.median(engine_times),
+    }
+
+
+def measure_rerun_overhead(iterations: int = 1000) -> dict:
+    """
+    Накладные расходы перезапуска: прежний путь (разбор config.yaml и создание аутентификатора
+    при каждом перезапуске) против кэшированного
+
+    Args:
+        iterations: Количество имитируемых перезапусков
+
+    Returns:
+        dict: Среднее время одного перезапуска в микросекундах
+    """
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+    import models
+
+    results = {}
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        models.load_config()
+    results['config_parse_us'] = (time.perf_counter() - started) / iterations * 1e6
+
+    models.get_config()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        models.get_config()
+    results['config_cached_us'] = (time.perf_counter() - started) / iterations * 1e6
+
+    try:
+        import streamlit_authenticator as stauth
+    except ImportError:
+        return results
+
+    cookie = models.get_config()['cookie']
+    authenticator_iterations = max(iterations // 10, 1)
+    started = time.perf_counter()
+    for _ in range(authenticator_iterations):
+        stauth.Authenticate({'usernames': {}}, cookie['name'], cookie['key'], cookie['expiry_days'])
+    results['authenticator_build_us'] = (time.perf_counter() - started) / authenticator_iterations * 1e6
+
+    return results
+
+
+def main():
+    print("🚀 Замер времени запуска")
+    print("=" * 40)
+
+    cold = measure_cold_import()
+    print(f"Импорт models (медиана):           {cold['import_ms']:.1f} мс")
+    print(f"Первое создание движка (медиана):  {cold['first_engine_ms']:.1f} мс")
+
+    rerun = measure_rerun_overhead()
+    print(f"Разбор config.yaml на перезапуск:  {rerun['config_parse_us']:.1f} мкс")
+    print(f"Кэшированный get_config():         {rerun['config_cached_us']:.3f} мкс")
+    if 'authenticator_build_us' in rerun:
+        print(f"Создание stauth.Authenticate:      {rerun['authenticator_build_us']:.1f} мкс "
+              f"(с st.cache_resource - один раз на процесс)")
+    else:
+        print("streamlit_authenticator не установлен - замер аутентификатора пропущен")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+Построение движка базы данных по настройкам config.yaml и телеметрия пула соединений
+"""
+
+import threading
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import NullPool, QueuePool
+
+
+class PoolTelemetry:
+    """Счетчики работы пула соединений: ожидание, переполнение, таймауты"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {
+            'connects': 0,
+            'checkouts': 0,
+            'checkins': 0,
+            'invalidations': 0,
+            'overflow_events': 0,
+            'timeouts': 0,
+            'wait_seconds_total': 0.0,
+            'max_wait_seconds': 0.0,
+        }
+
+    def increment(self, name: str, value=1):
+        """Увеличение счетчика"""
+        with self._lock:
+            self._counters[name] += value
+
+    def record_wait(self, seconds: float, overflowed: bool = False, timed_out: bool = False):
+        """
+        Учет ожидания соединения из пула
+
+        Args:
+            seconds: Время ожидания
+            overflowed: Соединение открыто сверх pool_size (max_overflow)
+            timed_out: Соединение не получено за pool_timeout
+        """
+        with self._lock:
+            self._counters['wait_seconds_total'] += seconds
+            self._counters['max_wait_seconds'] = max(self._counters['max_wait_seconds'], seconds)
+            if overflowed:
+                self._counters['overflow_events'] += 1
+            if timed_out:
+                self._counters['timeouts'] += 1
+
+    def snapshot(self) -> dict:
+        """
+        Получение текущих значений счетчиков
+
+        Returns:
+            dict: Значения счетчиков и среднее время ожидания соединения
+        """
+        with self._lock:
+            counters = dict(self._counters)
+        checkouts = counters['checkouts']
+        counters['avg_wait_seconds'] = counters['wait_seconds_total'] / checkouts if checkouts else 0.0
+        return counters
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool, измеряющий время ожидания соединения и события переполнения"""
+
+    telemetry = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        overflow_before = self._overflow
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            if self.telemetry is not None:
+                self.telemetry.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        if self.telemetry is not None:
+            self.telemetry.record_wait(
+                time.perf_counter() - started,
+                overflowed=self._overflow > overflow_before and self._overflow > 0
+            )
+        return connection
+
+    def recreate(self):
+        # dispose() пересоздает пул - счетчики переносятся в новый экземпляр
+        pool = super().recreate()
+        pool.telemetry = self.telemetry
+        return pool
+
+
+def build_engine(db_config: dict, telemetry: PoolTelemetry = None):
+    """
+    Создание движка по разделу database из config.yaml
+
+    Args:
+        db_config: Настройки базы данных (url, pool, connect_timeout_seconds,
+                   statement_timeout_ms, pgbouncer, application_name)
+        telemetry: Счетчики пула (опционально)
+
+    Returns:
+        Engine: SQLAlchemy движок
+    """
+    pool_config = db_config.get('pool', {})
+    connect_args = {}
+    engine_kwargs = {}
+
+    connect_timeout = db_config.get('connect_timeout_seconds')
+    if connect_timeout:
+        connect_args['connect_timeout'] = int(connect_timeout)
+
+    # Имя приложения в pg_stat_activity (например, нагрузка, которой принадлежит пул)
+    application_name = db_config.get('application_name')
+    if application_name:
+        connect_args['application_name'] = application_name
+
+    statement_timeout_ms = db_config.get('statement_timeout_ms')
+    pgbouncer = db_config.get('pgbouncer', False)
+
+    if pgbouncer:
+        # Пулом управляет PgBouncer: соединения не удерживаются на стороне приложения,
+        # а параметры старта (options) PgBouncer не пропускает
+        engine_kwargs['poolclass'] = NullPool
+    else:
+        engine_kwargs.update(
+            poolclass=InstrumentedQueuePool,
+            pool_size=pool_config.get('size', 5),
+            max_overflow=pool_config.get('max_overflow', 10),
+            pool_timeout=pool_config.get('timeout_seconds', 30),
+            pool_recycle=pool_config.get('recycle_seconds', -1),
+            pool_pre_ping=pool_config.get('pre_ping', True),
+        )
+        if statement_timeout_ms:
+            connect_args['options'] = f"-c statement_timeout={int(statement_timeout_ms)}"
+
+    engine = create_engine(db_config['url'], connect_args=connect_args, **engine_kwargs)
+
+    if pgbouncer and statement_timeout_ms:
+        @event.listens_for(engine, 'begin')
+        def _set_statement_timeout(connection):
+            # SET LOCAL действует только в текущей транзакции, что безопасно для transaction pooling
+            cursor = connection.connection.dbapi_connection.cursor()
+            cursor.execute("SET LOCAL statement_timeout = %s", (int(statement_timeout_ms),))
+            cursor.close()
+
+    if telemetry is not None:
+        attach_telemetry(engine, telemetry)
+
+    return engine
+
+
+def build_async_engine(db_config: dict, telemetry: PoolTelemetry = None):
+    """
+    Создание асинхронного движка (asyncpg) по разделу database из config.yaml
+
+    Args:
+        db_config: Настройки базы данных (те же, что и для build_engine)
+        telemetry: Счетчики пула (опционально)
+
+    Returns:
+        AsyncEngine: Асинхронный SQLAlchemy движок
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    pool_config = db_config.get('pool', {})
+    url = make_url(db_config['url']).set(drivername='postgresql+asyncpg')
+    connect_args = {}
+    engine_kwargs = {}
+
+    connect_timeout = db_config.get('connect_timeout_seconds')
+    if connect_timeout:
+        connect_args['timeout'] = connect_timeout
+
+    server_settings = {}
+    application_name = db_config.get('application_name')
+    if application_name:
+        server_settings['application_name'] = application_name
+
+    statement_timeout_ms = db_config.get('statement_timeout_ms')
+    if db_config.get('pgbouncer', False):
+        # PgBouncer в режиме transaction pooling не поддерживает именованные prepared statements
+        connect_args['statement_cache_size'] = 0
+        connect_args['prepared_statement_cache_size'] = 0
+        engine_kwargs['poolclass'] = NullPool
+    else:
+        engine_kwargs.update(
+            pool_size=pool_config.get('size', 5),
+            max_overflow=pool_config.get('max_overflow', 10),
+            pool_timeout=pool_config.get('timeout_seconds', 30),
+            pool_recycle=pool_config.get('recycle_seconds', -1),
+            pool_pre_ping=pool_config.get('pre_ping', True),
+        )
+        if statement_timeout_ms:
+            server_settings['statement_timeout'] = str(int(statement_timeout_ms))
+    if server_settings:
+        connect_args['server_settings'] = server_settings
+
+    engine = create_async_engine(url, connect_args=connect_args, **engine_kwargs)
+
+    if db_config.get('pgbouncer', False) and statement_timeout_ms:
+        @event.listens_for(engine.sync_engine, 'begin')
+        def _set_statement_timeout(connection):
+            cursor = connection.connection.dbapi_connection.cursor()
+            cursor.execute(f"SET LOCAL statement_timeout = {int(statement_timeout_ms)}")
+            cursor.close()
+
+    if telemetry is not None:
+        attach_telemetry(engine.sync_engine, telemetry)
+
+    return engine
+
+
+def attach_telemetry(engine, telemetry: PoolTelemetry):
+    """
+    Подключение счетчиков к событиям пула движка
+
+    Args:
+        engine: SQLAlchemy движок
+        telemetry: Счетчики пула
+    """
+    if isinstance(engine.pool, InstrumentedQueuePool):
+        engine.pool.telemetry = telemetry
+
+    @event.listens_for(engine, 'connect')
+    def _on_connect(dbapi_connection, connection_record):
+        telemetry.increment('connects')
+
+    @event.listens_for(engine, 'checkout')
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        telemetry.increment('checkouts')
+
+    @event.listens_for(engine, 'checkin')
+    def _on_checkin(dbapi_connection, connection_record):
+        telemetry.increment('checkins')
+
+    @event.listens_for(engine, 'invalidate')
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        telemetry.increment('invalidations')
+
+
+def get_pool_status(engine, telemetry: PoolTelemetry = None) -> dict:
+    """
+    Получение состояния пула соединений
+
+    Args:
+        engine: SQLAlchemy движок
+        telemetry: Счетчики пула (опционально)
+
+    Returns:
+        dict: Размер пула, количество выданных соединений, переполнение и счетчики телеметрии
+    """
+    pool = engine.pool
+    status = {
+        'pool_class': type(pool).__name__,
+        'status': pool.status(),
+    }
+    if isinstance(pool, QueuePool):
+        status.update(
+            pool_size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+        )
+    if telemetry is not None:
+        status.update(telemetry.snapshot())
+    return status
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Потоковая выгрузка попыток неавторизованного входа и сессий в CSV и Parquet.
+
+Строки читаются курсором на стороне сервера пачками по chunk_size (функции export_* в models.py)
+и сразу дописываются в файл, поэтому расход памяти определяется размером пачки,
+а не размером таблицы. Для Parquet каждая пачка становится отдельной группой строк.
+
+Пример выгрузки за период:
+    python exports.py attempts --format parquet --output attempts.parquet --since 2026-01-01
+    python exports.py sessions --output sessions.csv --active-only
+    python exports.py attempts --output office.csv --ip-network 10.20.0.0/16 --user-agent curl
+    python exports.py attempts --format parquet --output history.parquet --since 2025-01-01 --include-archive
+"""
+
+import argparse
+import csv
+import io
+import logging
+import sys
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+EXPORT_CSV = 'csv'
+EXPORT_PARQUET = 'parquet'
+EXPORT_FORMATS = (EXPORT_CSV, EXPORT_PARQUET)
+
+EXPORT_MIME_TYPES = {
+    EXPORT_CSV: 'text/csv',
+    EXPORT_PARQUET: 'application/vnd.apache.parquet',
+}
+
+# Типы столбцов выгрузки -> типы Arrow (схема задается заранее, чтобы пачки из одних NULL
+# не меняли тип столбца между группами строк)
+_ARROW_TYPES = {
+    'int': lambda pa: pa.int64(),
+    'text': lambda pa: pa.string(),
+    'bool': lambda pa: pa.bool_(),
+    'timestamp': lambda pa: pa.timestamp('us'),
+}
+
+
+def arrow_schema(pa, columns: list):
+    """
+    Схема Arrow для столбцов выгрузки
+
+    Args:
+        pa: Модуль pyarrow
+        columns: Столбцы выгрузки: список пар (имя, тип)
+
+    Returns:
+        pyarrow.Schema: Схема с типами из _ARROW_TYPES
+    """
+    return pa.schema([(name, _ARROW_TYPES[kind](pa)) for name, kind in columns])
+
+
+def write_csv(chunks, output, columns: list) -> int:
+    """
+    Запись пачек строк в CSV с заголовком
+
+    Args:
+        chunks: Итератор пачек (списков кортежей в порядке columns)
+        output: Путь к файлу или двоичный файловый объект
+        columns: Столбцы выгрузки: список пар (имя, тип)
+
+    Returns:
+        int: Количество записанных строк
+    """
+    if isinstance(output, (str, bytes)) or hasattr(output, '__fspath__'):
+        with open(output, 'w', encoding='utf-8', newline='') as stream:
+            return _write_csv_stream(chunks, stream, columns)
+
+    stream = io.TextIOWrapper(output, encoding='utf-8', newline='')
+    try:
+        return _write_csv_stream(chunks, stream, columns)
+    finally:
+        stream.flush()
+        stream.detach()
+
+
+def _write_csv_stream(chunks, stream, columns: list) -> int:
+    """Запись пачек строк в текстовый поток CSV"""
+    writer = csv.writer(stream)
+    writer.writerow([name for name, _ in columns])
+    rows = 0
+    for chunk in chunks:
+        writer.writerows(chunk)
+        rows += len(chunk)
+    return rows
+
+
+def write_parquet(chunks, output, columns: list, compression: str = 'zstd') -> int:
+    """
+    Запись пачек строк в Parquet (одна пачка - одна группа строк)
+
+    Args:
+        chunks: Итератор пачек (списков кортежей в порядке columns)
+        output: Путь к файлу или двоичный файловый объект
+        columns: Столбцы выгрузки: список пар (имя, тип)
+        compression: Сжатие страниц Parquet
+
+    Returns:
+        int: Количество записанных строк
+
+    Raises:
+        RuntimeError: pyarrow не установлен
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("Для выгрузки в Parquet требуется пакет pyarrow") from e
+
+    schema = arrow_schema(pa, columns)
+    rows = 0
+    with pq.ParquetWriter(output, schema, compression=compression) as writer:
+        for chunk in chunks:
+            if not chunk:
+                continue
+            writer.write_batch(record_batch(pa, chunk, schema))
+            rows += len(chunk)
+    return rows
+
+
+def record_batch(pa, rows: list, schema):
+    """
+    Пачка строк (список кортежей в порядке столбцов схемы) в виде RecordBatch
+
+    Args:
+        pa: Модуль pyarrow
+        rows: Непустой список строк
+        schema: Схема из arrow_schema
+
+    Returns:
+        pyarrow.RecordBatch: Столбцы пачки
+    """
+    arrays = [
+        pa.array(values, type=field.type)
+        for values, field in zip(zip(*rows), schema)
+    ]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def write_export(chunks, output, columns: list, export_format: str = EXPORT_CSV) -> int:
+    """
+    Запись пачек строк в файл выбранного формата
+
+    Args:
+        chunks: Итератор пачек (списков кортежей в порядке columns)
+        output: Путь к файлу или двоичный файловый объект
+        columns: Столбцы выгрузки: список пар (имя, тип)
+        export_format: csv или parquet
+
+    Returns:
+        int: Количество записанных строк
+    """
+    if export_format == EXPORT_CSV:
+        return write_csv(chunks, output, columns)
+    if export_format == EXPORT_PARQUET:
+        return write_parquet(chunks, output, columns)
+    raise ValueError(f"Неизвестный формат выгрузки: {export_format}")
+
+
+def main():
+    from models import export_unauthorized_login_attempts, export_user_sessions
+
+    parser = argparse.ArgumentParser(description="Выгрузка попыток неавторизованного входа и сессий")
+    parser.add_argument('table', choices=('attempts', 'sessions'),
+                        help="attempts - попытки неавторизованного входа, sessions - сессии пользователей")
+    parser.add_argument('--output', required=True, help="Файл выгрузки ('-' - стандартный вывод, только CSV)")
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default=EXPORT_CSV, dest='export_format')
+    parser.add_argument('--username', help="Только этот пользователь")
+    parser.add_argument('--username-pattern', help="Шаблон имени пользователя (* - любые символы)")
+    parser.add_argument('--user-agent', dest='user_agent_contains', help="Подстрока User Agent")
+    parser.add_argument('--ip-network', help="IP адрес или сеть CIDR")
+    parser.add_argument('--since', type=datetime.fromisoformat, help="Начало периода (попытки)")
+    parser.add_argument('--until', type=datetime.fromisoformat, help="Конец периода (попытки)")
+    parser.add_argument('--active-only', action='store_true', help="Только активные сессии")
+    parser.add_argument('--chunk-size', type=int, help="Строк в одной пачке")
+    parser.add_argument('--include-archive', action='store_true', help="Выгрузить также строки холодного архива")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s', stream=sys.stderr)
+    if args.output == '-' and args.export_format != EXPORT_CSV:
+        parser.error("В стандартный вывод можно выгрузить только CSV")
+    output = sys.stdout.buffer if args.output == '-' else args.output
+
+    search = {
+        'username_pattern': args.username_pattern,
+        'user_agent_contains': args.user_agent_contains,
+        'ip_network': args.ip_network,
+        'include_archive': args.include_archive,
+    }
+    started = time.perf_counter()
+    if args.table == 'attempts':
+        rows = export_unauthorized_login_attempts(
+            output, export_format=args.export_format, username=args.username,
+            since=args.since, until=args.until, chunk_size=args.chunk_size, **search
+        )
+    else:
+        rows = export_user_sessions(
+            output, export_format=args.export_format, username=args.username,
+            active_only=args.active_only, chunk_size=args.chunk_size, **search
+        )
+    logger.info("Выгружено строк: %s за %.1f с", rows, time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+"""
+Фоновая пакетная запись попыток неавторизованного входа через ограниченную очередь
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+from collections import deque
+from datetime import datetime
+
+from sqlalchemy import exc as sa_exc
+
+logger = logging.getLogger(__name__)
+
+# Политики поведения при переполнении очереди
+OVERFLOW_BLOCK = 'block'
+OVERFLOW_DROP_OLDEST = 'drop_oldest'
+OVERFLOW_SPOOL = 'spool'
+OVERFLOW_POLICIES = (OVERFLOW_BLOCK, OVERFLOW_DROP_OLDEST, OVERFLOW_SPOOL)
+
+# Временные ошибки (соединение, пул): пачка записывается повторно. Остальные ошибки считаются
+# ошибками данных - повтор той же пачки снова завершится ошибкой
+RETRYABLE_ERRORS = (sa_exc.OperationalError, sa_exc.InterfaceError, sa_exc.TimeoutError, sa_exc.DisconnectionError)
+
+
+class UnauthorizedAttemptWriter:
+    """
+    Очередь попыток входа, которую фоновый поток записывает в базу пачками.
+
+    При переполнении очереди действует политика overflow_policy:
+    - block: вызывающий поток ждет освобождения места (не дольше block_timeout_seconds)
+    - drop_oldest: из очереди вытесняется самая старая запись
+    - spool: запись дописывается в локальный файл и загружается в базу позже
+
+    Пачка, отклоненная базой не из-за временной ошибки, записывается по одной записи: отклоненные
+    записи попадают в журнал и счетчик failed и повторно не записываются.
+    """
+
+    def __init__(self, write_batch, queue_size: int = 10000, batch_size: int = 500,
+                 flush_interval_seconds: float = 1.0, overflow_policy: str = OVERFLOW_DROP_OLDEST,
+                 spool_path: str = 'unauthorized_attempts.spool', block_timeout_seconds: float = 5.0):
+        """
+        Args:
+            write_batch: Функция записи пачки, принимает список словарей с полями попытки
+            queue_size: Максимальное количество записей в очереди
+            batch_size: Максимальное количество записей в одной пачке
+            flush_interval_seconds: Максимальное время ожидания новых записей перед записью пачки
+            overflow_policy: Политика при переполнении очереди (block, drop_oldest, spool)
+            spool_path: Файл для сохранения записей при политике spool
+            block_timeout_seconds: Максимальное ожидание места в очереди при политике block
+        """
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Неизвестная политика переполнения: {overflow_policy}")
+
+        self.write_batch = write_batch
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self.overflow_policy = overflow_policy
+        self.spool_path = spool_path
+        self.block_timeout_seconds = block_timeout_seconds
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._spool_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._counters = {
+            'queued': 0,
+            'written': 0,
+            'dropped': 0,
+            'spooled': 0,
+            'replayed': 0,
+            'failed_batches': 0,
+            'failed': 0,
+        }
+
+    def submit(self, record: dict) -> bool:
+        """
+        Постановка попытки входа в очередь на запись
+
+        Args:
+            record: Поля попытки (username, ip_address, user_agent, reason, attempted_at)
+
+        Returns:
+            bool: True если запись принята в очередь или в файл, False если отброшена
+        """
+        spool = False
+        with self._condition:
+            if len(self._queue) >= self.queue_size:
+                if self.overflow_policy == OVERFLOW_BLOCK:
+                    has_room = self._condition.wait_for(
+                        lambda: len(self._queue) < self.queue_size or self._stop_event.is_set(),
+                        timeout=self.block_timeout_seconds
+                    )
+                    if not has_room or len(self._queue) >= self.queue_size:
+                        self._counters['dropped'] += 1
+                        return False
+                elif self.overflow_policy == OVERFLOW_DROP_OLDEST:
+                    self._queue.popleft()
+                    self._counters['dropped'] += 1
+                else:
+                    self._counters['spooled'] += 1
+                    spool = True
+
+            if not spool:
+                self._queue.append(record)
+                self._counters['queued'] += 1
+                if len(self._queue) >= self.batch_size:
+                    self._condition.notify_all()
+                return True
+
+        # Запись в файл выполняется вне блокировки очереди
+        self._spool([record])
+        return True
+
+    def start(self):
+        """Запуск фонового потока записи (однократно)"""
+        if self._thread is not None:
+            return
+        with self._condition:
+            if self._thread is not None:
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name='unauthorized-attempt-writer', daemon=True)
+            self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Остановка фонового потока с записью оставшихся в очереди попыток"""
+        self._stop_event.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval_seconds + 10)
+            self._thread = None
+        while self._write_next_batch():
+            pass
+
+    def stats(self) -> dict:
+        """
+        Получение счетчиков очереди
+
+        Returns:
+            dict: Количество поставленных в очередь, записанных, отброшенных, отклоненных базой
+                  и сохраненных в файл попыток
+        """
+        with self._condition:
+            stats = dict(self._counters)
+            stats['queue_length'] = len(self._queue)
+            stats['queue_size'] = self.queue_size
+            stats['overflow_policy'] = self.overflow_policy
+        stats['spool_pending'] = os.path.exists(self.spool_path)
+        return stats
+
+    def _take_batch(self) -> list:
+        """Извлечение из очереди очередной пачки"""
+        with self._condition:
+            batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+            if batch:
+                self._condition.notify_all()
+            return batch
+
+    def _write_next_batch(self) -> bool:
+        """
+        Запись одной пачки из очереди
+
+        Returns:
+            bool: True если пачка была записана, False если очередь пуста или запись не удалась
+        """
+        batch = self._take_batch()
+        if not batch:
+            return False
+
+        _, unwritten = self._write(batch)
+        if unwritten:
+            self._requeue(unwritten)
+            return False
+        return True
+
+    def _write(self, batch: list) -> tuple:
+        """
+        Запись пачки; при ошибке данных - по одной записи с отбрасыванием отклоненных
+
+        Returns:
+            tuple: Количество записанных записей и незаписанный из-за временной ошибки остаток
+        """
+        try:
+            self.write_batch(batch)
+        except RETRYABLE_ERRORS as e:
+            logger.warning("Не удалось записать %d попыток входа: %s", len(batch), e)
+            with self._condition:
+                self._counters['failed_batches'] += 1
+            return 0, batch
+        except Exception as e:
+            logger.warning("База отклонила пачку из %d попыток входа, запись по одной: %s", len(batch), e)
+            with self._condition:
+                self._counters['failed_batches'] += 1
+        else:
+            with self._condition:
+                self._counters['written'] += len(batch)
+            return len(batch), []
+
+        written = 0
+        for index, record in enumerate(batch):
+            try:
+                self.write_batch([record])
+            except RETRYABLE_ERRORS as e:
+                logger.warning("Не удалось записать %d попыток входа: %s", len(batch) - index, e)
+                return written, batch[index:]
+            except Exception as e:
+                logger.error("Попытка входа отклонена базой и не будет записана: %r: %s", record, e)
+                with self._condition:
+                    self._counters['failed'] += 1
+                continue
+            written += 1
+            with self._condition:
+                self._counters['written'] += 1
+        return written, []
+
+    def _requeue(self, batch: list):
+        """Возврат пачки, не записанной из-за временной ошибки: в файл при политике spool, иначе в начало очереди"""
+        if self.overflow_policy == OVERFLOW_SPOOL:
+            self._spool(batch)
+            with self._condition:
+                self._counters['spooled'] += len(batch)
+            return
+
+        with self._condition:
+            self._queue.extendleft(reversed(batch))
+            while len(self._queue) > self.queue_size:
+                # Пачка возвращается в начало, поэтому лишними оказываются самые свежие записи
+                self._queue.pop()
+                self._counters['dropped'] += 1
+
+    def _spool(self, records: list):
+        """Дописывание записей в локальный файл в формате JSON Lines"""
+        with self._spool_lock:
+            with open(self.spool_path, 'a', encoding='utf-8') as file:
+                for record in records:
+                    file.write(json.dumps(record, default=_serialize_datetime, ensure_ascii=False) + '\n')
+
+    def _replay_spool(self):
+        """Загрузка в базу записей, накопленных в локальном файле"""
+        if not os.path.exists(self.spool_path):
+            return
+
+        replay_path = self.spool_path + '.replay'
+        with self._spool_lock:
+            if not os.path.exists(replay_path):
+                os.replace(self.spool_path, replay_path)
+
+        with open(replay_path, encoding='utf-8') as file:
+            records = [_deserialize_record(json.loads(line)) for line in file if line.strip()]
+
+        for start in range(0, len(records), self.batch_size):
+            batch = records[start:start + self.batch_size]
+            written, unwritten = self._write(batch)
+            with self._condition:
+                self._counters['replayed'] += written
+            if unwritten:
+                logger.warning("Загрузка попыток входа из %s прервана временной ошибкой", replay_path)
+                # Незагруженный остаток возвращается в файл; загруженное и отклоненное повторно не записывается
+                self._spool(unwritten + records[start + len(batch):])
+                os.remove(replay_path)
+                return
+
+        os.remove(replay_path)
+
+    def _run(self):
+        """Цикл фоновой записи пачек"""
+        backoff = self.flush_interval_seconds
+        while not self._stop_event.is_set():
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: len(self._queue) >= self.batch_size or self._stop_event.is_set(),
+                    timeout=self.flush_interval_seconds
+                )
+
+            if not self._queue:
+                try:
+                    self._replay_spool()
+                except Exception as e:
+                    logger.warning("Ошибка загрузки файла %s: %s", self.spool_path, e)
+                continue
+
+            if self._write_next_batch():
+                backoff = self.flush_interval_seconds
+            else:
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, 60)
+
+
+def _serialize_datetime(value):
+    """Сериализация datetime для JSON"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Тип {type(value).__name__} не сериализуется в JSON")
+
+
+def _deserialize_record(record: dict) -> dict:
+    """Восстановление datetime-полей записи, прочитанной из файла"""
+    if record.get('attempted_at'):
+        record['attempted_at'] = datetime.fromisoformat(record['attempted_at'])
+    return record
@@ -0,0 +1,170 @@
+"""
+Ограничение частоты неудачных входов в процессе приложения.
+
+Для каждого IP и имени пользователя хранится кольцевой буфер времени последних неудачных попыток
+(не больше порога). Если буфер заполнен и самая старая попытка моложе окна, ключ блокируется
+на lockout_seconds, и проверка отклоняет вход до обращения к базе данных.
+Память ограничена: ключи упорядочены по последнему обращению, простаивающие удаляются,
+а при превышении max_keys вытесняются самые давно использованные.
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+
+SCOPE_IP = 'ip'
+SCOPE_USERNAME = 'username'
+
+
+class _FailureWindow:
+    """Неудачные попытки одного ключа в скользящем окне"""
+
+    __slots__ = ('failures', 'locked_until', 'last_seen')
+
+    def __init__(self, max_failures: int):
+        self.failures = deque(maxlen=max_failures)
+        self.locked_until = 0.0
+        self.last_seen = 0.0
+
+
+class LoginRateLimiter:
+    """
+    Скользящее окно неудачных входов по IP и по имени пользователя
+    """
+
+    def __init__(self, window_seconds: float = 300, max_failures_per_ip: int = 20,
+                 max_failures_per_username: int = 10, lockout_seconds: float = 300,
+                 max_keys: int = 100000, clock=time.monotonic):
+        """
+        Args:
+            window_seconds: Длительность скользящего окна
+            max_failures_per_ip: Неудачных попыток с одного IP за окно до блокировки (0 - без ограничения)
+            max_failures_per_username: Неудачных попыток для одного имени за окно до блокировки
+                                       (0 - без ограничения)
+            lockout_seconds: Длительность блокировки
+            max_keys: Максимальное количество отслеживаемых ключей
+            clock: Источник времени в секундах (для тестов)
+        """
+        self.window_seconds = window_seconds
+        self.lockout_seconds = lockout_seconds
+        self.max_keys = max_keys
+        self._limits = {
+            SCOPE_IP: max_failures_per_ip,
+            SCOPE_USERNAME: max_failures_per_username,
+        }
+        self._idle_seconds = max(window_seconds, lockout_seconds)
+        self._clock = clock
+        self._windows = OrderedDict()
+        self._lock = threading.Lock()
+        self._checks = 0
+        self._rejected = 0
+        self._lockouts = 0
+        self._evicted = 0
+
+    def _keys(self, ip_address: str, username: str):
+        """Ключи (область, значение), для которых включено ограничение"""
+        if ip_address and self._limits[SCOPE_IP] > 0:
+            yield SCOPE_IP, ip_address
+        if username and self._limits[SCOPE_USERNAME] > 0:
+            yield SCOPE_USERNAME, username
+
+    def check(self, ip_address: str = None, username: str = None):
+        """
+        Проверка блокировки перед входом
+
+        Args:
+            ip_address: IP адрес
+            username: Имя пользователя
+
+        Returns:
+            dict: scope, key и retry_after (секунды до снятия блокировки) или None, если вход разрешен
+        """
+        now = self._clock()
+        with self._lock:
+            self._checks += 1
+            for key in self._keys(ip_address, username):
+                window = self._windows.get(key)
+                if window is not None and window.locked_until > now:
+                    self._rejected += 1
+                    return {'scope': key[0], 'key': key[1], 'retry_after': window.locked_until - now}
+        return None
+
+    def record_failure(self, ip_address: str = None, username: str = None) -> list:
+        """
+        Учет неудачного входа
+
+        Args:
+            ip_address: IP адрес
+            username: Имя пользователя
+
+        Returns:
+            list: Блокировки, начавшиеся из-за этой попытки (словари scope, key, failures, lockout_seconds)
+        """
+        now = self._clock()
+        lockouts = []
+        with self._lock:
+            for key in self._keys(ip_address, username):
+                limit = self._limits[key[0]]
+                window = self._windows.get(key)
+                if window is None:
+                    window = self._windows[key] = _FailureWindow(limit)
+                else:
+                    self._windows.move_to_end(key)
+                window.last_seen = now
+                if window.locked_until > now:
+                    continue
+
+                window.failures.append(now)
+                if len(window.failures) == limit and now - window.failures[0] <= self.window_seconds:
+                    window.locked_until = now + self.lockout_seconds
+                    window.failures.clear()
+                    self._lockouts += 1
+                    lockouts.append({
+                        'scope': key[0],
+                        'key': key[1],
+                        'failures': limit,
+                        'lockout_seconds': self.lockout_seconds,
+                    })
+            self._evict(now)
+        return lockouts
+
+    def record_success(self, username: str = None):
+        """
+        Сброс неудачных попыток имени пользователя после успешного входа
+
+        Args:
+            username: Имя пользователя
+        """
+        with self._lock:
+            window = self._windows.get((SCOPE_USERNAME, username))
+            if window is not None and window.locked_until <= self._clock():
+                del self._windows[(SCOPE_USERNAME, username)]
+
+    def _evict(self, now: float):
+        """Удаление простаивающих ключей и вытеснение самых давно использованных сверх max_keys"""
+        while self._windows:
+            key, window = next(iter(self._windows.items()))
+            if len(self._windows) <= self.max_keys and (
+                    now - window.last_seen < self._idle_seconds or window.locked_until > now):
+                break
+            del self._windows[key]
+            self._evicted += 1
+
+    def stats(self) -> dict:
+        """
+        Получение статистики ограничителя
+
+        Returns:
+            dict: Количество ключей и заблокированных ключей, проверок, отклоненных входов,
+                  блокировок и вытесненных ключей
+        """
+        now = self._clock()
+        with self._lock:
+            return {
+                'keys': len(self._windows),
+                'locked_keys': sum(1 for window in self._windows.values() if window.locked_until > now),
+                'checks': self._checks,
+                'rejected': self._rejected,
+                'lockouts': self._lockouts,
+                'evicted': self._evicted,
+            }
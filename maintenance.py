@@ -0,0 +1,193 @@
+"""
+Фоновый планировщик задач обслуживания базы данных (очистка сессий и попыток входа)
+"""
+
+import atexit
+import logging
+import threading
+import time
+import zlib
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+
+class MaintenanceJob:
+    """Описание периодической задачи обслуживания"""
+
+    def __init__(self, name: str, func, interval_seconds: float, kwargs: dict = None):
+        """
+        Args:
+            name: Имя задачи (используется в журнале запусков и для advisory lock)
+            func: Функция задачи, возвращающая количество удаленных (обработанных) строк
+            interval_seconds: Период запуска задачи
+            kwargs: Аргументы функции задачи
+        """
+        self.name = name
+        self.func = func
+        self.interval_seconds = interval_seconds
+        self.kwargs = kwargs or {}
+        # Ключ advisory lock одинаков во всех экземплярах приложения
+        self.lock_key = zlib.crc32(f"maintenance:{name}".encode('utf-8'))
+
+
+class MaintenanceScheduler:
+    """
+    Планировщик задач обслуживания.
+
+    Каждый процесс приложения запускает один фоновый поток, но задача выполняется
+    только под advisory lock PostgreSQL и только если с момента последнего успешного
+    запуска (в любом экземпляре) прошло не меньше interval_seconds. Каждый запуск
+    записывается в таблицу maintenance_runs.
+    """
+
+    def __init__(self, engine, jobs: list, poll_seconds: float = 30):
+        """
+        Args:
+            engine: SQLAlchemy движок
+            jobs: Список задач MaintenanceJob
+            poll_seconds: Период проверки наступления сроков задач
+        """
+        self.engine = engine
+        self.jobs = jobs
+        self.poll_seconds = poll_seconds
+        self._next_due = {job.name: 0.0 for job in jobs}
+        self._last_runs = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Запуск фонового потока планировщика (однократно)"""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name='maintenance-scheduler', daemon=True)
+            self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Остановка фонового потока планировщика"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def run_pending(self):
+        """Запуск всех задач, срок которых наступил"""
+        for job in self.jobs:
+            if self._stop_event.is_set():
+                return
+            if self._next_due[job.name] > time.monotonic():
+                continue
+            try:
+                self.run_job(job)
+            except Exception as e:
+                logger.warning("Ошибка задачи обслуживания %s: %s", job.name, e)
+                self._next_due[job.name] = time.monotonic() + min(job.interval_seconds, 60)
+
+    def run_job(self, job: MaintenanceJob, force: bool = False) -> dict:
+        """
+        Выполнение задачи под advisory lock
+
+        Args:
+            job: Задача обслуживания
+            force: Выполнить задачу, даже если интервал с прошлого запуска не истек
+
+        Returns:
+            dict: Результат запуска или None если задача пропущена
+        """
+        with self.engine.connect() as connection:
+            locked = connection.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {'key': job.lock_key}
+            ).scalar()
+            connection.commit()
+            if not locked:
+                # Задачу прямо сейчас выполняет другой экземпляр приложения
+                self._next_due[job.name] = time.monotonic() + self.poll_seconds
+                return None
+
+            try:
+                if not force:
+                    seconds_since_last = connection.execute(text("""
+                        SELECT EXTRACT(EPOCH FROM CURRENT_TIMESTAMP - MAX(finished_at))
+                        FROM maintenance_runs
+                        WHERE job_name = :job_name AND status = 'success'
+                    """), {'job_name': job.name}).scalar()
+                    connection.commit()
+                    if seconds_since_last is not None and seconds_since_last < job.interval_seconds:
+                        self._next_due[job.name] = time.monotonic() + job.interval_seconds - float(seconds_since_last)
+                        return None
+
+                return self._execute(connection, job)
+            finally:
+                connection.execute(text("SELECT pg_advisory_unlock(:key)"), {'key': job.lock_key})
+                connection.commit()
+
+    def stats(self) -> dict:
+        """
+        Получение результатов последних запусков задач в этом процессе
+
+        Returns:
+            dict: Имя задачи -> длительность, количество удаленных строк и статус последнего запуска
+        """
+        with self._lock:
+            return {name: dict(run) for name, run in self._last_runs.items()}
+
+    def _execute(self, connection, job: MaintenanceJob) -> dict:
+        """Выполнение задачи и запись результата в maintenance_runs"""
+        started = time.perf_counter()
+        rows_deleted = 0
+        status = 'success'
+        error = None
+        try:
+            rows_deleted = job.func(**job.kwargs) or 0
+        except Exception as e:
+            status = 'error'
+            error = str(e)
+            logger.warning("Задача обслуживания %s завершилась ошибкой: %s", job.name, e)
+        duration = time.perf_counter() - started
+
+        connection.execute(text("""
+            INSERT INTO maintenance_runs (job_name, started_at, finished_at, duration_seconds, rows_deleted, status, error)
+            VALUES (
+                :job_name,
+                CURRENT_TIMESTAMP - :duration * INTERVAL '1 second',
+                CURRENT_TIMESTAMP,
+                :duration,
+                :rows_deleted,
+                :status,
+                :error
+            )
+        """), {
+            'job_name': job.name,
+            'duration': duration,
+            'rows_deleted': rows_deleted,
+            'status': status,
+            'error': error
+        })
+        connection.commit()
+
+        run = {
+            'duration_seconds': duration,
+            'rows_deleted': rows_deleted,
+            'status': status,
+            'error': error,
+            'finished_at': time.time()
+        }
+        with self._lock:
+            self._last_runs[job.name] = run
+        self._next_due[job.name] = time.monotonic() + (
+            job.interval_seconds if status == 'success' else min(job.interval_seconds, 60)
+        )
+        return run
+
+    def _run(self):
+        """Цикл фонового потока планировщика"""
+        while not self._stop_event.is_set():
+            self.run_pending()
+            self._stop_event.wait(self.poll_seconds)
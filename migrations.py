@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Версионные миграции схемы и проверка расхождения схемы базы с моделями ORM.
+
+Каждая версия схемы - файл schema/NNNN_имя.sql с полным SQL изменения (таблицы, секционирование,
+индексы, функции и триггеры). Выпущенный файл не изменяется: миграции не зависят от текущих моделей,
+и база, обновленная с любой версии, проходит те же шаги. init.sql применяет те же файлы (\\ir),
+поэтому база из init.sql и база после python migrations.py upgrade совпадают.
+Примененные версии записываются в таблицу schema_migrations; каждая миграция выполняется в своей транзакции
+под рекомендательной блокировкой, поэтому одновременный запуск из нескольких процессов безопасен.
+Модели ORM описывают схему последней версии, что проверяет check_drift.
+
+Пример:
+    python migrations.py status
+    python migrations.py upgrade
+    python migrations.py check
+"""
+
+import argparse
+import logging
+import os
+import re
+import sys
+
+from sqlalchemy import UniqueConstraint, inspect, text
+from sqlalchemy.sql import operators
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_MIGRATIONS_TABLE = 'schema_migrations'
+
+_CREATE_MIGRATIONS_TABLE_SQL = text(f"""
+    CREATE TABLE IF NOT EXISTS {SCHEMA_MIGRATIONS_TABLE} (
+        version INTEGER PRIMARY KEY,
+        name VARCHAR(200) NOT NULL,
+        applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+""")
+
+# Одна миграция в один момент времени во всех процессах
+_MIGRATION_LOCK_SQL = text(f"SELECT pg_advisory_xact_lock(hashtext('{SCHEMA_MIGRATIONS_TABLE}'))")
+
+_APPLIED_VERSIONS_SQL = text(f"SELECT version FROM {SCHEMA_MIGRATIONS_TABLE} ORDER BY version")
+
+_INSERT_VERSION_SQL = text(f"INSERT INTO {SCHEMA_MIGRATIONS_TABLE} (version, name) VALUES (:version, :name)")
+
+
+# Каталог файлов миграций
+SCHEMA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schema')
+
+# Имя файла миграции: номер версии и имя
+_MIGRATION_FILE_RE = re.compile(r'^(\d+)_(\w+)\.sql$')
+
+
+class Migration:
+    """
+    Версия схемы: номер, имя и операции, выполняемые в одной транзакции
+    """
+
+    __slots__ = ('version', 'name', 'operations')
+
+    def __init__(self, version: int, name: str, *operations):
+        """
+        Args:
+            version: Номер версии (возрастает по порядку миграций)
+            name: Короткое имя миграции
+            operations: Функции (connection) -> None
+        """
+        self.version = version
+        self.name = name
+        self.operations = operations
+
+
+def execute_sql_file(path: str):
+    """Операция миграции: выполнение SQL-файла целиком (несколько выражений, тела функций в $$)"""
+    def operation(connection):
+        with open(path, encoding='utf-8') as file:
+            sql = file.read()
+        # Курсор драйвера без параметров передает текст как есть (символы % и : не интерпретируются)
+        cursor = connection.connection.dbapi_connection.cursor()
+        try:
+            cursor.execute(sql)
+        finally:
+            cursor.close()
+    return operation
+
+
+def load_migrations(directory: str = SCHEMA_DIR) -> list:
+    """
+    Миграции из файлов NNNN_имя.sql каталога
+
+    Args:
+        directory: Каталог файлов миграций
+
+    Returns:
+        list: Миграции по возрастанию версии
+    """
+    migrations = []
+    for file_name in sorted(os.listdir(directory)):
+        match = _MIGRATION_FILE_RE.match(file_name)
+        if match:
+            migrations.append(Migration(
+                int(match.group(1)), match.group(2), execute_sql_file(os.path.join(directory, file_name))
+            ))
+    migrations.sort(key=lambda migration: migration.version)
+    _check_order(migrations)
+    return migrations
+
+
+def _check_order(migrations: list):
+    """Проверка, что версии миграций уникальны и возрастают"""
+    versions = [migration.version for migration in migrations]
+    if versions != sorted(set(versions)):
+        raise ValueError(f"Версии миграций должны возрастать без повторов: {versions}")
+
+
+def get_applied_versions(connection) -> list:
+    """
+    Примененные версии схемы
+
+    Args:
+        connection: Соединение SQLAlchemy
+
+    Returns:
+        list: Номера версий по возрастанию (пустой список, если миграции не применялись)
+    """
+    if connection.execute(text("SELECT to_regclass(:table)"), {'table': SCHEMA_MIGRATIONS_TABLE}).scalar() is None:
+        return []
+    return list(connection.execute(_APPLIED_VERSIONS_SQL).scalars())
+
+
+def get_pending_migrations(connection, migrations: list) -> list:
+    """
+    Миграции, которые еще не применены к базе
+
+    Args:
+        connection: Соединение SQLAlchemy
+        migrations: Список миграций
+
+    Returns:
+        list: Миграции по возрастанию версии
+    """
+    applied = set(get_applied_versions(connection))
+    return [migration for migration in migrations if migration.version not in applied]
+
+
+def upgrade(connection, migrations: list, target: int = None) -> list:
+    """
+    Применение недостающих миграций по порядку
+
+    Args:
+        connection: Соединение SQLAlchemy
+        migrations: Список миграций
+        target: Последняя применяемая версия (по умолчанию - все)
+
+    Returns:
+        list: Номера примененных версий
+    """
+    _check_order(migrations)
+    try:
+        connection.execute(_CREATE_MIGRATIONS_TABLE_SQL)
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+
+    applied = []
+    for migration in migrations:
+        if target is not None and migration.version > target:
+            break
+        try:
+            connection.execute(_MIGRATION_LOCK_SQL)
+            # Версии перечитываются под блокировкой: миграцию мог применить другой процесс
+            if migration.version in set(connection.execute(_APPLIED_VERSIONS_SQL).scalars()):
+                connection.rollback()
+                continue
+            for operation in migration.operations:
+                operation(connection)
+            connection.execute(_INSERT_VERSION_SQL, {'version': migration.version, 'name': migration.name})
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        applied.append(migration.version)
+        logger.info("Применена миграция %s: %s", migration.version, migration.name)
+    return applied
+
+
+def _normalize_predicate(predicate) -> str:
+    """Условие частичного индекса без внешних скобок, пробелов и регистра"""
+    if predicate is None:
+        return None
+    predicate = re.sub(r'\s+', ' ', str(predicate)).strip().lower()
+    while predicate.startswith('(') and predicate.endswith(')'):
+        predicate = predicate[1:-1].strip()
+    return predicate
+
+
+def _declared_index_signature(index, dialect) -> tuple:
+    """Описание индекса из метаданных: уникальность, столбцы с направлением, метод, условие"""
+    columns = []
+    for expression in index.expressions:
+        if getattr(expression, 'modifier', None) is operators.desc_op:
+            columns.append((expression.element.name, 'desc'))
+        else:
+            columns.append((expression.name, ''))
+
+    options = index.dialect_options['postgresql']
+    where = options.get('where')
+    if where is not None:
+        where = where.compile(dialect=dialect, compile_kwargs={'literal_binds': True})
+    return bool(index.unique), tuple(columns), options.get('using') or 'btree', _normalize_predicate(where)
+
+
+def _reflected_index_signature(index: dict) -> tuple:
+    """Описание индекса из базы в том же виде, что и _declared_index_signature"""
+    sorting = index.get('column_sorting') or {}
+    columns = tuple(
+        (name, 'desc' if 'desc' in sorting.get(name, ()) else '')
+        for name in index['column_names']
+    )
+    options = index.get('dialect_options') or {}
+    return (
+        bool(index['unique']), columns, options.get('postgresql_using') or 'btree',
+        _normalize_predicate(options.get('postgresql_where')),
+    )
+
+
+def check_drift(connection, metadata, partition_keys: dict = None) -> list:
+    """
+    Сравнение схемы базы с метаданными ORM
+
+    Сравниваются таблицы, столбцы (тип и NULL), первичные ключи, ограничения уникальности и индексы.
+    Таблицы базы, не описанные в метаданных (секции, schema_migrations), не проверяются.
+
+    Args:
+        connection: Соединение SQLAlchemy
+        metadata: Метаданные ORM
+        partition_keys: Секционированные таблицы: таблица -> столбец секционирования
+                        (первичный ключ секционированной таблицы дополнен этим столбцом)
+
+    Returns:
+        list: Описания расхождений (пустой список, если схема совпадает)
+    """
+    partition_keys = partition_keys or {}
+    dialect = connection.dialect
+    inspector = inspect(connection)
+    existing_tables = set(inspector.get_table_names())
+    drift = []
+
+    for table in metadata.sorted_tables:
+        if table.name not in existing_tables:
+            drift.append(f"{table.name}: таблица отсутствует")
+            continue
+
+        reflected_columns = {column['name']: column for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            reflected = reflected_columns.pop(column.name, None)
+            if reflected is None:
+                drift.append(f"{table.name}.{column.name}: столбец отсутствует")
+                continue
+            declared_type = column.type.compile(dialect=dialect)
+            reflected_type = reflected['type'].compile(dialect=dialect)
+            if declared_type != reflected_type:
+                drift.append(f"{table.name}.{column.name}: тип {reflected_type}, в моделях {declared_type}")
+            if column.nullable != reflected['nullable']:
+                drift.append(
+                    f"{table.name}.{column.name}: {'NULL' if reflected['nullable'] else 'NOT NULL'}, "
+                    f"в моделях {'NULL' if column.nullable else 'NOT NULL'}"
+                )
+        for name in reflected_columns:
+            drift.append(f"{table.name}.{name}: столбец не объявлен в моделях")
+
+        declared_key = [column.name for column in table.primary_key.columns]
+        reflected_key = inspector.get_pk_constraint(table.name)['constrained_columns']
+        partition_column = partition_keys.get(table.name)
+        if reflected_key != declared_key and reflected_key != declared_key + [partition_column]:
+            drift.append(f"{table.name}: первичный ключ {reflected_key}, в моделях {declared_key}")
+
+        declared_unique = {
+            tuple(column.name for column in constraint.columns)
+            for constraint in table.constraints
+            if isinstance(constraint, UniqueConstraint)
+        }
+        reflected_unique = {
+            tuple(constraint['column_names']) for constraint in inspector.get_unique_constraints(table.name)
+        }
+        for columns in sorted(reflected_unique - declared_unique):
+            drift.append(f"{table.name}: ограничение UNIQUE {columns} не объявлено в моделях")
+        for columns in sorted(declared_unique - reflected_unique):
+            drift.append(f"{table.name}: ограничение UNIQUE {columns} отсутствует")
+
+        declared_indexes = {index.name: _declared_index_signature(index, dialect) for index in table.indexes}
+        reflected_indexes = {
+            index['name']: _reflected_index_signature(index)
+            for index in inspector.get_indexes(table.name)
+            if 'duplicates_constraint' not in index
+        }
+        for name in sorted(declared_indexes.keys() | reflected_indexes.keys()):
+            declared = declared_indexes.get(name)
+            reflected = reflected_indexes.get(name)
+            if reflected is None:
+                drift.append(f"{table.name}: индекс {name} отсутствует")
+            elif declared is None:
+                drift.append(f"{table.name}: индекс {name} не объявлен в моделях")
+            elif declared != reflected:
+                drift.append(f"{table.name}: индекс {name} {reflected}, в моделях {declared}")
+
+    return drift
+
+
+def main():
+    from models import Base, PARTITIONED_TABLES, SCHEMA_MIGRATIONS, WORKLOAD_MAINTENANCE, get_engine
+
+    parser = argparse.ArgumentParser(description="Миграции схемы базы данных")
+    parser.add_argument('command', choices=('upgrade', 'status', 'check'),
+                        help="upgrade - применить миграции, status - показать версии, "
+                             "check - завершиться с ошибкой при неприменных миграциях или расхождении схемы")
+    parser.add_argument('--target', type=int, help="Последняя применяемая версия (upgrade)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    with get_engine(WORKLOAD_MAINTENANCE).connect() as connection:
+        if args.command == 'upgrade':
+            applied = upgrade(connection, SCHEMA_MIGRATIONS, target=args.target)
+            print(f"Применено миграций: {len(applied)}")
+        elif args.command == 'status':
+            applied = set(get_applied_versions(connection))
+            for migration in SCHEMA_MIGRATIONS:
+                mark = '✅' if migration.version in applied else '⏳'
+                print(f"{mark} {migration.version:>4} {migration.name}")
+        else:
+            pending = get_pending_migrations(connection, SCHEMA_MIGRATIONS)
+            drift = check_drift(connection, Base.metadata, PARTITIONED_TABLES)
+            for migration in pending:
+                print(f"⏳ Миграция не применена: {migration.version} {migration.name}")
+            for difference in drift:
+                print(f"❌ {difference}")
+            if pending or drift:
+                sys.exit(1)
+            print("✅ Схема базы совпадает с моделями")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,53 @@
-from sqlalchemy import Column, Integer, String, DateTime, func, ForeignKey, Boolean, Text
+from sqlalchemy import Column, Integer, String, DateTime, func, ForeignKey, Boolean, Text, Double, Index, CheckConstraint
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
-from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker, relationship, column_property
+from sqlalchemy import select, text, insert, update, delete, distinct, cast, case, literal_column, and_, or_, BigInteger, SmallInteger, UniqueConstraint
+from sqlalchemy.types import TypeDecorator
+from sqlalchemy.dialects.postgresql import INET, CIDR, BYTEA
 import yaml
 from yaml.loader import SafeLoader
 import uuid
+import ipaddress
 import os
+import threading
+import zlib
+from contextlib import contextmanager
+from functools import lru_cache
+from itertools import chain
+from db_engine import PoolTelemetry, build_engine, get_pool_status
+from permission_cache import PermissionProfileCache
+from session_activity import SessionActivityBuffer, SessionVerdictCache
+from login_attempt_writer import UnauthorizedAttemptWriter
+from login_limiter import LoginRateLimiter
+from user_agents import UserAgentCache, upsert_user_agents
+from workloads import (
+    WORKLOAD_AUTH, WORKLOAD_REPORTING, WORKLOAD_MAINTENANCE, WORKLOADS,
+    current_workload, workload, workload_database_config
+)
+from datetime import date, datetime, timedelta
+from maintenance import MaintenanceJob, MaintenanceScheduler
+from pagination import PAGE_PREV, keyset_page_statement, keyset_page_result, keyset_page_frame
+from partitions import (
+    PARTITION_DAY, PARTITION_MONTH, is_partitioned, ensure_partitions, drop_expired_partitions
+)
+from exports import EXPORT_CSV, write_export
+from archive import ArchiveWriter, archive_keyset, query_archive, prune_archive, compact_archive
+from migrations import load_migrations, upgrade, check_drift, get_pending_migrations
+from rollups import (
+    ROLLUP_MINUTE, ROLLUP_HOUR, ROLLUP_DAY, choose_granularity, truncate_to_granularity,
+    refresh_attempt_rollups, refresh_session_rollups, prune_rollups
+)
 
 Base = declarative_base()
 
+class InetAddress(TypeDecorator):
+    """IP адрес (INET). Значение читается строкой при любом драйвере: asyncpg возвращает объекты ipaddress"""
+    impl = INET
+    cache_ok = True
+
+    def process_result_value(self, value, dialect):
+        return value if value is None or isinstance(value, str) else str(value)
+
 class User(Base):
     __tablename__ = 'users'
     
@@ -23,8 +62,8 @@ class Product(Base):
     __tablename__ = 'products'
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    name = Column(String(100), nullable=False)
-    description = Column(String(500))
+    name = Column(Text, nullable=False)
+    description = Column(Text)
     created_at = Column(DateTime, default=func.current_timestamp())
 
     product_users = relationship("ProductUser", back_populates="product")
@@ -32,72 +71,646 @@ class Product(Base):
 
 class ProductUser(Base):
     __tablename__ = 'product_users'
+    __table_args__ = (
+        UniqueConstraint('product_id', 'user_id', name='product_users_product_id_user_id_key'),
+        CheckConstraint("role IN ('viewer', 'editor')", name='product_users_role_check'),
+        # Права пользователя при входе (UNIQUE начинается с product_id и поиск по user_id не покрывает)
+        Index('idx_product_users_user_id', 'user_id'),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    product_id = Column(Integer, ForeignKey('products.id'), nullable=False)
-    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
-    role = Column(String(20), nullable=False)  # 'viewer' или 'editor'
+    product_id = Column(Integer, ForeignKey('products.id', ondelete='CASCADE'), nullable=False)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    role = Column(Text, nullable=False, server_default='viewer')  # 'viewer' или 'editor'
 
     product = relationship("Product", back_populates="product_users")
     user = relationship("User", back_populates="product_users")
 
 class ProductOwner(Base):
     __tablename__ = 'product_owners'
+    __table_args__ = (
+        UniqueConstraint('product_id', 'user_id', name='product_owners_product_id_user_id_key'),
+        Index('idx_product_owners_user_id', 'user_id'),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    product_id = Column(Integer, ForeignKey('products.id'), nullable=False)
-    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    product_id = Column(Integer, ForeignKey('products.id', ondelete='CASCADE'), nullable=False)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
 
     product = relationship("Product", back_populates="product_owners")
     user = relationship("User", back_populates="product_owners")
 
+class UserAgent(Base):
+    """Словарь User Agent: строка хранится один раз, сессии и попытки входа ссылаются на нее по id"""
+    __tablename__ = 'user_agents'
+    __table_args__ = (
+        # Поиск по подстроке User Agent (ILIKE) выполняется по словарю, а не по большим таблицам
+        Index('idx_user_agents_value_trgm', 'value',
+              postgresql_using='gin', postgresql_ops={'value': 'gin_trgm_ops'}),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    hash = Column(BYTEA, nullable=False, unique=True)  # SHA-256 от value (user_agents.user_agent_hash)
+    value = Column(Text, nullable=False)
+
+def _user_agent_property(user_agent_id):
+    """Строка User Agent по user_agent_id (только чтение, подзапрос к словарю)"""
+    return column_property(
+        select(UserAgent.value).where(UserAgent.id == user_agent_id).correlate_except(UserAgent)
+        .scalar_subquery().label('user_agent')
+    )
+
 class UserSession(Base):
     __tablename__ = 'user_sessions'
+    __table_args__ = (
+        # Проверка, продление и завершение сессии ищут только активные сессии
+        Index('idx_user_sessions_session_id_active', 'session_id', postgresql_where=text('is_active')),
+        Index('idx_user_sessions_active', 'is_active', postgresql_where=text('is_active = true')),
+        # Постраничный вывод по ключу (created_at, id), в том числе по пользователю (обратный обход - DESC)
+        Index('idx_user_sessions_created_at_id', 'created_at', 'id'),
+        Index('idx_user_sessions_username_created_at_id', 'username', 'created_at', 'id'),
+        # Поиск по шаблону имени (ILIKE), по User Agent из словаря и по IP адресу или сети (=, <<=)
+        Index('idx_user_sessions_username_trgm', 'username',
+              postgresql_using='gin', postgresql_ops={'username': 'gin_trgm_ops'}),
+        Index('idx_user_sessions_user_agent_id', 'user_agent_id'),
+        Index('idx_user_sessions_ip_gist', 'ip_address',
+              postgresql_using='gist', postgresql_ops={'ip_address': 'inet_ops'}),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     username = Column(String(255), nullable=False)
-    session_id = Column(String(255), unique=True, nullable=False)
-    created_at = Column(DateTime, default=func.current_timestamp())
+    # Уникальность обеспечивается генерацией uuid: уникальный индекс секционированной таблицы обязан включать created_at
+    session_id = Column(String(255), nullable=False)
+    created_at = Column(DateTime, nullable=False, default=func.current_timestamp())
     last_activity = Column(DateTime, default=func.current_timestamp())
-    ip_address = Column(String(45))  # IPv6 может быть до 45 символов
-    user_agent = Column(Text)
+    ip_address = Column(InetAddress)
+    user_agent_id = Column(Integer, ForeignKey('user_agents.id'))
     is_active = Column(Boolean, default=True)
+    # Время вставки по часам базы (отметка агрегатов rollups.py), NULL - строка вставлена до миграции 6
+    inserted_at = Column(DateTime, server_default=func.clock_timestamp())
+    user_agent = _user_agent_property(user_agent_id)
 
 class UnauthorizedLoginAttempt(Base):
     __tablename__ = 'unauthorized_login_attempts'
+    __table_args__ = (
+        # Постраничный вывод и сводки по ключу (attempted_at, id), в том числе по пользователю
+        Index('idx_unauthorized_login_attempts_attempted_at_id', 'attempted_at', 'id'),
+        Index('idx_unauthorized_login_attempts_username_attempted_at_id', 'username', 'attempted_at', 'id'),
+        Index('idx_unauthorized_login_attempts_ip_gist', 'ip_address',
+              postgresql_using='gist', postgresql_ops={'ip_address': 'inet_ops'}),
+        Index('idx_unauthorized_login_attempts_username_trgm', 'username',
+              postgresql_using='gin', postgresql_ops={'username': 'gin_trgm_ops'}),
+        Index('idx_unauthorized_login_attempts_user_agent_id', 'user_agent_id'),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     username = Column(String(255), nullable=False)
-    ip_address = Column(String(45))  # IPv6 может быть до 45 символов
-    user_agent = Column(Text)
-    attempted_at = Column(DateTime, default=func.current_timestamp())
+    ip_address = Column(InetAddress)
+    user_agent_id = Column(Integer, ForeignKey('user_agents.id'))
+    attempted_at = Column(DateTime, nullable=False, default=func.current_timestamp())
     reason = Column(Text, default='User not found in product_users table')
+    # Время вставки по часам базы (отметка агрегатов rollups.py), NULL - строка вставлена до миграции 6
+    inserted_at = Column(DateTime, server_default=func.clock_timestamp())
+    user_agent = _user_agent_property(user_agent_id)
+
+class MaintenanceRun(Base):
+    __tablename__ = 'maintenance_runs'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    job_name = Column(String(100), nullable=False)
+    started_at = Column(DateTime, nullable=False)
+    finished_at = Column(DateTime, nullable=False)
+    duration_seconds = Column(Double, nullable=False)
+    rows_deleted = Column(Integer, nullable=False, default=0)
+    status = Column(String(20), nullable=False)  # 'success' или 'error'
+    error = Column(Text)
+
+# Последний запуск задачи
+Index('idx_maintenance_runs_job_finished', MaintenanceRun.job_name, MaintenanceRun.finished_at.desc())
+
+class UserSessionCounter(Base):
+    __tablename__ = 'user_session_counters'
+    
+    slot = Column(SmallInteger, primary_key=True, autoincrement=False)
+    total_sessions = Column(BigInteger, nullable=False, default=0)
+    active_sessions = Column(BigInteger, nullable=False, default=0)
+    unique_users = Column(BigInteger, nullable=False, default=0)
+
+class UserSessionUserCount(Base):
+    __tablename__ = 'user_session_user_counts'
+    
+    username = Column(String(255), primary_key=True)
+    sessions = Column(BigInteger, nullable=False)
+
+class UnauthorizedAttemptRollup(Base):
+    __tablename__ = 'unauthorized_attempt_rollups'
+    __table_args__ = (
+        UniqueConstraint(
+            'granularity', 'bucket_start', 'username', 'ip_address', 'reason',
+            name='uq_unauthorized_attempt_rollups', postgresql_nulls_not_distinct=True
+        ),
+        Index('idx_unauthorized_attempt_rollups_bucket', 'granularity', 'bucket_start'),
+    )
+    
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    granularity = Column(String(10), nullable=False)  # 'minute', 'hour' или 'day'
+    bucket_start = Column(DateTime, nullable=False)
+    username = Column(String(255), nullable=False)
+    ip_address = Column(InetAddress)
+    reason = Column(Text)
+    attempts = Column(BigInteger, nullable=False)
+
+class UserSessionRollup(Base):
+    __tablename__ = 'user_session_rollups'
+    
+    granularity = Column(String(10), primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    logins = Column(BigInteger, nullable=False, default=0)
+    peak_active_sessions = Column(BigInteger, nullable=False, default=0)
+
+class RollupWatermark(Base):
+    __tablename__ = 'rollup_watermarks'
+    
+    name = Column(String(100), primary_key=True)
+    last_id = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime)
+
+# Путь к config.yaml (по умолчанию - в текущем каталоге)
+CONFIG_PATH = os.environ.get('APP_CONFIG_PATH', 'config.yaml')
+
+# Функция для загрузки конфигурации приложения из config.yaml
+def load_config(path: str = None) -> dict:
+    with open(path or CONFIG_PATH) as file:
+        return yaml.load(file, Loader=SafeLoader)
+
+@lru_cache(maxsize=None)
+def get_config() -> dict:
+    """
+    Получение конфигурации приложения. Файл читается один раз на процесс.
+    
+    Returns:
+        dict: Содержимое config.yaml
+    """
+    return load_config()
+
+def get_config_section(name: str) -> dict:
+    """
+    Получение раздела конфигурации
+    
+    Args:
+        name: Имя раздела config.yaml
+        
+    Returns:
+        dict: Настройки раздела (пустой словарь, если раздела нет)
+    """
+    return get_config().get(name) or {}
 
 # Функция для получения настроек базы данных из config.yaml
 def get_database_config():
-    with open('config.yaml') as file:
-        config = yaml.load(file, Loader=SafeLoader)
-    return config['database']['url']
+    return get_config()['database']['url']
+
+# Компоненты (движок, кэши, фоновые очереди) создаются при первом обращении, а не при импорте модуля
+_components = {}
+_components_lock = threading.RLock()
+
+def _get_component(name: str, factory):
+    """
+    Получение компонента, созданного один раз на процесс
+    
+    Args:
+        name: Имя компонента
+        factory: Функция создания компонента
+        
+    Returns:
+        Экземпляр компонента
+    """
+    component = _components.get(name)
+    if component is None:
+        with _components_lock:
+            component = _components.get(name)
+            if component is None:
+                component = factory()
+                _components[name] = component
+    return component
+
+# Счетчики пулов соединений по нагрузкам (pool_telemetry - пул входа, как до разделения пулов)
+pool_telemetries = {name: PoolTelemetry() for name in WORKLOADS}
+pool_telemetry = pool_telemetries[WORKLOAD_AUTH]
+
+def get_workload_database_config(workload: str) -> dict:
+    """
+    Получение настроек базы данных нагрузки (раздел database с переопределениями database.workloads)
+    
+    Args:
+        workload: Имя нагрузки
+        
+    Returns:
+        dict: Настройки для build_engine
+    """
+    return workload_database_config(get_config()['database'], workload)
+
+def get_engine(workload: str = None):
+    """
+    Получение движка базы данных нагрузки (параметры пула и таймаутов - раздел database в config.yaml)
+    
+    У каждой нагрузки свой пул: запросы административной панели и обслуживания не занимают
+    соединения, нужные для входа пользователей.
+    
+    Args:
+        workload: Имя нагрузки (по умолчанию - нагрузка текущего вызова, см. workloads.py)
+        
+    Returns:
+        Engine: SQLAlchemy движок
+    """
+    workload = workload or current_workload()
+    return _get_component(f'engine_{workload}', lambda: build_engine(
+        get_workload_database_config(workload), telemetry=pool_telemetries[workload]
+    ))
+
+def get_permission_cache() -> PermissionProfileCache:
+    """Кэш профилей прав доступа (инвалидируется триггерами через LISTEN/NOTIFY)"""
+    def factory():
+        cache_config = get_config_section('permission_cache')
+        return PermissionProfileCache(
+            max_size=cache_config.get('max_size', 10000),
+            ttl_seconds=cache_config.get('ttl_seconds', 300)
+        )
+    return _get_component('permission_cache', factory)
+
+def get_session_verdict_cache() -> SessionVerdictCache:
+    """Короткоживущий кэш результатов validate_and_touch"""
+    def factory():
+        activity_config = get_config_section('session_activity')
+        return SessionVerdictCache(
+            ttl_seconds=activity_config.get('verdict_cache_ttl_seconds', 0),
+            max_size=activity_config.get('verdict_cache_max_size', 10000)
+        )
+    return _get_component('session_verdict_cache', factory)
 
-# Создание движка базы данных
-DATABASE_URL = get_database_config()
-engine = create_engine(DATABASE_URL)
+def get_login_limiter() -> LoginRateLimiter:
+    """Ограничитель частоты неудачных входов (раздел login_limiter в config.yaml)"""
+    def factory():
+        limiter_config = get_config_section('login_limiter')
+        return LoginRateLimiter(
+            window_seconds=limiter_config.get('window_seconds', 300),
+            max_failures_per_ip=limiter_config.get('max_failures_per_ip', 20),
+            max_failures_per_username=limiter_config.get('max_failures_per_username', 10),
+            lockout_seconds=limiter_config.get('lockout_seconds', 300),
+            max_keys=limiter_config.get('max_keys', 100000)
+        )
+    return _get_component('login_limiter', factory)
+
+def get_user_agent_cache() -> UserAgentCache:
+    """LRU соответствия строка User Agent -> id словаря user_agents (раздел user_agents в config.yaml)"""
+    return _get_component(
+        'user_agent_cache',
+        lambda: UserAgentCache(max_entries=get_config_section('user_agents').get('cache_size', 4096))
+    )
+
+@workload(WORKLOAD_AUTH)
+def resolve_user_agent_ids(values) -> dict:
+    """
+    Получение id строк User Agent в словаре user_agents
+    
+    Найденные в кэше строки не требуют обращения к базе; отсутствующие добавляются в словарь
+    одной короткой транзакцией, после фиксации которой их id попадают в кэш.
+    
+    Args:
+        values: Строки User Agent (пустые и None пропускаются)
+        
+    Returns:
+        dict: Строка -> id
+    """
+    cache = get_user_agent_cache()
+    ids, missing = cache.get_many(values)
+    if missing:
+        with get_engine().begin() as connection:
+            added = upsert_user_agents(connection, UserAgent, missing)
+        cache.put_many(added)
+        ids.update(added)
+    return ids
+
+def resolve_user_agent_id(value: str):
+    """
+    Получение id строки User Agent в словаре user_agents
+    
+    Args:
+        value: Строка User Agent
+        
+    Returns:
+        int: id строки (None для пустого User Agent)
+    """
+    if not value:
+        return None
+    return resolve_user_agent_ids([value])[value]
+
+def get_admin_data_cache():
+    """Кэш данных административной панели (раздел admin_cache в config.yaml)"""
+    def factory():
+        from admin_cache import AdminDataCache
+        cache_config = get_config_section('admin_cache')
+        return AdminDataCache(
+            ttl_seconds=cache_config.get('ttl_seconds', 60),
+            refresh_seconds=cache_config.get('refresh_seconds', 5),
+            settle_seconds=cache_config.get('settle_seconds', 5),
+            max_entries=cache_config.get('max_entries', 256)
+        )
+    return _get_component('admin_data_cache', factory)
+
+def __getattr__(name):
+    # Обратная совместимость: models.engine, models.DATABASE_URL и models.CONFIG вычисляются лениво
+    if name == 'engine':
+        return get_engine()
+    if name == 'DATABASE_URL':
+        return get_database_config()
+    if name == 'CONFIG':
+        return get_config()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# SQL запросы очистки (общие для синхронного и асинхронного API)
+CLEANUP_INACTIVE_SESSIONS_SQL = text("""
+    DELETE FROM user_sessions 
+    WHERE last_activity < CURRENT_TIMESTAMP - INTERVAL '9 hours' 
+    OR (is_active = FALSE AND created_at < CURRENT_TIMESTAMP - INTERVAL '1 hour')
+""")
+
+CLEANUP_OLD_UNAUTHORIZED_ATTEMPTS_SQL = text("""
+    DELETE FROM unauthorized_login_attempts 
+    WHERE attempted_at < CURRENT_TIMESTAMP - make_interval(days => :days)
+""")
+
+CLEANUP_OLD_USER_SESSIONS_SQL = text("""
+    DELETE FROM user_sessions 
+    WHERE created_at < CURRENT_TIMESTAMP - make_interval(days => :days)
+    AND is_active = FALSE
+""")
+
+# Режимы статистики сессий (session_stats.mode в config.yaml)
+SESSION_STATS_QUERY = 'query'
+SESSION_STATS_COUNTERS = 'counters'
+
+# Окно "за последние 24 часа" в агрегатах попыток входа
+RECENT_ATTEMPTS_WINDOW = timedelta(hours=24)
+# Сколько IP адресов (или имен пользователей) показывать в каждой группе агрегатов
+UNAUTHORIZED_GROUP_SAMPLE_SIZE = 5
+# Длина префикса подсетей в агрегатах по подсетям по умолчанию
+SUBNET_IPV4_PREFIX = 24
+SUBNET_IPV6_PREFIX = 64
+
+# Создание фабрики сессий (движок подключается при первом создании сессии)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+
+def _user_session_to_dict(session) -> dict:
+    """Преобразование сессии пользователя в словарь"""
+    return {
+        'id': session.id,
+        'username': session.username,
+        'session_id': session.session_id,
+        'created_at': session.created_at,
+        'last_activity': session.last_activity,
+        'ip_address': session.ip_address,
+        'user_agent': session.user_agent,
+        'is_active': session.is_active
+    }
+
+def _unauthorized_attempt_to_dict(attempt) -> dict:
+    """Преобразование попытки неавторизованного входа в словарь"""
+    return {
+        'id': attempt.id,
+        'username': attempt.username,
+        'ip_address': attempt.ip_address,
+        'user_agent': attempt.user_agent,
+        'attempted_at': attempt.attempted_at,
+        'reason': attempt.reason
+    }
+
+def _unauthorized_attempt_rows(attempts: list, user_agent_ids: dict) -> list:
+    """Строки пакетного INSERT: строка User Agent из записи заменяется на id словаря"""
+    rows = []
+    for attempt in attempts:
+        row = dict(attempt)
+        user_agent = row.pop('user_agent', None)
+        row['user_agent_id'] = user_agent_ids.get(user_agent) if user_agent else None
+        rows.append(row)
+    return rows
 
-# Создание фабрики сессий
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def _maintenance_run_to_dict(run) -> dict:
+    """Преобразование записи журнала задач обслуживания в словарь"""
+    return {
+        'id': run.id,
+        'job_name': run.job_name,
+        'started_at': run.started_at,
+        'finished_at': run.finished_at,
+        'duration_seconds': run.duration_seconds,
+        'rows_deleted': run.rows_deleted,
+        'status': run.status,
+        'error': run.error
+    }
+
+def _unauthorized_attempt_record(username: str, ip_address: str = None, user_agent: str = None, reason: str = None) -> dict:
+    """Поля попытки неавторизованного входа для фоновой пакетной записи"""
+    return {
+        'username': username,
+        'ip_address': ip_address,
+        'user_agent': user_agent,
+        'attempted_at': datetime.now(),
+        'reason': reason or 'User not found in product_users table'
+    }
+
+def get_pool_telemetry(workload: str = WORKLOAD_AUTH) -> dict:
+    """
+    Получение телеметрии пула соединений нагрузки
+    
+    Args:
+        workload: Имя нагрузки (по умолчанию - пул входа)
+        
+    Returns:
+        dict: Выданные соединения, переполнение, время ожидания и таймауты пула
+    """
+    return get_pool_status(get_engine(workload), pool_telemetries[workload])
+
+def get_pool_telemetry_by_workload() -> dict:
+    """
+    Получение телеметрии пулов соединений всех нагрузок
+    
+    Returns:
+        dict: Имя нагрузки -> телеметрия пула
+    """
+    return {name: get_pool_telemetry(name) for name in WORKLOADS}
 
 def get_db_session():
     """Получение сессии базы данных"""
-    db = SessionLocal()
+    db = SessionLocal(bind=get_engine())
     try:
         return db
     finally:
         pass  # Сессия будет закрыта в вызывающем коде
 
+def _authorization_snapshot_query(username: str = None, user_id: int = None):
+    """
+    Построение запроса снимка авторизации: пользователь, его права и метаданные продуктов
+    одним LEFT JOIN-запросом
+    
+    Args:
+        username: Имя пользователя
+        user_id: ID пользователя (используется, если username не задан)
+        
+    Returns:
+        Select: Запрос, возвращающий по одной строке на право доступа пользователя
+    """
+    query = (
+        select(
+            User.id.label('user_id'),
+            User.username.label('username'),
+            Product.id.label('product_id'),
+            Product.name.label('product_name'),
+            Product.description.label('product_description'),
+            ProductUser.role.label('role')
+        )
+        .select_from(User)
+        .outerjoin(ProductUser, ProductUser.user_id == User.id)
+        .outerjoin(Product, Product.id == ProductUser.product_id)
+        .order_by(ProductUser.id)
+    )
+    if username is not None:
+        return query.where(User.username == username)
+    return query.where(User.id == user_id)
+
+def _authorization_snapshot_from_rows(rows) -> dict:
+    """
+    Сборка снимка авторизации из строк запроса _authorization_snapshot_query
+    
+    Args:
+        rows: Строки результата запроса
+        
+    Returns:
+        dict: Информация о пользователе с доступными продуктами или None если пользователь не найден
+    """
+    if not rows:
+        return None
+    
+    available_products = [
+        {
+            'id': row.product_id,
+            'name': row.product_name,
+            'description': row.product_description,
+            'role': row.role
+        }
+        for row in rows
+        if row.product_id is not None
+    ]
+    
+    return {
+        'id': rows[0].user_id,
+        'username': rows[0].username,
+        'available_products': available_products
+    }
+
+@workload(WORKLOAD_AUTH)
+def get_user_authorization_snapshot(username: str = None, user_id: int = None) -> dict:
+    """
+    Получение снимка авторизации пользователя за один запрос на одном соединении
+    
+    Args:
+        username: Имя пользователя
+        user_id: ID пользователя (используется, если username не задан)
+        
+    Returns:
+        dict: {'id', 'username', 'available_products'} или None если пользователь не найден.
+              Пустой список available_products означает отсутствие доступа к продуктам.
+    """
+    db = get_db_session()
+    try:
+        rows = db.execute(_authorization_snapshot_query(username=username, user_id=user_id)).all()
+        return _authorization_snapshot_from_rows(rows)
+    finally:
+        db.close()
+
+@workload(WORKLOAD_AUTH)
+def get_cached_authorization_snapshot(user_id: int) -> dict:
+    """
+    Получение снимка авторизации пользователя через кэш профилей прав
+    
+    Args:
+        user_id: ID пользователя
+        
+    Returns:
+        dict: Снимок авторизации или None если пользователь не найден
+    """
+    if not get_config_section('permission_cache').get('enabled', True):
+        return get_user_authorization_snapshot(user_id=user_id)
+    
+    permission_cache = get_permission_cache()
+    permission_cache.ensure_listener(get_engine(WORKLOAD_AUTH))
+    snapshot = permission_cache.get(user_id)
+    if snapshot is None:
+        # Поколение фиксируется до чтения: инвалидация во время запроса не даст закэшировать устаревшие права
+        epoch = permission_cache.epoch
+        snapshot = get_user_authorization_snapshot(user_id=user_id)
+        if snapshot is not None:
+            permission_cache.put(user_id, snapshot, epoch=epoch)
+    return snapshot
+
+def get_permission_cache_stats() -> dict:
+    """
+    Получение статистики кэша профилей прав
+    
+    Returns:
+        dict: Размер кэша, счетчики попаданий/промахов, вытеснений и инвалидаций
+    """
+    return get_permission_cache().stats()
+
+def is_login_limiter_enabled() -> bool:
+    """Включено ли ограничение частоты неудачных входов"""
+    return get_config_section('login_limiter').get('enabled', True)
+
+def get_login_lockout(username: str = None, ip_address: str = None) -> dict:
+    """
+    Проверка блокировки входа после серии неудачных попыток (без обращения к базе данных)
+    
+    Args:
+        username: Имя пользователя
+        ip_address: IP адрес
+        
+    Returns:
+        dict: scope (ip или username), key и retry_after (секунды) или None, если вход разрешен
+    """
+    if not is_login_limiter_enabled():
+        return None
+    return get_login_limiter().check(ip_address=ip_address, username=username)
+
+def _login_lockout_reason(lockout: dict) -> str:
+    """Причина для журнала попыток входа при начале блокировки"""
+    return (
+        f"Login locked out for {lockout['lockout_seconds']:g}s after {lockout['failures']} failed attempts "
+        f"per {lockout['scope']} within {get_login_limiter().window_seconds:g}s"
+    )
+
+def _record_login_failure(username: str, ip_address: str = None) -> list:
+    """
+    Учет неудачного входа в ограничителе
+    
+    Returns:
+        list: Причины начавшихся блокировок для записи в журнал попыток входа
+    """
+    if not is_login_limiter_enabled():
+        return []
+    return [_login_lockout_reason(lockout) for lockout in get_login_limiter().record_failure(ip_address, username)]
+
+def _record_login_success(username: str):
+    """Сброс неудачных попыток пользователя в ограничителе после успешного входа"""
+    if is_login_limiter_enabled():
+        get_login_limiter().record_success(username)
+
+@workload(WORKLOAD_AUTH)
 def authenticate_user(username: str, password: str, ip_address: str = None, user_agent: str = None) -> dict:
     """
     Аутентификация пользователя
     
+    Вход с IP или для имени, заблокированных после серии неудачных попыток (раздел login_limiter
+    в config.yaml), отклоняется без обращения к базе данных; начало блокировки записывается
+    в журнал попыток неавторизованного входа.
+    
     Args:
         username: Имя пользователя
         password: Пароль в открытом виде
@@ -107,40 +720,40 @@ def authenticate_user(username: str, password: str, ip_address: str = None, user
     Returns:
         dict: Информация о пользователе или None если аутентификация не удалась
     """
-    db = get_db_session()
-    try:
-        user = db.query(User).filter(User.username == username).first()
-        if user:
-            # Проверяем, есть ли у пользователя доступ к продуктам
-            if check_user_in_product_users(username):
-                # Получаем доступные продукты для пользователя
-                available_products = get_user_available_products(user.id)
-                return {
-                    'id': user.id,
-                    'username': user.username,
-                    'available_products': available_products
-                }
-            else:
-                # Пользователь существует, но не имеет доступа к продуктам
-                log_unauthorized_login_attempt(
-                    username=username,
-                    ip_address=ip_address,
-                    user_agent=user_agent,
-                    reason='User exists but has no access to any products'
-                )
-                return None
-        else:
-            # Пользователь не найден в системе
+    if get_login_lockout(username=username, ip_address=ip_address) is not None:
+        return None
+    
+    permission_cache = get_permission_cache()
+    epoch = permission_cache.epoch
+    snapshot = get_user_authorization_snapshot(username=username)
+    if snapshot is None:
+        # Пользователь не найден в системе
+        reason = 'User not found in users table'
+    elif not snapshot['available_products']:
+        # Пользователь существует, но не имеет доступа к продуктам
+        reason = 'User exists but has no access to any products'
+    else:
+        reason = None
+    
+    if reason is not None:
+        for attempt_reason in [reason] + _record_login_failure(username, ip_address):
             log_unauthorized_login_attempt(
                 username=username,
                 ip_address=ip_address,
                 user_agent=user_agent,
-                reason='User not found in users table'
+                reason=attempt_reason
             )
-            return None
-    finally:
-        db.close()
+        return None
+    
+    _record_login_success(username)
+    
+    # Права при входе всегда читаются из базы; свежий снимок прогревает кэш для последующих перезапусков
+    if get_config_section('permission_cache').get('enabled', True):
+        permission_cache.put(snapshot['id'], snapshot, epoch=epoch)
+    
+    return snapshot
 
+@workload(WORKLOAD_AUTH)
 def get_user_by_username(username: str) -> dict:
     """
     Получение информации о пользователе по имени пользователя
@@ -151,20 +764,12 @@ def get_user_by_username(username: str) -> dict:
     Returns:
         dict: Информация о пользователе или None если пользователь не найден или не имеет доступа к продуктам
     """
-    db = get_db_session()
-    try:
-        user = db.query(User).filter(User.username == username).first()
-        if user and check_user_in_product_users(username):
-            available_products = get_user_available_products(user.id)
-            return {
-                'id': user.id,
-                'username': user.username,
-                'available_products': available_products
-            }
-        return None
-    finally:
-        db.close()
+    snapshot = get_user_authorization_snapshot(username=username)
+    if snapshot and snapshot['available_products']:
+        return snapshot
+    return None
 
+@workload(WORKLOAD_AUTH)
 def get_user_available_products(user_id: int) -> list:
     """
     Получение доступных продуктов для пользователя
@@ -175,26 +780,10 @@ def get_user_available_products(user_id: int) -> list:
     Returns:
         list: Список доступных продуктов с ролями
     """
-    db = get_db_session()
-    try:
-        # Получаем продукты, к которым у пользователя есть доступ
-        product_users = db.query(ProductUser).filter(ProductUser.user_id == user_id).all()
-        
-        available_products = []
-        for pu in product_users:
-            product = db.query(Product).filter(Product.id == pu.product_id).first()
-            if product:
-                available_products.append({
-                    'id': product.id,
-                    'name': product.name,
-                    'description': product.description,
-                    'role': pu.role
-                })
-        
-        return available_products
-    finally:
-        db.close()
+    snapshot = get_cached_authorization_snapshot(user_id)
+    return snapshot['available_products'] if snapshot else []
 
+@workload(WORKLOAD_AUTH)
 def get_available_pages_for_user(user_id: int) -> list:
     """
     Получение доступных страниц для пользователя на основе его продуктов
@@ -205,7 +794,18 @@ def get_available_pages_for_user(user_id: int) -> list:
     Returns:
         list: Список доступных страниц
     """
-    available_products = get_user_available_products(user_id)
+    return _available_pages_from_products(get_user_available_products(user_id))
+
+def _available_pages_from_products(available_products: list) -> list:
+    """
+    Построение списка страниц по доступным продуктам
+    
+    Args:
+        available_products: Список доступных продуктов
+        
+    Returns:
+        list: Список доступных страниц
+    """
     available_pages = []
     
     # Маппинг продуктов на страницы
@@ -221,6 +821,7 @@ def get_available_pages_for_user(user_id: int) -> list:
     
     return available_pages
 
+@workload(WORKLOAD_AUTH)
 def create_user_session(username: str, ip_address: str = None, user_agent: str = None) -> str:
     """
     Создание новой сессии для пользователя.
@@ -249,7 +850,7 @@ def create_user_session(username: str, ip_address: str = None, user_agent: str =
             username=username,
             session_id=session_id,
             ip_address=ip_address,
-            user_agent=user_agent,
+            user_agent_id=resolve_user_agent_id(user_agent),
             is_active=True
         )
         
@@ -260,6 +861,7 @@ def create_user_session(username: str, ip_address: str = None, user_agent: str =
     finally:
         db.close()
 
+@workload(WORKLOAD_AUTH)
 def check_user_active_sessions(username: str) -> int:
     """
     Проверка количества активных сессий для пользователя
@@ -280,6 +882,7 @@ def check_user_active_sessions(username: str) -> int:
     finally:
         db.close()
 
+@workload(WORKLOAD_AUTH)
 def check_session_active(session_id: str) -> bool:
     """
     Проверка активности сессии по session_id
@@ -300,6 +903,7 @@ def check_session_active(session_id: str) -> bool:
     finally:
         db.close()
 
+@workload(WORKLOAD_AUTH)
 def deactivate_user_session(session_id: str) -> bool:
     """
     Деактивация сессии пользователя
@@ -320,21 +924,92 @@ def deactivate_user_session(session_id: str) -> bool:
         if session:
             session.is_active = False
             db.commit()
+            get_session_verdict_cache().invalidate(session_id)
             return True
         return False
     finally:
         db.close()
 
+def _active_session_query(session_id: str):
+    """Запрос id активной сессии по session_id (частичный индекс idx_user_sessions_session_id_active)"""
+    return (
+        select(UserSession.id)
+        .where(UserSession.session_id == session_id, UserSession.is_active == True)
+        .limit(1)
+    )
+
+def is_session_activity_write_behind() -> bool:
+    """Включена ли отложенная запись активности сессий (session_activity.write_behind в config.yaml)"""
+    return get_config_section('session_activity').get('write_behind', False)
+
+def _record_session_activity(session_id: str):
+    """Отметка активности сессии в буфере write-behind (в базу попадает при пакетном сбросе)"""
+    session_activity_buffer = get_session_activity_buffer()
+    session_activity_buffer.start()
+    session_activity_buffer.record(session_id)
+
+@workload(WORKLOAD_AUTH)
+def validate_and_touch(session_id: str) -> bool:
+    """
+    Проверка активности сессии с одновременным обновлением времени последней активности.
+    
+    В режиме write-behind (session_activity.write_behind в config.yaml) синхронно выполняется
+    только проверка, а отметка активности записывается в буфер и попадает в базу при пакетном сбросе.
+    Без него проверка и обновление выполняются одним запросом UPDATE ... WHERE is_active RETURNING.
+    Результат проверки кэшируется в процессе на session_activity.verdict_cache_ttl_seconds, поэтому
+    частые перезапуски скрипта от виджетов не обращаются к базе данных.
+    
+    Args:
+        session_id: ID сессии
+        
+    Returns:
+        bool: True если сессия активна, False если неактивна или не найдена
+    """
+    write_behind = is_session_activity_write_behind()
+    session_verdict_cache = get_session_verdict_cache()
+    is_valid = session_verdict_cache.get(session_id)
+    if is_valid is None:
+        db = get_db_session()
+        try:
+            if write_behind:
+                is_valid = db.execute(_active_session_query(session_id)).first() is not None
+            else:
+                result = db.execute(
+                    update(UserSession)
+                    .where(
+                        UserSession.session_id == session_id,
+                        UserSession.is_active == True
+                    )
+                    .values(last_activity=func.current_timestamp())
+                    .returning(UserSession.id)
+                )
+                is_valid = result.first() is not None
+                db.commit()
+        finally:
+            db.close()
+        session_verdict_cache.put(session_id, is_valid)
+    
+    if is_valid and write_behind:
+        _record_session_activity(session_id)
+    return is_valid
+
+@workload(WORKLOAD_AUTH)
 def update_session_activity(session_id: str) -> bool:
     """
-    Обновление времени последней активности сессии
+    Обновление времени последней активности сессии.
+    В режиме write-behind (session_activity.write_behind в config.yaml) отметка только
+    записывается в буфер и попадает в базу при следующем пакетном сбросе.
     
     Args:
         session_id: ID сессии
         
     Returns:
-        bool: True если сессия была обновлена, False если не найдена
+        bool: True если сессия была обновлена (или отметка принята в буфер), False если не найдена
     """
+    if is_session_activity_write_behind():
+        _record_session_activity(session_id)
+        return True
+    
     db = get_db_session()
     try:
         session = db.query(UserSession).filter(
@@ -350,30 +1025,110 @@ def update_session_activity(session_id: str) -> bool:
     finally:
         db.close()
 
+def _session_heartbeats_statement(heartbeats: list):
+    """
+    Построение UPDATE ... FROM (VALUES ...) для пачки отметок активности
+    
+    Обновляются только сессии, отметка которых новее сохраненной: при равных значениях
+    триггер update_last_activity заменил бы время на момент записи.
+    
+    Args:
+        heartbeats: Список (session_id, age_seconds)
+        
+    Returns:
+        tuple: (TextClause, параметры запроса)
+    """
+    params = {}
+    values = []
+    for i, (session_id, age_seconds) in enumerate(heartbeats):
+        params[f'sid_{i}'] = session_id
+        params[f'age_{i}'] = age_seconds
+        values.append(f"(:sid_{i}, CAST(:age_{i} AS double precision))")
+    
+    statement = text(f"""
+        UPDATE user_sessions AS s
+        SET last_activity = CURRENT_TIMESTAMP - v.age_seconds * INTERVAL '1 second'
+        FROM (VALUES {', '.join(values)}) AS v(session_id, age_seconds)
+        WHERE s.session_id = v.session_id
+        AND s.is_active = TRUE
+        AND s.last_activity < CURRENT_TIMESTAMP - v.age_seconds * INTERVAL '1 second'
+    """)
+    return statement, params
+
+@workload(WORKLOAD_AUTH)
+def flush_session_heartbeats(heartbeats: list, chunk_size: int = 1000) -> int:
+    """
+    Пакетная запись отметок активности сессий одним UPDATE ... FROM (VALUES ...) на пачку
+    
+    Args:
+        heartbeats: Список (session_id, age_seconds), age_seconds - давность активности в секундах.
+                    Время вычисляется по часам базы данных, поэтому расхождение часов не влияет на результат.
+        chunk_size: Максимальное количество строк в одном UPDATE
+        
+    Returns:
+        int: Количество обновленных сессий
+    """
+    db = get_db_session()
+    try:
+        updated = 0
+        for start in range(0, len(heartbeats), chunk_size):
+            statement, params = _session_heartbeats_statement(heartbeats[start:start + chunk_size])
+            result = db.execute(statement, params)
+            updated += result.rowcount
+        
+        db.commit()
+        return updated
+    finally:
+        db.close()
+
+def get_session_activity_buffer() -> SessionActivityBuffer:
+    """Буфер отложенной записи активности сессий"""
+    def factory():
+        activity_config = get_config_section('session_activity')
+        return SessionActivityBuffer(
+            flush_callback=flush_session_heartbeats,
+            flush_interval_seconds=activity_config.get('flush_interval_seconds', 5),
+            max_pending=activity_config.get('max_pending', 100000)
+        )
+    return _get_component('session_activity_buffer', factory)
+
+def get_session_activity_stats() -> dict:
+    """
+    Получение статистики буфера отложенной записи активности
+    
+    Returns:
+        dict: Размер буфера, размер и длительность последнего сброса
+    """
+    return get_session_activity_buffer().stats()
+
+@workload(WORKLOAD_MAINTENANCE)
 def cleanup_inactive_sessions() -> int:
     """
-    Очистка неактивных сессий (старше 9 часов)
+    Очистка неактивных сессий (старше 9 часов).
+    При включенном архиве (раздел archive в config.yaml) сессии переносятся в архив.
     
     Returns:
         int: Количество удаленных сессий
     """
+    if is_archive_enabled():
+        return archive_inactive_sessions()
+    
     db = get_db_session()
     try:
         # Выполняем SQL запрос напрямую для корректной работы с интервалами
-        result = db.execute(func.text("""
-            DELETE FROM user_sessions 
-            WHERE last_activity < CURRENT_TIMESTAMP - INTERVAL '9 hours' 
-            OR (is_active = FALSE AND created_at < CURRENT_TIMESTAMP - INTERVAL '1 hour')
-        """))
+        result = db.execute(CLEANUP_INACTIVE_SESSIONS_SQL)
         
         db.commit()
         return result.rowcount
     finally:
         db.close()
 
+@workload(WORKLOAD_AUTH)
 def log_unauthorized_login_attempt(username: str, ip_address: str = None, user_agent: str = None, reason: str = None) -> int:
     """
-    Запись попытки входа неавторизованного пользователя
+    Запись попытки входа неавторизованного пользователя.
+    В асинхронном режиме (unauthorized_attempts.async_writer в config.yaml) попытка ставится
+    в очередь фоновой пакетной записи и функция не ждет обращения к базе данных.
     
     Args:
         username: Имя пользователя
@@ -382,14 +1137,22 @@ def log_unauthorized_login_attempt(username: str, ip_address: str = None, user_a
         reason: Причина отказа в доступе
         
     Returns:
-        int: ID созданной записи
+        int: ID созданной записи (None в асинхронном режиме)
     """
-    db = get_db_session()
+    if get_config_section('unauthorized_attempts').get('async_writer', False):
+        unauthorized_attempt_writer = get_unauthorized_attempt_writer()
+        unauthorized_attempt_writer.start()
+        unauthorized_attempt_writer.submit(
+            _unauthorized_attempt_record(username, ip_address, user_agent, reason)
+        )
+        return None
+    
+    db = get_db_session()
     try:
         attempt = UnauthorizedLoginAttempt(
             username=username,
             ip_address=ip_address,
-            user_agent=user_agent,
+            user_agent_id=resolve_user_agent_id(user_agent),
             reason=reason or 'User not found in product_users table'
         )
         
@@ -401,86 +1164,637 @@ def log_unauthorized_login_attempt(username: str, ip_address: str = None, user_a
     finally:
         db.close()
 
-def get_unauthorized_login_attempts(username: str = None, limit: int = 100) -> list:
+@workload(WORKLOAD_AUTH)
+def write_unauthorized_login_attempts(attempts: list) -> int:
+    """
+    Пакетная запись попыток неавторизованного входа многострочным INSERT
+    
+    Args:
+        attempts: Список словарей с полями username, ip_address, user_agent, attempted_at, reason
+        
+    Returns:
+        int: Количество записанных попыток
+    """
+    if not attempts:
+        return 0
+    
+    user_agent_ids = resolve_user_agent_ids(attempt.get('user_agent') for attempt in attempts)
+    rows = _unauthorized_attempt_rows(attempts, user_agent_ids)
+    db = get_db_session()
+    try:
+        db.execute(insert(UnauthorizedLoginAttempt), rows)
+        db.commit()
+        return len(attempts)
+    finally:
+        db.close()
+
+def get_unauthorized_attempt_writer() -> UnauthorizedAttemptWriter:
+    """Фоновая очередь записи попыток неавторизованного входа"""
+    def factory():
+        attempts_config = get_config_section('unauthorized_attempts')
+        return UnauthorizedAttemptWriter(
+            write_batch=write_unauthorized_login_attempts,
+            queue_size=attempts_config.get('queue_size', 10000),
+            batch_size=attempts_config.get('batch_size', 500),
+            flush_interval_seconds=attempts_config.get('flush_interval_seconds', 1),
+            overflow_policy=attempts_config.get('overflow_policy', 'drop_oldest'),
+            spool_path=attempts_config.get('spool_path', 'unauthorized_attempts.spool'),
+            block_timeout_seconds=attempts_config.get('block_timeout_seconds', 5)
+        )
+    return _get_component('unauthorized_attempt_writer', factory)
+
+def get_unauthorized_attempt_writer_stats() -> dict:
+    """
+    Получение счетчиков фоновой записи попыток неавторизованного входа
+    
+    Returns:
+        dict: Количество поставленных в очередь, записанных и отброшенных попыток
+    """
+    return get_unauthorized_attempt_writer().stats()
+
+def _like_pattern(pattern: str) -> str:
+    """Шаблон с * (любые символы) в шаблон LIKE; символы %, _ и \\ ищутся буквально"""
+    escaped = pattern.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return escaped.replace('*', '%')
+
+def parse_ip_network(value: str) -> str:
+    """
+    Нормализация IP адреса или сети для фильтра по вхождению в сеть
+    
+    Args:
+        value: IP адрес (10.0.0.5, 2001:db8::1) или сеть CIDR (10.0.0.0/8, биты адреса узла обнуляются)
+        
+    Returns:
+        str: Сеть CIDR
+        
+    Raises:
+        ValueError: Значение не является IP адресом или сетью
+    """
+    try:
+        return str(ipaddress.ip_network(value.strip(), strict=False))
+    except ValueError as e:
+        raise ValueError(f"Некорректный IP адрес или сеть: {value!r}") from e
+
+def _search_conditions(model, username_pattern: str = None, user_agent_contains: str = None,
+                       ip_network: str = None) -> list:
+    """
+    Условия поиска по шаблону имени и подстроке User Agent (ILIKE по индексам pg_trgm)
+    и по вхождению IP адреса в сеть (inet <<= cidr)
+    """
+    conditions = []
+    if username_pattern:
+        conditions.append(model.username.ilike(_like_pattern(username_pattern), escape='\\'))
+    if user_agent_contains:
+        # Подстрока ищется в словаре (сотни строк), большие таблицы фильтруются по user_agent_id
+        conditions.append(model.user_agent_id.in_(
+            select(UserAgent.id).where(UserAgent.value.ilike(f"%{_like_pattern(user_agent_contains)}%", escape='\\'))
+        ))
+    if ip_network:
+        conditions.append(model.ip_address.op('<<=', is_comparison=True)(cast(parse_ip_network(ip_network), CIDR)))
+    return conditions
+
+@workload(WORKLOAD_REPORTING)
+def get_unauthorized_login_attempts(username: str = None, limit: int = 100,
+                                    since: datetime = None, until: datetime = None, cursor: str = None,
+                                    username_pattern: str = None,
+                                    user_agent_contains: str = None, ip_network: str = None) -> list:
     """
     Получение списка попыток неавторизованного входа
     
     Args:
         username: Фильтр по имени пользователя (опционально)
         limit: Максимальное количество записей
+        since: Начало периода (опционально)
+        until: Конец периода (опционально)
+        cursor: Курсор страницы из get_unauthorized_login_attempts_page (опционально)
+        username_pattern: Шаблон имени пользователя, * - любые символы (опционально)
+        user_agent_contains: Подстрока User Agent без учета регистра (опционально)
+        ip_network: IP адрес или сеть CIDR, в которую входит IP адрес (опционально)
         
     Returns:
         list: Список попыток входа
     """
+    return get_unauthorized_login_attempts_page(
+        username=username, limit=limit, since=since, until=until, cursor=cursor,
+        username_pattern=username_pattern, user_agent_contains=user_agent_contains, ip_network=ip_network
+    )['items']
+
+def _unauthorized_attempts_page_statement(username: str = None, limit: int = 100, since: datetime = None,
+                                          until: datetime = None, cursor: str = None,
+                                          username_pattern: str = None,
+                                          user_agent_contains: str = None, ip_network: str = None):
+    """Запрос страницы попыток входа по ключу (attempted_at, id)"""
+    statement = select(UnauthorizedLoginAttempt).where(
+        *_unauthorized_attempts_conditions(
+            username=username, since=since, until=until,
+            username_pattern=username_pattern, user_agent_contains=user_agent_contains, ip_network=ip_network
+        )
+    )
+    return keyset_page_statement(
+        statement, UnauthorizedLoginAttempt.attempted_at, UnauthorizedLoginAttempt.id, cursor=cursor, limit=limit
+    )
+
+@workload(WORKLOAD_REPORTING)
+def get_unauthorized_login_attempts_page(username: str = None, limit: int = 100, since: datetime = None,
+                                         until: datetime = None, cursor: str = None,
+                                         username_pattern: str = None,
+                                         user_agent_contains: str = None, ip_network: str = None) -> dict:
+    """
+    Получение страницы попыток неавторизованного входа (от новых к старым)
+    
+    Args:
+        username: Фильтр по имени пользователя (опционально)
+        limit: Записей на странице
+        since: Начало периода (опционально)
+        until: Конец периода (опционально)
+        cursor: Курсор страницы (None - самые новые записи)
+        username_pattern: Шаблон имени пользователя, * - любые символы (опционально)
+        user_agent_contains: Подстрока User Agent без учета регистра (опционально)
+        ip_network: IP адрес или сеть CIDR, в которую входит IP адрес (опционально)
+        
+    Returns:
+        dict: items - попытки входа, next_cursor - более старые записи,
+              prev_cursor - более новые записи (None, если страницы нет)
+    """
+    statement, direction = _unauthorized_attempts_page_statement(
+        username=username, limit=limit, since=since, until=until, cursor=cursor,
+        username_pattern=username_pattern, user_agent_contains=user_agent_contains, ip_network=ip_network
+    )
     db = get_db_session()
     try:
-        query = db.query(UnauthorizedLoginAttempt)
-        
-        if username:
-            query = query.filter(UnauthorizedLoginAttempt.username == username)
-        
-        attempts = query.order_by(UnauthorizedLoginAttempt.attempted_at.desc()).limit(limit).all()
-        
-        return [
-            {
-                'id': attempt.id,
-                'username': attempt.username,
-                'ip_address': attempt.ip_address,
-                'user_agent': attempt.user_agent,
-                'attempted_at': attempt.attempted_at,
-                'reason': attempt.reason
-            }
-            for attempt in attempts
-        ]
+        attempts = [_unauthorized_attempt_to_dict(attempt) for attempt in db.scalars(statement)]
+        return keyset_page_result(attempts, direction, cursor, limit, 'attempted_at')
     finally:
         db.close()
 
-def check_user_in_product_users(username: str) -> bool:
+def _read_frame(statement, parse_dates: list = ()):
     """
-    Проверка наличия пользователя в таблице product_users
+    Выполнение запроса с результатом в виде pandas.DataFrame (аналог pd.read_sql)
+
+    Args:
+        statement: Запрос select()
+        parse_dates: Столбцы, приводимые к datetime64 (в том числе для пустого результата)
+
+    Returns:
+        pd.DataFrame: Столбцы результата запроса
+    """
+    import pandas as pd
+
+    with get_engine().connect() as connection:
+        result = connection.execute(statement)
+        frame = pd.DataFrame.from_records(result.all(), columns=list(result.keys()), coerce_float=True)
+    for column in parse_dates:
+        frame[column] = pd.to_datetime(frame[column])
+    return frame
+
+@workload(WORKLOAD_REPORTING)
+def get_unauthorized_login_attempts_frame(username: str = None, limit: int = 100, since: datetime = None,
+                                          until: datetime = None, cursor: str = None,
+                                          username_pattern: str = None,
+                                          user_agent_contains: str = None, ip_network: str = None,
+                                          include_archive: bool = False) -> dict:
+    """
+    Получение страницы попыток неавторизованного входа в виде pandas.DataFrame
+
+    Строки собираются сразу в столбцы, без объектов ORM и словарей на каждую строку.
     
     Args:
-        username: Имя пользователя
+        username: Фильтр по имени пользователя (опционально)
+        limit: Записей на странице
+        since: Начало периода (опционально)
+        until: Конец периода (опционально)
+        cursor: Курсор страницы (None - самые новые записи)
+        username_pattern: Шаблон имени пользователя, * - любые символы (опционально)
+        user_agent_contains: Подстрока User Agent без учета регистра (опционально)
+        ip_network: IP адрес или сеть CIDR, в которую входит IP адрес (опционально)
+        include_archive: Страница по базе и холодному архиву вместе
         
     Returns:
-        bool: True если пользователь найден в product_users, False если нет
+        dict: frame - попытки входа (столбцы UnauthorizedLoginAttempt), next_cursor, prev_cursor
+    """
+    statement, direction = _unauthorized_attempts_page_statement(
+        username=username, limit=limit, since=since, until=until, cursor=cursor,
+        username_pattern=username_pattern, user_agent_contains=user_agent_contains, ip_network=ip_network
+    )
+    frame = _read_frame(statement, parse_dates=['attempted_at'])
+    if include_archive:
+        search = _archive_search(
+            username=username, username_pattern=username_pattern, user_agent_contains=user_agent_contains,
+            ip_network=ip_network, ip_index=_export_column_index(UNAUTHORIZED_ATTEMPTS_EXPORT_COLUMNS, 'ip_address')
+        )
+        archive_frame = _read_archive_page(
+            'unauthorized_login_attempts', UNAUTHORIZED_ATTEMPTS_EXPORT_COLUMNS, 'attempted_at', search,
+            cursor, limit, since=since, until=until
+        )
+        frame = _with_archive_page(frame, archive_frame, direction, limit, 'attempted_at', ['attempted_at'])
+    return keyset_page_frame(frame, direction, cursor, limit, 'attempted_at')
+
+@workload(WORKLOAD_REPORTING)
+def get_recent_unauthorized_login_attempts_frame(username: str = None, limit: int = 100,
+                                                 period: timedelta = None, username_pattern: str = None,
+                                                 user_agent_contains: str = None, ip_network: str = None) -> dict:
+    """
+    Первая (самая новая) страница попыток неавторизованного входа из кэша административной панели
+    
+    Кэш с ключом (фильтры, limit, period) при повторных обращениях догружает только попытки
+    с id больше уже загруженных и отбрасывает попытки, вышедшие за начало периода.
+    
+    Args:
+        username: Фильтр по имени пользователя (опционально)
+        limit: Записей на странице
+        period: Длительность периода до текущего момента (None - за все время)
+        username_pattern: Шаблон имени пользователя, * - любые символы (опционально)
+        user_agent_contains: Подстрока User Agent без учета регистра (опционально)
+        ip_network: IP адрес или сеть CIDR, в которую входит IP адрес (опционально)
+        
+    Returns:
+        dict: frame, next_cursor, prev_cursor (как get_unauthorized_login_attempts_frame)
+    """
+    since = datetime.now() - period if period else None
+    search = {
+        'username_pattern': username_pattern,
+        'user_agent_contains': user_agent_contains,
+        'ip_network': ip_network,
+    }
+    
+    def load():
+        statement, _ = _unauthorized_attempts_page_statement(
+            username=username, limit=limit, since=since, **search
+        )
+        return _read_frame(statement, parse_dates=['attempted_at'])
+    
+    def load_newer(max_id: int, settle_since: datetime):
+        statement, _ = _unauthorized_attempts_page_statement(
+            username=username, limit=limit, since=since, **search
+        )
+        newer = UnauthorizedLoginAttempt.id > max_id
+        if settle_since is not None:
+            newer = or_(newer, UnauthorizedLoginAttempt.attempted_at >= settle_since)
+        return _read_frame(statement.where(newer), parse_dates=['attempted_at'])
+    
+    return get_admin_data_cache().get_page(
+        ('unauthorized_login_attempts', username, limit, period, tuple(search.values())), load, load_newer, limit, 'attempted_at',
+        since=since
+    )
+
+def _unauthorized_attempts_conditions(username: str = None, since: datetime = None, until: datetime = None,
+                                      username_pattern: str = None,
+                                      user_agent_contains: str = None, ip_network: str = None) -> list:
+    """Условия отбора попыток входа по пользователю, периоду и поисковым фильтрам"""
+    conditions = []
+    if username:
+        conditions.append(UnauthorizedLoginAttempt.username == username)
+    if since is not None:
+        conditions.append(UnauthorizedLoginAttempt.attempted_at >= since)
+    if until is not None:
+        conditions.append(UnauthorizedLoginAttempt.attempted_at < until)
+    conditions.extend(_search_conditions(UnauthorizedLoginAttempt, username_pattern=username_pattern, user_agent_contains=user_agent_contains, ip_network=ip_network))
+    return conditions
+
+def _unauthorized_attempts_summary_query(username: str = None, since: datetime = None, until: datetime = None,
+                                         username_pattern: str = None,
+                                         user_agent_contains: str = None, ip_network: str = None):
+    """Запрос сводки по попыткам входа за период"""
+    attempted_at = UnauthorizedLoginAttempt.attempted_at
+    recent_since = datetime.now() - RECENT_ATTEMPTS_WINDOW
+    return select(
+        func.count().label('total_attempts'),
+        func.count(distinct(UnauthorizedLoginAttempt.username)).label('unique_users'),
+        func.count(distinct(UnauthorizedLoginAttempt.ip_address)).label('unique_ips'),
+        func.count().filter(attempted_at >= recent_since).label('recent_attempts'),
+        func.min(attempted_at).label('first_attempt'),
+        func.max(attempted_at).label('last_attempt'),
+    ).where(*_unauthorized_attempts_conditions(
+        username=username, since=since, until=until,
+        username_pattern=username_pattern, user_agent_contains=user_agent_contains, ip_network=ip_network
+    ))
+
+def _text_value(column):
+    """Значение столбца текстом: адрес INET без длины префикса (host), как его возвращает InetAddress"""
+    if isinstance(column.type, (InetAddress, INET)):
+        return func.host(column)
+    return cast(column, Text)
+
+def _unauthorized_attempts_grouped_query(group_column, counterpart_column, username: str = None,
+                                         since: datetime = None, until: datetime = None, limit: int = 10,
+                                         username_pattern: str = None,
+                                         user_agent_contains: str = None, ip_network: str = None):
+    """
+    Запрос агрегатов попыток входа с группировкой по одному столбцу
+
+    Для каждой группы считаются количество попыток, количество различных значений второго столбца
+    (IP для пользователя, пользователей для IP), время последней попытки, попытки за последние 24 часа
+    и первые несколько значений второго столбца.
+    """
+    attempted_at = UnauthorizedLoginAttempt.attempted_at
+    recent_since = datetime.now() - RECENT_ATTEMPTS_WINDOW
+    attempts = func.count().label('attempts')
+    last_attempt = func.max(attempted_at).label('last_attempt')
+    # ip_address в базе имеет тип INET - значения приводятся к тексту адреса, в том числе внутри массива
+    return (
+        select(
+            _text_value(group_column).label('key'),
+            attempts,
+            func.count(distinct(counterpart_column)).label('unique_counterparts'),
+            last_attempt,
+            func.count().filter(attempted_at >= recent_since).label('recent_attempts'),
+            func.array_agg(distinct(_text_value(counterpart_column)))
+                .filter(counterpart_column.isnot(None))[1:UNAUTHORIZED_GROUP_SAMPLE_SIZE]
+                .label('counterparts'),
+        )
+        .where(
+            group_column.isnot(None),
+            *_unauthorized_attempts_conditions(
+                username=username, since=since, until=until,
+                username_pattern=username_pattern, user_agent_contains=user_agent_contains, ip_network=ip_network
+            )
+        )
+        .group_by(group_column)
+        .order_by(attempts.desc(), last_attempt.desc())
+        .limit(limit)
+    )
+
+def _unauthorized_attempts_summary_to_dict(row) -> dict:
+    """Преобразование строки сводки попыток в словарь"""
+    return {
+        'total_attempts': row.total_attempts,
+        'unique_users': row.unique_users,
+        'unique_ips': row.unique_ips,
+        'recent_attempts': row.recent_attempts,
+        'first_attempt': row.first_attempt,
+        'last_attempt': row.last_attempt,
+    }
+
+def _unauthorized_attempts_by_username_to_dict(row) -> dict:
+    """Преобразование строки агрегатов по пользователю в словарь"""
+    return {
+        'username': row.key,
+        'attempts': row.attempts,
+        'unique_ips': row.unique_counterparts,
+        'last_attempt': row.last_attempt,
+        'recent_attempts': row.recent_attempts,
+        'ip_addresses': list(row.counterparts or []),
+    }
+
+def _unauthorized_attempts_by_ip_to_dict(row) -> dict:
+    """Преобразование строки агрегатов по IP адресу в словарь"""
+    return {
+        'ip_address': row.key,
+        'attempts': row.attempts,
+        'unique_users': row.unique_counterparts,
+        'last_attempt': row.last_attempt,
+        'recent_attempts': row.recent_attempts,
+        'usernames': list(row.counterparts or []),
+    }
+
+@workload(WORKLOAD_REPORTING)
+def get_unauthorized_attempts_summary(username: str = None, since: datetime = None, until: datetime = None,
+                                      username_pattern: str = None,
+                                      user_agent_contains: str = None, ip_network: str = None) -> dict:
+    """
+    Сводка по попыткам неавторизованного входа за период (агрегация на стороне базы)
+    
+    Args:
+        username: Фильтр по имени пользователя (опционально)
+        since: Начало периода (опционально)
+        until: Конец периода (опционально)
+        username_pattern: Шаблон имени пользователя, * - любые символы (опционально)
+        user_agent_contains: Подстрока User Agent без учета регистра (опционально)
+        ip_network: IP адрес или сеть CIDR, в которую входит IP адрес (опционально)
+        
+    Returns:
+        dict: Всего попыток, уникальных пользователей и IP, попыток за последние 24 часа,
+              время первой и последней попытки
     """
     db = get_db_session()
     try:
-        # Сначала проверяем, существует ли пользователь в таблице users
-        user = db.query(User).filter(User.username == username).first()
-        if not user:
-            return False
+        row = db.execute(_unauthorized_attempts_summary_query(
+            username=username, since=since, until=until,
+            username_pattern=username_pattern, user_agent_contains=user_agent_contains, ip_network=ip_network
+        )).one()
+        return _unauthorized_attempts_summary_to_dict(row)
+    finally:
+        db.close()
+
+@workload(WORKLOAD_REPORTING)
+def get_unauthorized_attempts_by_username(username: str = None, since: datetime = None,
+                                          until: datetime = None, limit: int = 10,
+                                          username_pattern: str = None,
+                                          user_agent_contains: str = None, ip_network: str = None) -> list:
+    """
+    Пользователи с наибольшим количеством попыток неавторизованного входа за период
+    
+    Args:
+        username: Фильтр по имени пользователя (опционально)
+        since: Начало периода (опционально)
+        until: Конец периода (опционально)
+        username_pattern: Шаблон имени пользователя, * - любые символы (опционально)
+        user_agent_contains: Подстрока User Agent без учета регистра (опционально)
+        ip_network: IP адрес или сеть CIDR, в которую входит IP адрес (опционально)
+        limit: Количество пользователей
         
-        # Проверяем, есть ли у пользователя доступ к продуктам
-        product_user = db.query(ProductUser).filter(ProductUser.user_id == user.id).first()
-        return product_user is not None
+    Returns:
+        list: Пользователи по убыванию количества попыток: попытки, уникальные IP,
+              последняя попытка, попытки за последние 24 часа, первые IP адреса
+    """
+    query = _unauthorized_attempts_grouped_query(
+        UnauthorizedLoginAttempt.username, UnauthorizedLoginAttempt.ip_address,
+        username=username, since=since, until=until, limit=limit,
+        username_pattern=username_pattern, user_agent_contains=user_agent_contains, ip_network=ip_network
+    )
+    db = get_db_session()
+    try:
+        return [_unauthorized_attempts_by_username_to_dict(row) for row in db.execute(query)]
     finally:
         db.close()
 
-def cleanup_old_unauthorized_attempts(days: int = 30) -> int:
+@workload(WORKLOAD_REPORTING)
+def get_unauthorized_attempts_by_ip(username: str = None, since: datetime = None,
+                                    until: datetime = None, limit: int = 10,
+                                    username_pattern: str = None,
+                                    user_agent_contains: str = None, ip_network: str = None) -> list:
     """
-    Очистка старых записей попыток неавторизованного входа
+    IP адреса с наибольшим количеством попыток неавторизованного входа за период
     
     Args:
-        days: Количество дней для хранения записей
+        username: Фильтр по имени пользователя (опционально)
+        since: Начало периода (опционально)
+        until: Конец периода (опционально)
+        username_pattern: Шаблон имени пользователя, * - любые символы (опционально)
+        user_agent_contains: Подстрока User Agent без учета регистра (опционально)
+        ip_network: IP адрес или сеть CIDR, в которую входит IP адрес (опционально)
+        limit: Количество IP адресов
         
     Returns:
-        int: Количество удаленных записей
+        list: IP адреса по убыванию количества попыток: попытки, уникальные пользователи,
+              последняя попытка, попытки за последние 24 часа, первые имена пользователей
     """
+    query = _unauthorized_attempts_grouped_query(
+        UnauthorizedLoginAttempt.ip_address, UnauthorizedLoginAttempt.username,
+        username=username, since=since, until=until, limit=limit,
+        username_pattern=username_pattern, user_agent_contains=user_agent_contains, ip_network=ip_network
+    )
     db = get_db_session()
     try:
-        result = db.execute(func.text("""
-            DELETE FROM unauthorized_login_attempts 
-            WHERE attempted_at < CURRENT_TIMESTAMP - INTERVAL '%s days'
-        """ % days))
+        return [_unauthorized_attempts_by_ip_to_dict(row) for row in db.execute(query)]
+    finally:
+        db.close()
+
+def _subnet_expression(ip_column, ipv4_prefix: int = SUBNET_IPV4_PREFIX, ipv6_prefix: int = SUBNET_IPV6_PREFIX):
+    """
+    Подсеть IP адреса: network(set_masklen(ip, префикс)) с префиксом по семейству адреса
+
+    Префиксы подставляются в запрос литералами, чтобы выражение в SELECT и GROUP BY совпадало
+    и при параметрах на стороне сервера (asyncpg).
+
+    Raises:
+        ValueError: Длина префикса вне диапазона 0-32 (IPv4) или 0-128 (IPv6)
+    """
+    ipv4_prefix, ipv6_prefix = int(ipv4_prefix), int(ipv6_prefix)
+    if not 0 <= ipv4_prefix <= 32 or not 0 <= ipv6_prefix <= 128:
+        raise ValueError(f"Некорректная длина префикса подсети: /{ipv4_prefix} (IPv4), /{ipv6_prefix} (IPv6)")
+    masklen = case(
+        (func.family(ip_column) == literal_column('4'), literal_column(str(ipv4_prefix))),
+        else_=literal_column(str(ipv6_prefix)),
+    )
+    return func.network(func.set_masklen(ip_column, masklen))
+
+def _unauthorized_attempts_by_subnet_query(ipv4_prefix: int = SUBNET_IPV4_PREFIX, ipv6_prefix: int = SUBNET_IPV6_PREFIX,
+                                           username: str = None, since: datetime = None, until: datetime = None,
+                                           limit: int = 10, username_pattern: str = None,
+                                           user_agent_contains: str = None, ip_network: str = None):
+    """Запрос агрегатов попыток входа по подсетям IP адресов"""
+    ip_address = UnauthorizedLoginAttempt.ip_address
+    attempted_at = UnauthorizedLoginAttempt.attempted_at
+    subnet = _subnet_expression(ip_address, ipv4_prefix, ipv6_prefix)
+    recent_since = datetime.now() - RECENT_ATTEMPTS_WINDOW
+    attempts = func.count().label('attempts')
+    last_attempt = func.max(attempted_at).label('last_attempt')
+    return (
+        select(
+            cast(subnet, Text).label('subnet'),
+            attempts,
+            func.count(distinct(ip_address)).label('unique_ips'),
+            func.count(distinct(UnauthorizedLoginAttempt.username)).label('unique_users'),
+            func.min(attempted_at).label('first_attempt'),
+            last_attempt,
+            func.count().filter(attempted_at >= recent_since).label('recent_attempts'),
+            func.array_agg(distinct(func.host(ip_address)))[1:UNAUTHORIZED_GROUP_SAMPLE_SIZE].label('ip_addresses'),
+        )
+        .where(
+            ip_address.isnot(None),
+            *_unauthorized_attempts_conditions(
+                username=username, since=since, until=until,
+                username_pattern=username_pattern, user_agent_contains=user_agent_contains, ip_network=ip_network
+            )
+        )
+        .group_by(subnet)
+        .order_by(attempts.desc(), last_attempt.desc())
+        .limit(limit)
+    )
+
+def _unauthorized_attempts_by_subnet_to_dict(row) -> dict:
+    """Преобразование строки агрегатов по подсети в словарь"""
+    return {
+        'subnet': row.subnet,
+        'attempts': row.attempts,
+        'unique_ips': row.unique_ips,
+        'unique_users': row.unique_users,
+        'first_attempt': row.first_attempt,
+        'last_attempt': row.last_attempt,
+        'recent_attempts': row.recent_attempts,
+        'ip_addresses': list(row.ip_addresses or []),
+    }
+
+@workload(WORKLOAD_REPORTING)
+def get_unauthorized_attempts_by_subnet(username: str = None, since: datetime = None, until: datetime = None,
+                                        limit: int = 10, ipv4_prefix: int = SUBNET_IPV4_PREFIX,
+                                        ipv6_prefix: int = SUBNET_IPV6_PREFIX, username_pattern: str = None,
+                                        user_agent_contains: str = None, ip_network: str = None) -> list:
+    """
+    Подсети с наибольшим количеством попыток неавторизованного входа за период
+    
+    Попытки с разных адресов одной подсети (например, перебор с соседних адресов /24)
+    складываются в одну группу.
+    
+    Args:
+        username: Фильтр по имени пользователя (опционально)
+        since: Начало периода (опционально)
+        until: Конец периода (опционально)
+        limit: Количество подсетей
+        ipv4_prefix: Длина префикса подсети IPv4
+        ipv6_prefix: Длина префикса подсети IPv6
+        username_pattern: Шаблон имени пользователя, * - любые символы (опционально)
+        user_agent_contains: Подстрока User Agent без учета регистра (опционально)
+        ip_network: IP адрес или сеть CIDR, в которую входит IP адрес (опционально)
         
-        db.commit()
-        return result.rowcount
+    Returns:
+        list: Подсети (CIDR) по убыванию количества попыток: попытки, уникальные IP и пользователи,
+              первая и последняя попытки, попытки за последние 24 часа, первые IP адреса
+    """
+    query = _unauthorized_attempts_by_subnet_query(
+        ipv4_prefix=ipv4_prefix, ipv6_prefix=ipv6_prefix,
+        username=username, since=since, until=until, limit=limit,
+        username_pattern=username_pattern, user_agent_contains=user_agent_contains, ip_network=ip_network
+    )
+    db = get_db_session()
+    try:
+        return [_unauthorized_attempts_by_subnet_to_dict(row) for row in db.execute(query)]
     finally:
         db.close()
 
-def get_user_sessions(username: str = None, limit: int = 100, active_only: bool = False) -> list:
+@workload(WORKLOAD_AUTH)
+def check_user_in_product_users(username: str) -> bool:
+    """
+    Проверка наличия пользователя в таблице product_users
+    
+    Args:
+        username: Имя пользователя
+        
+    Returns:
+        bool: True если пользователь найден в product_users, False если нет
+    """
+    snapshot = get_user_authorization_snapshot(username=username)
+    return bool(snapshot and snapshot['available_products'])
+
+def _cleanup_old_unauthorized_attempts(connection, days: int, archived: bool = False) -> int:
+    """
+    Очистка старых попыток входа: удаление секций (и строк секции DEFAULT) или DELETE для несекционированной
+    таблицы (после переноса в архив строки старше срока уже удалены, остаются только пустые секции)
+    """
+    if is_partitioned(connection, 'unauthorized_login_attempts'):
+        return drop_expired_partitions(
+            connection, 'unauthorized_login_attempts', days,
+            column=PARTITIONED_TABLES['unauthorized_login_attempts']
+        )
+    if archived:
+        return 0
+    result = connection.execute(CLEANUP_OLD_UNAUTHORIZED_ATTEMPTS_SQL, {'days': days})
+    connection.commit()
+    return result.rowcount
+
+@workload(WORKLOAD_MAINTENANCE)
+def cleanup_old_unauthorized_attempts(days: int = 30) -> int:
+    """
+    Очистка старых записей попыток неавторизованного входа.
+    Для секционированной таблицы удаляются целые секции старше срока хранения.
+    При включенном архиве (раздел archive в config.yaml) записи сначала переносятся в архив,
+    а из архива удаляются дни старше archive.retention_days.
+    
+    Args:
+        days: Количество дней для хранения записей
+        
+    Returns:
+        int: Количество удаленных (перенесенных в архив) записей
+    """
+    archived = is_archive_enabled()
+    moved = _archive_expired('unauthorized_login_attempts', days) if archived else 0
+    with get_engine().connect() as connection:
+        return moved + _cleanup_old_unauthorized_attempts(connection, days, archived=archived)
+
+@workload(WORKLOAD_REPORTING)
+def get_user_sessions(username: str = None, limit: int = 100, active_only: bool = False, cursor: str = None,
+                      username_pattern: str = None, user_agent_contains: str = None, ip_network: str = None) -> list:
     """
     Получение списка сессий пользователей
     
@@ -488,85 +1802,1223 @@ def get_user_sessions(username: str = None, limit: int = 100, active_only: bool
         username: Фильтр по имени пользователя (опционально)
         limit: Максимальное количество записей
         active_only: Показывать только активные сессии
+        cursor: Курсор страницы из get_user_sessions_page (опционально)
+        username_pattern: Шаблон имени пользователя, * - любые символы (опционально)
+        user_agent_contains: Подстрока User Agent без учета регистра (опционально)
+        ip_network: IP адрес или сеть CIDR, в которую входит IP адрес (опционально)
         
     Returns:
         list: Список сессий пользователей
     """
+    return get_user_sessions_page(
+        username=username, limit=limit, active_only=active_only, cursor=cursor,
+        username_pattern=username_pattern, user_agent_contains=user_agent_contains, ip_network=ip_network
+    )['items']
+
+def _user_sessions_conditions(username: str = None, active_only: bool = False, username_pattern: str = None,
+                              user_agent_contains: str = None, ip_network: str = None) -> list:
+    """Условия отбора сессий по пользователю, активности и поисковым фильтрам"""
+    conditions = []
+    if username:
+        conditions.append(UserSession.username == username)
+    if active_only:
+        conditions.append(UserSession.is_active == True)
+    conditions.extend(_search_conditions(UserSession, username_pattern=username_pattern, user_agent_contains=user_agent_contains, ip_network=ip_network))
+    return conditions
+
+def _user_sessions_page_statement(username: str = None, limit: int = 100, active_only: bool = False, cursor: str = None,
+                                  username_pattern: str = None, user_agent_contains: str = None, ip_network: str = None):
+    """Запрос страницы сессий по ключу (created_at, id)"""
+    statement = select(UserSession).where(*_user_sessions_conditions(
+        username=username, active_only=active_only,
+        username_pattern=username_pattern, user_agent_contains=user_agent_contains, ip_network=ip_network
+    ))
+    return keyset_page_statement(statement, UserSession.created_at, UserSession.id, cursor=cursor, limit=limit)
+
+@workload(WORKLOAD_REPORTING)
+def get_user_sessions_page(username: str = None, limit: int = 100, active_only: bool = False, cursor: str = None,
+                           username_pattern: str = None, user_agent_contains: str = None, ip_network: str = None) -> dict:
+    """
+    Получение страницы сессий пользователей (от новых к старым)
+    
+    Args:
+        username: Фильтр по имени пользователя (опционально)
+        limit: Записей на странице
+        active_only: Показывать только активные сессии
+        cursor: Курсор страницы (None - самые новые сессии)
+        username_pattern: Шаблон имени пользователя, * - любые символы (опционально)
+        user_agent_contains: Подстрока User Agent без учета регистра (опционально)
+        ip_network: IP адрес или сеть CIDR, в которую входит IP адрес (опционально)
+        
+    Returns:
+        dict: items - сессии, next_cursor - более старые сессии,
+              prev_cursor - более новые сессии (None, если страницы нет)
+    """
+    statement, direction = _user_sessions_page_statement(
+        username=username, limit=limit, active_only=active_only, cursor=cursor,
+        username_pattern=username_pattern, user_agent_contains=user_agent_contains, ip_network=ip_network
+    )
     db = get_db_session()
     try:
-        query = db.query(UserSession)
-        
-        if username:
-            query = query.filter(UserSession.username == username)
-        
-        if active_only:
-            query = query.filter(UserSession.is_active == True)
-        
-        sessions = query.order_by(UserSession.created_at.desc()).limit(limit).all()
-        
-        return [
-            {
-                'id': session.id,
-                'username': session.username,
-                'session_id': session.session_id,
-                'created_at': session.created_at,
-                'last_activity': session.last_activity,
-                'ip_address': session.ip_address,
-                'user_agent': session.user_agent,
-                'is_active': session.is_active
-            }
-            for session in sessions
-        ]
+        sessions = [_user_session_to_dict(session) for session in db.scalars(statement)]
+        return keyset_page_result(sessions, direction, cursor, limit, 'created_at')
+    finally:
+        db.close()
+
+@workload(WORKLOAD_REPORTING)
+def get_user_sessions_frame(username: str = None, limit: int = 100, active_only: bool = False, cursor: str = None,
+                            username_pattern: str = None, user_agent_contains: str = None, ip_network: str = None,
+                            include_archive: bool = False) -> dict:
+    """
+    Получение страницы сессий пользователей в виде pandas.DataFrame
+
+    Строки собираются сразу в столбцы, без объектов ORM и словарей на каждую строку.
+    
+    Args:
+        username: Фильтр по имени пользователя (опционально)
+        limit: Записей на странице
+        active_only: Показывать только активные сессии
+        cursor: Курсор страницы (None - самые новые сессии)
+        username_pattern: Шаблон имени пользователя, * - любые символы (опционально)
+        user_agent_contains: Подстрока User Agent без учета регистра (опционально)
+        ip_network: IP адрес или сеть CIDR, в которую входит IP адрес (опционально)
+        include_archive: Страница по базе и холодному архиву вместе
+        
+    Returns:
+        dict: frame - сессии (столбцы UserSession), next_cursor, prev_cursor
+    """
+    parse_dates = ['created_at', 'last_activity']
+    statement, direction = _user_sessions_page_statement(
+        username=username, limit=limit, active_only=active_only, cursor=cursor,
+        username_pattern=username_pattern, user_agent_contains=user_agent_contains, ip_network=ip_network
+    )
+    frame = _read_frame(statement, parse_dates=parse_dates)
+    if include_archive:
+        search = _user_sessions_archive_search(
+            username=username, active_only=active_only, username_pattern=username_pattern,
+            user_agent_contains=user_agent_contains, ip_network=ip_network
+        )
+        archive_frame = _read_archive_page(
+            'user_sessions', USER_SESSIONS_EXPORT_COLUMNS, 'created_at', search, cursor, limit
+        )
+        frame = _with_archive_page(frame, archive_frame, direction, limit, 'created_at', parse_dates)
+    return keyset_page_frame(frame, direction, cursor, limit, 'created_at')
+
+@workload(WORKLOAD_REPORTING)
+def get_recent_user_sessions_frame(username: str = None, limit: int = 100, active_only: bool = False,
+                                   username_pattern: str = None, user_agent_contains: str = None, ip_network: str = None) -> dict:
+    """
+    Первая (самая новая) страница сессий из кэша административной панели
+    
+    Кэш с ключом (фильтры, limit, active_only) при повторных обращениях догружает только сессии
+    с id больше уже загруженных, а раз в admin_cache.ttl_seconds загружает страницу заново.
+    
+    Args:
+        username: Фильтр по имени пользователя (опционально)
+        limit: Записей на странице
+        active_only: Показывать только активные сессии
+        username_pattern: Шаблон имени пользователя, * - любые символы (опционально)
+        user_agent_contains: Подстрока User Agent без учета регистра (опционально)
+        ip_network: IP адрес или сеть CIDR, в которую входит IP адрес (опционально)
+        
+    Returns:
+        dict: frame, next_cursor, prev_cursor (как get_user_sessions_frame)
+    """
+    parse_dates = ['created_at', 'last_activity']
+    search = {
+        'username_pattern': username_pattern,
+        'user_agent_contains': user_agent_contains,
+        'ip_network': ip_network,
+    }
+    
+    def load():
+        statement, _ = _user_sessions_page_statement(
+            username=username, limit=limit, active_only=active_only, **search
+        )
+        return _read_frame(statement, parse_dates=parse_dates)
+    
+    def load_newer(max_id: int, settle_since: datetime):
+        statement, _ = _user_sessions_page_statement(
+            username=username, limit=limit, active_only=active_only, **search
+        )
+        newer = UserSession.id > max_id
+        if settle_since is not None:
+            newer = or_(newer, UserSession.created_at >= settle_since)
+        return _read_frame(statement.where(newer), parse_dates=parse_dates)
+    
+    return get_admin_data_cache().get_page(
+        ('user_sessions', username, limit, active_only, tuple(search.values())), load, load_newer, limit, 'created_at'
+    )
+
+def _user_sessions_by_subnet_query(ipv4_prefix: int = SUBNET_IPV4_PREFIX, ipv6_prefix: int = SUBNET_IPV6_PREFIX,
+                                   username: str = None, active_only: bool = False, since: datetime = None,
+                                   limit: int = 10, username_pattern: str = None,
+                                   user_agent_contains: str = None, ip_network: str = None):
+    """Запрос агрегатов сессий по подсетям IP адресов"""
+    ip_address = UserSession.ip_address
+    subnet = _subnet_expression(ip_address, ipv4_prefix, ipv6_prefix)
+    sessions = func.count().label('sessions')
+    last_activity = func.max(UserSession.last_activity).label('last_activity')
+    conditions = _user_sessions_conditions(
+        username=username, active_only=active_only,
+        username_pattern=username_pattern, user_agent_contains=user_agent_contains, ip_network=ip_network
+    )
+    if since:
+        conditions.append(UserSession.created_at >= since)
+    return (
+        select(
+            cast(subnet, Text).label('subnet'),
+            sessions,
+            func.count().filter(UserSession.is_active == True).label('active_sessions'),
+            func.count(distinct(ip_address)).label('unique_ips'),
+            func.count(distinct(UserSession.username)).label('unique_users'),
+            last_activity,
+            func.array_agg(distinct(UserSession.username))[1:UNAUTHORIZED_GROUP_SAMPLE_SIZE].label('usernames'),
+        )
+        .where(ip_address.isnot(None), *conditions)
+        .group_by(subnet)
+        .order_by(sessions.desc(), last_activity.desc().nulls_last())
+        .limit(limit)
+    )
+
+def _user_sessions_by_subnet_to_dict(row) -> dict:
+    """Преобразование строки агрегатов сессий по подсети в словарь"""
+    return {
+        'subnet': row.subnet,
+        'sessions': row.sessions,
+        'active_sessions': row.active_sessions,
+        'unique_ips': row.unique_ips,
+        'unique_users': row.unique_users,
+        'last_activity': row.last_activity,
+        'usernames': list(row.usernames or []),
+    }
+
+@workload(WORKLOAD_REPORTING)
+def get_user_sessions_by_subnet(username: str = None, active_only: bool = False, since: datetime = None,
+                                limit: int = 10, ipv4_prefix: int = SUBNET_IPV4_PREFIX,
+                                ipv6_prefix: int = SUBNET_IPV6_PREFIX, username_pattern: str = None,
+                                user_agent_contains: str = None, ip_network: str = None) -> list:
+    """
+    Подсети с наибольшим количеством сессий пользователей
+
+    Args:
+        username: Фильтр по имени пользователя (опционально)
+        active_only: Только активные сессии
+        since: Сессии, созданные не раньше (опционально)
+        limit: Количество подсетей
+        ipv4_prefix: Длина префикса подсети IPv4
+        ipv6_prefix: Длина префикса подсети IPv6
+        username_pattern: Шаблон имени пользователя, * - любые символы (опционально)
+        user_agent_contains: Подстрока User Agent без учета регистра (опционально)
+        ip_network: IP адрес или сеть CIDR, в которую входит IP адрес (опционально)
+
+    Returns:
+        list: Подсети (CIDR) по убыванию количества сессий: сессии, активные сессии, уникальные IP
+              и пользователи, последняя активность, первые имена пользователей
+    """
+    query = _user_sessions_by_subnet_query(
+        ipv4_prefix=ipv4_prefix, ipv6_prefix=ipv6_prefix,
+        username=username, active_only=active_only, since=since, limit=limit,
+        username_pattern=username_pattern, user_agent_contains=user_agent_contains, ip_network=ip_network
+    )
+    db = get_db_session()
+    try:
+        return [_user_sessions_by_subnet_to_dict(row) for row in db.execute(query)]
     finally:
         db.close()
 
-def get_user_sessions_stats() -> dict:
+def _user_sessions_stats_statement(mode: str = SESSION_STATS_QUERY):
+    """
+    Запрос статистики по сессиям за один проход
+
+    В режиме query все показатели считаются одним COUNT(*) FILTER (...) по user_sessions,
+    в режиме counters общие показатели читаются из счетчиков, поддерживаемых триггерами,
+    а сессии за 24 часа - по индексу (created_at, id).
+    """
+    recent_since = func.current_timestamp() - literal_column("INTERVAL '24 hours'")
+    if mode == SESSION_STATS_COUNTERS:
+        recent_sessions = (
+            select(func.count())
+            .select_from(UserSession)
+            .where(UserSession.created_at > recent_since)
+            .scalar_subquery()
+        )
+        return select(
+            func.coalesce(func.sum(UserSessionCounter.total_sessions), 0).label('total_sessions'),
+            func.coalesce(func.sum(UserSessionCounter.active_sessions), 0).label('active_sessions'),
+            func.coalesce(func.sum(UserSessionCounter.unique_users), 0).label('unique_users'),
+            recent_sessions.label('recent_sessions'),
+        )
+    if mode != SESSION_STATS_QUERY:
+        raise ValueError(f"Неизвестный режим статистики сессий: {mode}")
+    return select(
+        func.count().label('total_sessions'),
+        func.count().filter(UserSession.is_active == True).label('active_sessions'),
+        func.count(distinct(UserSession.username)).label('unique_users'),
+        func.count().filter(UserSession.created_at > recent_since).label('recent_sessions'),
+    ).select_from(UserSession)
+
+def _user_sessions_stats_to_dict(row) -> dict:
+    """Преобразование строки статистики сессий в словарь"""
+    return {
+        'total_sessions': int(row.total_sessions),
+        'active_sessions': int(row.active_sessions),
+        'unique_users': int(row.unique_users),
+        'recent_sessions': int(row.recent_sessions)
+    }
+
+def get_session_stats_mode() -> str:
+    """Режим статистики сессий из config.yaml (query или counters)"""
+    return get_config_section('session_stats').get('mode', SESSION_STATS_QUERY)
+
+@workload(WORKLOAD_REPORTING)
+def get_user_sessions_stats(mode: str = None) -> dict:
     """
     Получение статистики по сессиям пользователей
     
+    Args:
+        mode: query - один проход по user_sessions, counters - счетчики, поддерживаемые
+              триггерами (по умолчанию - session_stats.mode из config.yaml)
+    
     Returns:
         dict: Статистика по сессиям
     """
     db = get_db_session()
     try:
-        total_sessions = db.query(UserSession).count()
-        active_sessions = db.query(UserSession).filter(UserSession.is_active == True).count()
-        unique_users = db.query(UserSession.username).distinct().count()
+        row = db.execute(_user_sessions_stats_statement(mode or get_session_stats_mode())).one()
+        return _user_sessions_stats_to_dict(row)
+    finally:
+        db.close()
+
+@workload(WORKLOAD_MAINTENANCE)
+def rebuild_user_session_counters():
+    """
+    Пересчет счетчиков сессий по таблице user_sessions
+    (после ручного вмешательства; при включении режима counters его выполняет set_session_counters_enabled)
+    """
+    db = get_db_session()
+    try:
+        db.execute(text("SELECT rebuild_user_session_counters()"))
+        db.commit()
+    finally:
+        db.close()
+
+# Триггеры, поддерживающие счетчики сессий (включены только в режиме session_stats.mode: counters)
+SESSION_COUNTER_TRIGGERS = ('trigger_user_session_counters', 'trigger_user_session_counters_truncate')
+
+SESSION_COUNTERS_ENABLED_SQL = text("""
+    SELECT tgenabled <> 'D' FROM pg_trigger
+    WHERE tgrelid = 'user_sessions'::regclass AND tgname = 'trigger_user_session_counters'
+""")
+
+def _session_counters_enabled(connection) -> bool:
+    """Включены ли триггеры счетчиков сессий"""
+    return bool(connection.execute(SESSION_COUNTERS_ENABLED_SQL).scalar())
+
+@workload(WORKLOAD_MAINTENANCE)
+def set_session_counters_enabled(enabled: bool) -> bool:
+    """
+    Включение или отключение триггеров счетчиков сессий.
+    При включении счетчики пересчитываются в той же транзакции, при отключении очищаются,
+    чтобы устаревшие значения нельзя было прочитать.
+    
+    Args:
+        enabled: True - режим counters, False - режим query
+        
+    Returns:
+        bool: True если состояние триггеров изменилось
+    """
+    with get_engine().connect() as connection:
+        if _session_counters_enabled(connection) == enabled:
+            return False
+        action = 'ENABLE' if enabled else 'DISABLE'
+        for trigger in SESSION_COUNTER_TRIGGERS:
+            connection.execute(text(f"ALTER TABLE user_sessions {action} TRIGGER {trigger}"))
+        if enabled:
+            connection.execute(text("SELECT rebuild_user_session_counters()"))
+        else:
+            connection.execute(text("TRUNCATE user_session_counters, user_session_user_counts"))
+        connection.commit()
+    return True
+
+@workload(WORKLOAD_MAINTENANCE)
+def sync_session_counters() -> int:
+    """
+    Приведение триггеров счетчиков сессий в соответствие с session_stats.mode из config.yaml
+    
+    Returns:
+        int: 1 если состояние триггеров изменилось, иначе 0
+    """
+    mode = get_session_stats_mode()
+    if mode not in (SESSION_STATS_QUERY, SESSION_STATS_COUNTERS):
+        raise ValueError(f"Неизвестный режим статистики сессий: {mode}")
+    return int(set_session_counters_enabled(mode == SESSION_STATS_COUNTERS))
+
+def _subtract_user_session_partition(connection, partition_name: str):
+    """Вычитание строк отсоединенной секции из счетчиков сессий (режим session_stats.mode: counters)"""
+    connection.execute(
+        text("SELECT subtract_user_session_partition(CAST(:partition AS regclass))"),
+        {'partition': partition_name}
+    )
+
+def _cleanup_old_user_sessions(connection, days: int, archived: bool = False) -> int:
+    """
+    Очистка старых неактивных сессий: удаление секций (и строк секции DEFAULT) или DELETE для несекционированной
+    таблицы (после переноса в архив неактивные сессии старше срока уже удалены)
+    """
+    if is_partitioned(connection, 'user_sessions'):
+        return drop_expired_partitions(
+            connection, 'user_sessions', days,
+            keep_condition='is_active IS DISTINCT FROM FALSE',
+            before_drop=_subtract_user_session_partition if _session_counters_enabled(connection) else None,
+            column=PARTITIONED_TABLES['user_sessions']
+        )
+    if archived:
+        return 0
+    result = connection.execute(CLEANUP_OLD_USER_SESSIONS_SQL, {'days': days})
+    connection.commit()
+    return result.rowcount
+
+@workload(WORKLOAD_MAINTENANCE)
+def cleanup_old_user_sessions(days: int = 30) -> int:
+    """
+    Очистка старых записей сессий пользователей.
+    Для секционированной таблицы удаляются целые секции старше срока хранения
+    (секция с активными сессиями не удаляется - из нее удаляются только неактивные).
+    При включенном архиве неактивные сессии сначала переносятся в архив.
+    
+    Args:
+        days: Количество дней для хранения записей
+        
+    Returns:
+        int: Количество удаленных (перенесенных в архив) записей
+    """
+    archived = is_archive_enabled()
+    moved = _archive_expired('user_sessions', days) if archived else 0
+    with get_engine().connect() as connection:
+        return moved + _cleanup_old_user_sessions(connection, days, archived=archived)
+
+# Секционированные таблицы: таблица -> столбец секционирования
+PARTITIONED_TABLES = {
+    'unauthorized_login_attempts': 'attempted_at',
+    'user_sessions': 'created_at',
+}
+
+# Размер секций и количество секций, создаваемых заранее, по умолчанию
+PARTITIONING_DEFAULTS = {
+    'unauthorized_login_attempts': {'interval': PARTITION_DAY, 'ahead': 7},
+    'user_sessions': {'interval': PARTITION_MONTH, 'ahead': 2},
+}
+
+def get_partitioning_config(table: str) -> dict:
+    """
+    Настройки секционирования таблицы (раздел partitioning в config.yaml)
+    
+    Args:
+        table: Имя секционированной таблицы
+        
+    Returns:
+        dict: interval (day или month) и ahead (количество секций вперед)
+    """
+    config = dict(PARTITIONING_DEFAULTS[table])
+    config.update(get_config_section('partitioning').get(table) or {})
+    return config
+
+@workload(WORKLOAD_MAINTENANCE)
+def maintain_partitions() -> int:
+    """
+    Создание секций текущего и следующих периодов для секционированных таблиц
+    
+    Returns:
+        int: Количество созданных секций
+    """
+    created = 0
+    with get_engine().connect() as connection:
+        for table, column in PARTITIONED_TABLES.items():
+            if not is_partitioned(connection, table):
+                continue
+            config = get_partitioning_config(table)
+            created += ensure_partitions(connection, table, column, config['interval'], config['ahead'])
+    return created
+
+# Версии схемы: файлы schema/NNNN_имя.sql (их же применяет init.sql)
+SCHEMA_MIGRATIONS = load_migrations()
+
+@workload(WORKLOAD_MAINTENANCE)
+def upgrade_schema(target: int = None) -> list:
+    """
+    Применение недостающих миграций схемы
+
+    Args:
+        target: Последняя применяемая версия (по умолчанию - все)
+
+    Returns:
+        list: Номера примененных версий
+    """
+    with get_engine().connect() as connection:
+        return upgrade(connection, SCHEMA_MIGRATIONS, target=target)
+
+@workload(WORKLOAD_MAINTENANCE)
+def check_schema_drift() -> dict:
+    """
+    Проверка схемы базы на соответствие моделям
+
+    Returns:
+        dict: pending - неприменные миграции (версия, имя), drift - описания расхождений схемы
+    """
+    with get_engine().connect() as connection:
+        return {
+            'pending': [
+                (migration.version, migration.name)
+                for migration in get_pending_migrations(connection, SCHEMA_MIGRATIONS)
+            ],
+            'drift': check_drift(connection, Base.metadata, PARTITIONED_TABLES),
+        }
+
+# Срок хранения агрегатов по интервалам по умолчанию (дни, None - бессрочно)
+ROLLUP_DEFAULT_RETENTION_DAYS = {
+    ROLLUP_MINUTE: 2,
+    ROLLUP_HOUR: 90,
+    ROLLUP_DAY: None,
+}
+
+def get_rollup_retention_days() -> dict:
+    """Срок хранения агрегатов по интервалам (раздел rollups.retention_days в config.yaml)"""
+    retention = dict(ROLLUP_DEFAULT_RETENTION_DAYS)
+    retention.update(get_config_section('rollups').get('retention_days') or {})
+    return retention
+
+@workload(WORKLOAD_MAINTENANCE)
+def refresh_rollups(batch_size: int = None, settle_seconds: float = None) -> int:
+    """
+    Дополнение агрегатов попыток входа и сессий строками новее сохраненных отметок
+    и удаление агрегатов старше срока хранения
+    
+    Args:
+        batch_size: Количество строк исходной таблицы в одной транзакции
+        settle_seconds: Задержка обработки свежих строк (незавершенные транзакции)
+        
+    Returns:
+        int: Количество обработанных строк исходных таблиц
+    """
+    rollups_config = get_config_section('rollups')
+    if batch_size is None:
+        batch_size = rollups_config.get('batch_size', 50000)
+    if settle_seconds is None:
+        settle_seconds = rollups_config.get('settle_seconds', 60)
+    
+    with get_engine().connect() as connection:
+        processed = refresh_attempt_rollups(connection, batch_size=batch_size, settle_seconds=settle_seconds)
+        processed += refresh_session_rollups(connection, batch_size=batch_size, settle_seconds=settle_seconds)
+        prune_rollups(connection, get_rollup_retention_days())
+    return processed
+
+def _rollup_range_conditions(model, granularity: str, since: datetime = None, until: datetime = None) -> list:
+    """Условия выборки агрегатов интервала за период (границы округляются вниз до интервала)"""
+    conditions = [model.granularity == granularity]
+    if since is not None:
+        conditions.append(model.bucket_start >= truncate_to_granularity(since, granularity))
+    if until is not None:
+        conditions.append(model.bucket_start < truncate_to_granularity(until, granularity))
+    return conditions
+
+@workload(WORKLOAD_REPORTING)
+def get_unauthorized_attempts_trend(since: datetime = None, until: datetime = None, username: str = None,
+                                    ip_address: str = None, reason: str = None, granularity: str = None) -> dict:
+    """
+    Динамика попыток неавторизованного входа по агрегатам
+    
+    Args:
+        since: Начало периода (опционально)
+        until: Конец периода (опционально)
+        username: Фильтр по имени пользователя (опционально)
+        ip_address: Фильтр по IP адресу (опционально)
+        reason: Фильтр по причине (опционально)
+        granularity: minute, hour или day (по умолчанию - самый крупный подходящий для периода)
+        
+    Returns:
+        dict: granularity - выбранный интервал, points - список {'bucket_start', 'attempts'}
+    """
+    granularity = granularity or choose_granularity(since, until, get_rollup_retention_days())
+    conditions = _rollup_range_conditions(UnauthorizedAttemptRollup, granularity, since, until)
+    if username:
+        conditions.append(UnauthorizedAttemptRollup.username == username)
+    if ip_address:
+        conditions.append(UnauthorizedAttemptRollup.ip_address == ip_address)
+    if reason:
+        conditions.append(UnauthorizedAttemptRollup.reason == reason)
+    
+    query = (
+        select(UnauthorizedAttemptRollup.bucket_start, func.sum(UnauthorizedAttemptRollup.attempts).label('attempts'))
+        .where(*conditions)
+        .group_by(UnauthorizedAttemptRollup.bucket_start)
+        .order_by(UnauthorizedAttemptRollup.bucket_start)
+    )
+    db = get_db_session()
+    try:
+        return {
+            'granularity': granularity,
+            'points': [
+                {'bucket_start': row.bucket_start, 'attempts': int(row.attempts)}
+                for row in db.execute(query)
+            ]
+        }
+    finally:
+        db.close()
+
+@workload(WORKLOAD_REPORTING)
+def get_unauthorized_attempts_rollup_totals(group_by: str = 'username', since: datetime = None,
+                                            until: datetime = None, limit: int = 10,
+                                            granularity: str = None) -> list:
+    """
+    Количество попыток неавторизованного входа за период по пользователям, IP адресам или причинам
+    
+    Args:
+        group_by: username, ip_address или reason
+        since: Начало периода (опционально)
+        until: Конец периода (опционально)
+        limit: Количество записей
+        granularity: minute, hour или day (по умолчанию - самый крупный подходящий для периода)
         
-        # Сессии за последние 24 часа
-        recent_sessions = db.execute(func.text("""
-            SELECT COUNT(*) FROM user_sessions 
-            WHERE created_at > CURRENT_TIMESTAMP - INTERVAL '24 hours'
-        """)).scalar()
+    Returns:
+        list: Список {'key', 'attempts'} по убыванию количества попыток
+    """
+    if group_by not in ('username', 'ip_address', 'reason'):
+        raise ValueError(f"Неизвестное поле группировки: {group_by}")
+    granularity = granularity or choose_granularity(since, until, get_rollup_retention_days())
+    group_column = getattr(UnauthorizedAttemptRollup, group_by)
+    attempts = func.sum(UnauthorizedAttemptRollup.attempts).label('attempts')
+    
+    query = (
+        select(_text_value(group_column).label('key'), attempts)
+        .where(*_rollup_range_conditions(UnauthorizedAttemptRollup, granularity, since, until))
+        .group_by(group_column)
+        .order_by(attempts.desc())
+        .limit(limit)
+    )
+    db = get_db_session()
+    try:
+        return [{'key': row.key, 'attempts': int(row.attempts)} for row in db.execute(query)]
+    finally:
+        db.close()
+
+@workload(WORKLOAD_REPORTING)
+def get_user_sessions_trend(since: datetime = None, until: datetime = None, granularity: str = None) -> dict:
+    """
+    Динамика входов и активных сессий по агрегатам
+    
+    Args:
+        since: Начало периода (опционально)
+        until: Конец периода (опционально)
+        granularity: minute, hour или day (по умолчанию - самый крупный подходящий для периода)
         
+    Returns:
+        dict: granularity - выбранный интервал, points - список
+              {'bucket_start', 'logins', 'peak_active_sessions'}
+    """
+    granularity = granularity or choose_granularity(since, until, get_rollup_retention_days())
+    query = (
+        select(UserSessionRollup)
+        .where(*_rollup_range_conditions(UserSessionRollup, granularity, since, until))
+        .order_by(UserSessionRollup.bucket_start)
+    )
+    db = get_db_session()
+    try:
         return {
-            'total_sessions': total_sessions,
-            'active_sessions': active_sessions,
-            'unique_users': unique_users,
-            'recent_sessions': recent_sessions
+            'granularity': granularity,
+            'points': [
+                {
+                    'bucket_start': rollup.bucket_start,
+                    'logins': rollup.logins,
+                    'peak_active_sessions': rollup.peak_active_sessions
+                }
+                for rollup in db.scalars(query)
+            ]
         }
     finally:
         db.close()
 
-def cleanup_old_user_sessions(days: int = 30) -> int:
+# Столбцы выгрузок: (имя, тип) в порядке столбцов запроса
+UNAUTHORIZED_ATTEMPTS_EXPORT_COLUMNS = [
+    ('id', 'int'),
+    ('username', 'text'),
+    ('ip_address', 'text'),
+    ('user_agent', 'text'),
+    ('attempted_at', 'timestamp'),
+    ('reason', 'text'),
+]
+
+USER_SESSIONS_EXPORT_COLUMNS = [
+    ('id', 'int'),
+    ('username', 'text'),
+    ('session_id', 'text'),
+    ('is_active', 'bool'),
+    ('ip_address', 'text'),
+    ('user_agent', 'text'),
+    ('created_at', 'timestamp'),
+    ('last_activity', 'timestamp'),
+]
+
+# Строк в одной пачке выгрузки по умолчанию
+EXPORT_DEFAULT_CHUNK_SIZE = 10000
+
+def get_export_chunk_size() -> int:
+    """Строк в одной пачке выгрузки (раздел exports в config.yaml)"""
+    return get_config_section('exports').get('chunk_size', EXPORT_DEFAULT_CHUNK_SIZE)
+
+def _export_statement(model, columns: list, sort_column, conditions: list):
+    """Запрос выгрузки: столбцы выгрузки в порядке (sort_column, id)"""
+    return (
+        select(*[getattr(model, name) for name, _ in columns])
+        .where(*conditions)
+        .order_by(sort_column, model.id)
+    )
+
+def _stream_chunks(statement, chunk_size: int):
     """
-    Очистка старых записей сессий пользователей
+    Пачки строк запроса, читаемые курсором на стороне сервера
     
     Args:
-        days: Количество дней для хранения записей
+        statement: Запрос select()
+        chunk_size: Строк в одной пачке
+        
+    Yields:
+        list: Строки результата (не больше chunk_size)
+    """
+    with get_engine().connect() as connection:
+        result = connection.execute(
+            statement.execution_options(stream_results=True, yield_per=chunk_size)
+        )
+        yield from result.partitions()
+
+@workload(WORKLOAD_REPORTING)
+def export_unauthorized_login_attempts(output, export_format: str = EXPORT_CSV, username: str = None,
+                                       since: datetime = None, until: datetime = None, chunk_size: int = None,
+                                       username_pattern: str = None,
+                                       user_agent_contains: str = None, ip_network: str = None,
+                                       include_archive: bool = False) -> int:
+    """
+    Потоковая выгрузка попыток неавторизованного входа в CSV или Parquet
+    
+    Строки читаются курсором на стороне сервера пачками по chunk_size, поэтому расход памяти
+    не зависит от количества выгружаемых строк. С include_archive сначала выгружаются строки
+    холодного архива за период, затем строки базы.
+    
+    Args:
+        output: Путь к файлу или двоичный файловый объект
+        export_format: csv или parquet
+        username: Фильтр по имени пользователя (опционально)
+        since: Начало периода (опционально)
+        until: Конец периода (опционально)
+        chunk_size: Строк в одной пачке (по умолчанию exports.chunk_size)
+        username_pattern: Шаблон имени пользователя, * - любые символы (опционально)
+        user_agent_contains: Подстрока User Agent без учета регистра (опционально)
+        ip_network: IP адрес или сеть CIDR, в которую входит IP адрес (опционально)
+        include_archive: Выгрузить также строки холодного архива
+        
+    Returns:
+        int: Количество выгруженных строк
+    """
+    chunk_size = chunk_size or get_export_chunk_size()
+    statement = _export_statement(
+        UnauthorizedLoginAttempt, UNAUTHORIZED_ATTEMPTS_EXPORT_COLUMNS, UnauthorizedLoginAttempt.attempted_at,
+        _unauthorized_attempts_conditions(
+            username=username, since=since, until=until,
+            username_pattern=username_pattern, user_agent_contains=user_agent_contains, ip_network=ip_network
+        )
+    )
+    chunks = _stream_chunks(statement, chunk_size)
+    if include_archive:
+        search = _archive_search(
+            username=username, username_pattern=username_pattern, user_agent_contains=user_agent_contains,
+            ip_network=ip_network, ip_index=_export_column_index(UNAUTHORIZED_ATTEMPTS_EXPORT_COLUMNS, 'ip_address')
+        )
+        chunks = chain(_archive_chunks(
+            'unauthorized_login_attempts', UNAUTHORIZED_ATTEMPTS_EXPORT_COLUMNS, 'attempted_at', search, chunk_size,
+            since=since, until=until
+        ), chunks)
+    return write_export(chunks, output, UNAUTHORIZED_ATTEMPTS_EXPORT_COLUMNS, export_format)
+
+@workload(WORKLOAD_REPORTING)
+def export_user_sessions(output, export_format: str = EXPORT_CSV, username: str = None,
+                         active_only: bool = False, chunk_size: int = None,
+                         username_pattern: str = None, user_agent_contains: str = None, ip_network: str = None,
+                         include_archive: bool = False) -> int:
+    """
+    Потоковая выгрузка сессий пользователей в CSV или Parquet (с include_archive - сначала строки архива)
+    
+    Args:
+        output: Путь к файлу или двоичный файловый объект
+        export_format: csv или parquet
+        username: Фильтр по имени пользователя (опционально)
+        active_only: Только активные сессии
+        chunk_size: Строк в одной пачке (по умолчанию exports.chunk_size)
+        username_pattern: Шаблон имени пользователя, * - любые символы (опционально)
+        user_agent_contains: Подстрока User Agent без учета регистра (опционально)
+        ip_network: IP адрес или сеть CIDR, в которую входит IP адрес (опционально)
+        include_archive: Выгрузить также строки холодного архива
+        
+    Returns:
+        int: Количество выгруженных строк
+    """
+    chunk_size = chunk_size or get_export_chunk_size()
+    conditions = _user_sessions_conditions(
+        username=username, active_only=active_only,
+        username_pattern=username_pattern, user_agent_contains=user_agent_contains, ip_network=ip_network
+    )
+    statement = _export_statement(UserSession, USER_SESSIONS_EXPORT_COLUMNS, UserSession.created_at, conditions)
+    chunks = _stream_chunks(statement, chunk_size)
+    if include_archive:
+        search = _user_sessions_archive_search(
+            username=username, active_only=active_only, username_pattern=username_pattern,
+            user_agent_contains=user_agent_contains, ip_network=ip_network
+        )
+        chunks = chain(
+            _archive_chunks('user_sessions', USER_SESSIONS_EXPORT_COLUMNS, 'created_at', search, chunk_size), chunks
+        )
+    return write_export(chunks, output, USER_SESSIONS_EXPORT_COLUMNS, export_format)
+
+# Холодный архив: параметры по умолчанию (раздел archive в config.yaml)
+ARCHIVE_DEFAULTS = {
+    'enabled': False,
+    'path': 'archive',
+    'retention_days': 730,
+    'compression': 'zstd',
+}
+
+# Таблицы архива: короткое имя (CLI) -> таблица
+ARCHIVE_TABLES = {
+    'attempts': 'unauthorized_login_attempts',
+    'sessions': 'user_sessions',
+}
+
+def get_archive_config() -> dict:
+    """
+    Настройки холодного архива (раздел archive в config.yaml)
+    
+    Returns:
+        dict: enabled, path (корневой каталог), retention_days (срок хранения архива), compression
+    """
+    config = dict(ARCHIVE_DEFAULTS)
+    config.update(get_config_section('archive'))
+    return config
+
+def is_archive_enabled() -> bool:
+    """Перенос строк в архив перед удалением из базы включен"""
+    return get_archive_config()['enabled']
+
+@contextmanager
+def _archive_lock(connection, table: str):
+    """
+    Advisory lock записи в архив таблицы: перенос строк и слияние дней не выполняются одновременно
+    
+    Блокировка сеансовая и берется вне транзакций переноса, чтобы их снимок REPEATABLE READ
+    создавался уже после ожидания и не содержал строк, перенесенных другим экземпляром.
+    """
+    key = zlib.crc32(f"archive:{table}".encode('utf-8'))
+    connection.execute(text("SELECT pg_advisory_lock(:key)"), {'key': key})
+    connection.commit()
+    try:
+        yield
+    finally:
+        connection.rollback()
+        connection.execute(text("SELECT pg_advisory_unlock(:key)"), {'key': key})
+        connection.commit()
+
+def _archive_rows(model, columns: list, time_column, conditions: list) -> int:
+    """
+    Перенос строк таблицы в архив: запись в Parquet и удаление из базы по дням столбца времени
+    
+    Каждый день переносится в своей транзакции REPEATABLE READ (чтение и удаление в ней, поэтому удаляются
+    ровно прочитанные строки), так что длительность транзакции ограничена строками одного дня.
+    Файл дня становится видимым до фиксации удаления и удаляется, если она не удалась:
+    при сбое строка может оказаться и в архиве, и в базе, но не потеряется.
+    
+    Args:
+        model: Модель таблицы
+        columns: Столбцы архива: список пар (имя, тип)
+        time_column: Столбец времени, по дню которого строки раскладываются по каталогам
+        conditions: Условия отбора строк
+        
+    Returns:
+        int: Количество перенесенных строк
+    """
+    config = get_archive_config()
+    moved = 0
+    day_end = None
+    with get_engine().connect() as connection, _archive_lock(connection, model.__tablename__):
+        connection.execution_options(isolation_level='REPEATABLE READ')
+        while True:
+            writer = None
+            try:
+                # Следующий день со строками для переноса (дни без строк пропускаются)
+                remaining = conditions if day_end is None else [*conditions, time_column >= day_end]
+                first = connection.execute(select(func.min(time_column)).where(*remaining)).scalar()
+                if first is None:
+                    connection.rollback()
+                    break
+                day_start = datetime.combine(first.date(), datetime.min.time())
+                day_end = day_start + timedelta(days=1)
+                day_conditions = [*conditions, time_column >= day_start, time_column < day_end]
+                
+                writer = ArchiveWriter(
+                    config['path'], model.__tablename__, columns, time_column.key, compression=config['compression']
+                )
+                result = connection.execute(
+                    _export_statement(model, columns, time_column, day_conditions)
+                    .execution_options(stream_results=True, yield_per=get_export_chunk_size())
+                )
+                for chunk in result.partitions():
+                    writer.write(chunk)
+                deleted = connection.execute(delete(model).where(*day_conditions)).rowcount
+                if deleted != writer.rows:
+                    raise RuntimeError(
+                        f"{model.__tablename__}: удалено {deleted} строк вместо {writer.rows} записанных в архив"
+                    )
+            except BaseException:
+                if writer is not None:
+                    writer.abort()
+                connection.rollback()
+                raise
+            
+            files = writer.commit()
+            try:
+                connection.commit()
+            except BaseException:
+                for path in files:
+                    os.remove(path)
+                raise
+            moved += writer.rows
+    return moved
+
+def _compact_archive(table: str, days: int) -> int:
+    """
+    Слияние файлов закрытых дней архива таблицы (под той же блокировкой, что и перенос строк)
+    
+    Открытыми (не сливаются) считаются сегодня и вчера - в них переносит сессии cleanup_inactive_sessions -
+    и день границы срока хранения в базе, в который переносят задачи очистки.
+    
+    Returns:
+        int: Количество слитых каталогов дней
+    """
+    config = get_archive_config()
+    today = date.today()
+    with get_engine().connect() as connection, _archive_lock(connection, table):
+        return compact_archive(
+            config['path'], table, before=today - timedelta(days=1),
+            open_days={today - timedelta(days=days)}, compression=config['compression']
+        )
+
+@workload(WORKLOAD_MAINTENANCE)
+def archive_old_unauthorized_attempts(days: int) -> int:
+    """
+    Перенос в архив попыток входа старше срока хранения в базе
+    
+    Args:
+        days: Срок хранения в базе в днях
+        
+    Returns:
+        int: Количество перенесенных попыток
+    """
+    return _archive_rows(
+        UnauthorizedLoginAttempt, UNAUTHORIZED_ATTEMPTS_EXPORT_COLUMNS, UnauthorizedLoginAttempt.attempted_at,
+        [UnauthorizedLoginAttempt.attempted_at < func.current_timestamp() - func.make_interval(0, 0, 0, days)]
+    )
+
+@workload(WORKLOAD_MAINTENANCE)
+def archive_old_user_sessions(days: int) -> int:
+    """
+    Перенос в архив неактивных сессий старше срока хранения в базе
+    
+    Args:
+        days: Срок хранения в базе в днях
+        
+    Returns:
+        int: Количество перенесенных сессий
+    """
+    return _archive_rows(
+        UserSession, USER_SESSIONS_EXPORT_COLUMNS, UserSession.created_at,
+        [
+            UserSession.created_at < func.current_timestamp() - func.make_interval(0, 0, 0, days),
+            UserSession.is_active == False,
+        ]
+    )
+
+@workload(WORKLOAD_MAINTENANCE)
+def archive_inactive_sessions() -> int:
+    """
+    Перенос в архив сессий, удаляемых cleanup_inactive_sessions (условие CLEANUP_INACTIVE_SESSIONS_SQL)
+    
+    Returns:
+        int: Количество перенесенных сессий
+    """
+    return _archive_rows(
+        UserSession, USER_SESSIONS_EXPORT_COLUMNS, UserSession.created_at,
+        [or_(
+            UserSession.last_activity < literal_column("CURRENT_TIMESTAMP - INTERVAL '9 hours'"),
+            and_(
+                UserSession.is_active == False,
+                UserSession.created_at < literal_column("CURRENT_TIMESTAMP - INTERVAL '1 hour'")
+            ),
+        )]
+    )
+
+@workload(WORKLOAD_MAINTENANCE)
+def archive_old_records(days: int = 30) -> dict:
+    """
+    Перенос в архив попыток входа и неактивных сессий старше срока хранения в базе
+    
+    Args:
+        days: Срок хранения в базе в днях
+        
+    Returns:
+        dict: Таблица -> количество перенесенных строк
+    """
+    return {
+        'unauthorized_login_attempts': archive_old_unauthorized_attempts(days),
+        'user_sessions': archive_old_user_sessions(days),
+    }
+
+def _archive_expired(table: str, days: int) -> int:
+    """
+    Перенос в архив строк таблицы старше срока хранения в базе (перед очисткой), слияние файлов
+    закрытых дней и удаление из архива дней старше archive.retention_days
+    
+    Returns:
+        int: Количество перенесенных строк
+    """
+    archive_function = {
+        'unauthorized_login_attempts': archive_old_unauthorized_attempts,
+        'user_sessions': archive_old_user_sessions,
+    }[table]
+    moved = archive_function(days)
+    _compact_archive(table, days)
+    config = get_archive_config()
+    prune_archive(config['path'], table, config['retention_days'])
+    return moved
+
+@workload(WORKLOAD_MAINTENANCE)
+def compact_archived_records(days: int = 30) -> dict:
+    """
+    Слияние файлов закрытых дней архива в один файл на день
+    
+    Args:
+        days: Срок хранения в базе в днях (день его границы еще пополняется и не сливается)
         
     Returns:
-        int: Количество удаленных записей
+        dict: Таблица -> количество слитых дней
+    """
+    return {table: _compact_archive(table, days) for table in ARCHIVE_TABLES.values()}
+
+@workload(WORKLOAD_MAINTENANCE)
+def prune_archived_records() -> dict:
+    """
+    Удаление из архива дней старше archive.retention_days
+    
+    Returns:
+        dict: Таблица -> количество удаленных дней
+    """
+    config = get_archive_config()
+    return {
+        table: prune_archive(config['path'], table, config['retention_days'])
+        for table in ARCHIVE_TABLES.values()
+    }
+
+def _archive_search(username: str = None, username_pattern: str = None, user_agent_contains: str = None,
+                    ip_network: str = None, ip_index: int = None) -> tuple:
+    """
+    Поисковые фильтры для запроса к архиву (аналог _search_conditions на SQL DuckDB)
+    
+    Вхождение IP адреса в сеть проверяется в Python (в DuckDB без расширений нет типа inet).
+    
+    Returns:
+        tuple: (условия, параметры, функция отбора строки или None)
+    """
+    conditions = []
+    params = []
+    if username:
+        conditions.append("username = ?")
+        params.append(username)
+    if username_pattern:
+        conditions.append("username ILIKE ? ESCAPE '\\'")
+        params.append(_like_pattern(username_pattern))
+    if user_agent_contains:
+        conditions.append("user_agent ILIKE ? ESCAPE '\\'")
+        params.append(f"%{_like_pattern(user_agent_contains)}%")
+    row_filter = None
+    if ip_network:
+        network = ipaddress.ip_network(parse_ip_network(ip_network))
+        row_filter = lambda row: row[ip_index] is not None and ipaddress.ip_interface(row[ip_index]).ip in network
+    return conditions, params, row_filter
+
+def _export_column_index(columns: list, name: str) -> int:
+    """Номер столбца в строках выгрузки (архива)"""
+    return [column for column, _ in columns].index(name)
+
+def _user_sessions_archive_search(username: str = None, active_only: bool = False, username_pattern: str = None,
+                                  user_agent_contains: str = None, ip_network: str = None) -> tuple:
+    """Фильтры сессий для запроса к архиву (аналог _user_sessions_conditions)"""
+    conditions, params, row_filter = _archive_search(
+        username=username, username_pattern=username_pattern, user_agent_contains=user_agent_contains,
+        ip_network=ip_network, ip_index=_export_column_index(USER_SESSIONS_EXPORT_COLUMNS, 'ip_address')
+    )
+    if active_only:
+        conditions.append("is_active")
+    return conditions, params, row_filter
+
+def _read_archive_page(table: str, columns: list, time_column: str, search: tuple, cursor: str, limit: int,
+                       since: datetime = None, until: datetime = None):
+    """
+    Страница архива по ключу (time_column, id) в порядке выборки keyset_page_statement
+    
+    Returns:
+        pd.DataFrame: Не больше limit + 1 строк
+    """
+    import pandas as pd
+    
+    conditions, params, row_filter = search
+    page = archive_keyset(time_column, cursor)
+    conditions = conditions + page['conditions']
+    params = params + page['params']
+    if since is not None:
+        conditions.append(f"{time_column} >= ?")
+        params.append(since)
+    if until is not None:
+        conditions.append(f"{time_column} < ?")
+        params.append(until)
+    
+    names = [name for name, _ in columns]
+    rows = [
+        row
+        for batch in query_archive(
+            get_archive_config()['path'], table, names, conditions, params,
+            since=max(filter(None, [since, page['since']]), default=None),
+            until=min(filter(None, [until, page['until']]), default=None),
+            order_by=page['order_by'], limit=limit + 1, row_filter=row_filter
+        )
+        for row in batch
+    ]
+    return pd.DataFrame.from_records(rows, columns=names)
+
+def _with_archive_page(frame, archive_frame, direction: str, limit: int, sort_key: str, parse_dates: list):
+    """
+    Объединение страницы из базы и страницы архива в одну страницу в порядке выборки
+    
+    Returns:
+        pd.DataFrame: Не больше limit + 1 строк (для keyset_page_frame)
+    """
+    import pandas as pd
+    
+    if archive_frame.empty:
+        return frame
+    if not frame.empty:
+        archive_frame = pd.concat([frame, archive_frame], ignore_index=True)
+    for column in parse_dates:
+        archive_frame[column] = pd.to_datetime(archive_frame[column])
+    ascending = direction == PAGE_PREV
+    return (
+        archive_frame.drop_duplicates('id')
+        .sort_values([sort_key, 'id'], ascending=ascending)
+        .head(limit + 1)
+        .reset_index(drop=True)
+    )
+
+def _archive_chunks(table: str, columns: list, time_column: str, search: tuple, chunk_size: int,
+                    since: datetime = None, until: datetime = None):
+    """Пачки строк архива для выгрузки в порядке (time_column, id)"""
+    conditions, params, row_filter = search
+    conditions = list(conditions)
+    params = list(params)
+    if since is not None:
+        conditions.append(f"{time_column} >= ?")
+        params.append(since)
+    if until is not None:
+        conditions.append(f"{time_column} < ?")
+        params.append(until)
+    return query_archive(
+        get_archive_config()['path'], table, [name for name, _ in columns], conditions, params,
+        since=since, until=until, order_by=f"{time_column}, id", row_filter=row_filter, batch_size=chunk_size
+    )
+
+# Периодические задачи обслуживания: имя задачи -> функция
+MAINTENANCE_JOB_FUNCTIONS = {
+    'cleanup_inactive_sessions': cleanup_inactive_sessions,
+    'cleanup_old_user_sessions': cleanup_old_user_sessions,
+    'cleanup_old_unauthorized_attempts': cleanup_old_unauthorized_attempts,
+    'refresh_rollups': refresh_rollups,
+    'maintain_partitions': maintain_partitions,
+    'sync_session_counters': sync_session_counters,
+}
+
+# Интервалы запуска задач по умолчанию (секунды)
+MAINTENANCE_DEFAULT_INTERVALS = {
+    'cleanup_inactive_sessions': 300,
+    'cleanup_old_user_sessions': 3600,
+    'cleanup_old_unauthorized_attempts': 3600,
+    'refresh_rollups': 60,
+    'maintain_partitions': 3600,
+    'sync_session_counters': 3600,
+}
+
+def _build_maintenance_jobs() -> list:
+    """
+    Построение списка задач обслуживания по разделу maintenance.jobs из config.yaml
+    
+    Returns:
+        list: Список задач MaintenanceJob
+    """
+    jobs_config = get_config_section('maintenance').get('jobs', {})
+    jobs = []
+    for name, job_func in MAINTENANCE_JOB_FUNCTIONS.items():
+        job_config = dict(jobs_config.get(name) or {})
+        if not job_config.pop('enabled', True):
+            continue
+        interval_seconds = job_config.pop('interval_seconds', MAINTENANCE_DEFAULT_INTERVALS[name])
+        jobs.append(MaintenanceJob(name, job_func, interval_seconds, kwargs=job_config))
+    return jobs
+
+def get_maintenance_scheduler() -> MaintenanceScheduler:
+    """Фоновый планировщик задач обслуживания"""
+    return _get_component('maintenance_scheduler', lambda: MaintenanceScheduler(
+        get_engine(WORKLOAD_MAINTENANCE),
+        _build_maintenance_jobs(),
+        poll_seconds=get_config_section('maintenance').get('poll_seconds', 30)
+    ))
+
+@workload(WORKLOAD_MAINTENANCE)
+def start_maintenance_scheduler() -> bool:
+    """
+    Запуск фонового планировщика задач обслуживания (повторные вызовы ничего не делают)
+    
+    Returns:
+        bool: True если планировщик включен в конфигурации
+    """
+    if not get_config_section('maintenance').get('enabled', True):
+        return False
+    get_maintenance_scheduler().start()
+    return True
+
+@workload(WORKLOAD_REPORTING)
+def get_maintenance_runs(job_name: str = None, limit: int = 50) -> list:
+    """
+    Получение журнала запусков задач обслуживания
+    
+    Args:
+        job_name: Фильтр по имени задачи (опционально)
+        limit: Максимальное количество записей
+        
+    Returns:
+        list: Список запусков с длительностью и количеством удаленных строк
     """
     db = get_db_session()
     try:
-        result = db.execute(func.text("""
-            DELETE FROM user_sessions 
-            WHERE created_at < CURRENT_TIMESTAMP - INTERVAL '%s days'
-            AND is_active = FALSE
-        """ % days))
+        query = db.query(MaintenanceRun)
         
-        db.commit()
-        return result.rowcount
+        if job_name:
+            query = query.filter(MaintenanceRun.job_name == job_name)
+        
+        runs = query.order_by(MaintenanceRun.finished_at.desc()).limit(limit).all()
+        
+        return [_maintenance_run_to_dict(run) for run in runs]
     finally:
         db.close()
@@ -0,0 +1,561 @@
+"""
+Асинхронный (asyncio + asyncpg) вариант API сессий и аутентификации из models.py.
+
+Модели, конфигурация, SQL запросы и внутрипроцессные кэши общие с синхронной версией;
+функции повторяют сигнатуры и результаты одноименных функций models.py.
+"""
+
+import asyncio
+import uuid
+from datetime import datetime
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from db_engine import PoolTelemetry, build_async_engine, get_pool_status
+from pagination import keyset_page_result
+from user_agents import upsert_user_agents
+from workloads import WORKLOAD_AUTH, WORKLOAD_REPORTING, WORKLOAD_MAINTENANCE, WORKLOADS, current_workload, workload
+from models import (
+    UserAgent,
+    UserSession,
+    UnauthorizedLoginAttempt,
+    MaintenanceRun,
+    CLEANUP_INACTIVE_SESSIONS_SQL,
+    get_config_section,
+    get_engine,
+    get_workload_database_config,
+    get_permission_cache,
+    get_session_verdict_cache,
+    is_session_activity_write_behind,
+    _active_session_query,
+    _record_session_activity,
+    get_unauthorized_attempt_writer,
+    get_user_agent_cache,
+    get_login_lockout,
+    _record_login_failure,
+    _record_login_success,
+    _authorization_snapshot_query,
+    _authorization_snapshot_from_rows,
+    _available_pages_from_products,
+    _session_heartbeats_statement,
+    _user_session_to_dict,
+    _unauthorized_attempt_to_dict,
+    _maintenance_run_to_dict,
+    _unauthorized_attempt_record,
+    _unauthorized_attempt_rows,
+    _cleanup_old_unauthorized_attempts,
+    _cleanup_old_user_sessions,
+    _archive_expired,
+    is_archive_enabled,
+    archive_inactive_sessions,
+    _unauthorized_attempts_page_statement,
+    _user_sessions_page_statement,
+    _user_sessions_stats_statement,
+    _user_sessions_stats_to_dict,
+    get_session_stats_mode,
+    _unauthorized_attempts_summary_query,
+    _unauthorized_attempts_grouped_query,
+    _unauthorized_attempts_summary_to_dict,
+    _unauthorized_attempts_by_username_to_dict,
+    _unauthorized_attempts_by_ip_to_dict,
+    _unauthorized_attempts_by_subnet_query,
+    _unauthorized_attempts_by_subnet_to_dict,
+    _user_sessions_by_subnet_query,
+    _user_sessions_by_subnet_to_dict,
+    SUBNET_IPV4_PREFIX,
+    SUBNET_IPV6_PREFIX,
+)
+
+# Счетчики пулов асинхронных движков по нагрузкам
+async_pool_telemetries = {name: PoolTelemetry() for name in WORKLOADS}
+async_pool_telemetry = async_pool_telemetries[WORKLOAD_AUTH]
+
+# Асинхронные движки и фабрики сессий по нагрузкам
+_async_engines = {}
+_async_session_factories = {}
+
+
+def get_async_engine(workload: str = None):
+    """
+    Получение асинхронного движка нагрузки (создается при первом обращении)
+
+    Args:
+        workload: Имя нагрузки (по умолчанию - нагрузка текущего вызова, см. workloads.py)
+
+    Returns:
+        AsyncEngine: Асинхронный SQLAlchemy движок
+    """
+    workload = workload or current_workload()
+    engine = _async_engines.get(workload)
+    if engine is None:
+        engine = build_async_engine(get_workload_database_config(workload), telemetry=async_pool_telemetries[workload])
+        _async_engines[workload] = engine
+        _async_session_factories[workload] = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+    return engine
+
+
+def get_async_session(workload: str = None):
+    """Получение асинхронной сессии базы данных нагрузки (используется как async with)"""
+    workload = workload or current_workload()
+    get_async_engine(workload)
+    return _async_session_factories[workload]()
+
+
+async def dispose_async_engine():
+    """Закрытие всех соединений асинхронных движков (например, перед завершением цикла событий)"""
+    engines = list(_async_engines.values())
+    _async_engines.clear()
+    _async_session_factories.clear()
+    for engine in engines:
+        await engine.dispose()
+
+
+def get_async_pool_telemetry(workload: str = WORKLOAD_AUTH) -> dict:
+    """
+    Получение телеметрии пула асинхронного движка нагрузки
+
+    Args:
+        workload: Имя нагрузки (по умолчанию - пул входа)
+
+    Returns:
+        dict: Выданные соединения и счетчики пула
+    """
+    return get_pool_status(get_async_engine(workload).sync_engine, async_pool_telemetries[workload])
+
+
+@workload(WORKLOAD_AUTH)
+async def resolve_user_agent_ids(values) -> dict:
+    """id строк User Agent через общий LRU, промахи - одной транзакцией (см. models.resolve_user_agent_ids)"""
+    cache = get_user_agent_cache()
+    ids, missing = cache.get_many(values)
+    if missing:
+        async with get_async_engine().begin() as connection:
+            added = await connection.run_sync(upsert_user_agents, UserAgent, missing)
+        cache.put_many(added)
+        ids.update(added)
+    return ids
+
+
+async def resolve_user_agent_id(value: str):
+    """id строки User Agent (None для пустого User Agent, см. models.resolve_user_agent_id)"""
+    if not value:
+        return None
+    return (await resolve_user_agent_ids([value]))[value]
+
+
+@workload(WORKLOAD_AUTH)
+async def get_user_authorization_snapshot(username: str = None, user_id: int = None) -> dict:
+    """Снимок авторизации пользователя одним запросом (см. models.get_user_authorization_snapshot)"""
+    async with get_async_session() as db:
+        rows = (await db.execute(_authorization_snapshot_query(username=username, user_id=user_id))).all()
+        return _authorization_snapshot_from_rows(rows)
+
+
+@workload(WORKLOAD_AUTH)
+async def get_cached_authorization_snapshot(user_id: int) -> dict:
+    """Снимок авторизации через общий кэш профилей прав (см. models.get_cached_authorization_snapshot)"""
+    if not get_config_section('permission_cache').get('enabled', True):
+        return await get_user_authorization_snapshot(user_id=user_id)
+
+    permission_cache = get_permission_cache()
+    permission_cache.ensure_listener(get_engine(WORKLOAD_AUTH))
+    snapshot = permission_cache.get(user_id)
+    if snapshot is None:
+        epoch = permission_cache.epoch
+        snapshot = await get_user_authorization_snapshot(user_id=user_id)
+        if snapshot is not None:
+            permission_cache.put(user_id, snapshot, epoch=epoch)
+    return snapshot
+
+
+@workload(WORKLOAD_AUTH)
+async def authenticate_user(username: str, password: str, ip_address: str = None, user_agent: str = None) -> dict:
+    """Аутентификация пользователя (см. models.authenticate_user)"""
+    if get_login_lockout(username=username, ip_address=ip_address) is not None:
+        return None
+
+    permission_cache = get_permission_cache()
+    epoch = permission_cache.epoch
+    snapshot = await get_user_authorization_snapshot(username=username)
+    if snapshot is None:
+        reason = 'User not found in users table'
+    elif not snapshot['available_products']:
+        reason = 'User exists but has no access to any products'
+    else:
+        reason = None
+
+    if reason is not None:
+        for attempt_reason in [reason] + _record_login_failure(username, ip_address):
+            await log_unauthorized_login_attempt(
+                username=username,
+                ip_address=ip_address,
+                user_agent=user_agent,
+                reason=attempt_reason
+            )
+        return None
+
+    _record_login_success(username)
+
+    if get_config_section('permission_cache').get('enabled', True):
+        permission_cache.put(snapshot['id'], snapshot, epoch=epoch)
+
+    return snapshot
+
+
+@workload(WORKLOAD_AUTH)
+async def get_user_by_username(username: str) -> dict:
+    """Информация о пользователе с доступом к продуктам (см. models.get_user_by_username)"""
+    snapshot = await get_user_authorization_snapshot(username=username)
+    if snapshot and snapshot['available_products']:
+        return snapshot
+    return None
+
+
+@workload(WORKLOAD_AUTH)
+async def get_user_available_products(user_id: int) -> list:
+    """Доступные продукты пользователя (см. models.get_user_available_products)"""
+    snapshot = await get_cached_authorization_snapshot(user_id)
+    return snapshot['available_products'] if snapshot else []
+
+
+@workload(WORKLOAD_AUTH)
+async def get_available_pages_for_user(user_id: int) -> list:
+    """Доступные страницы пользователя (см. models.get_available_pages_for_user)"""
+    return _available_pages_from_products(await get_user_available_products(user_id))
+
+
+@workload(WORKLOAD_AUTH)
+async def check_user_in_product_users(username: str) -> bool:
+    """Проверка наличия прав пользователя (см. models.check_user_in_product_users)"""
+    snapshot = await get_user_authorization_snapshot(username=username)
+    return bool(snapshot and snapshot['available_products'])
+
+
+@workload(WORKLOAD_AUTH)
+async def create_user_session(username: str, ip_address: str = None, user_agent: str = None) -> str:
+    """Создание сессии с деактивацией прежних активных сессий (см. models.create_user_session)"""
+    user_agent_id = await resolve_user_agent_id(user_agent)
+    async with get_async_session() as db:
+        await db.execute(
+            update(UserSession)
+            .where(UserSession.username == username, UserSession.is_active == True)
+            .values(is_active=False)
+        )
+
+        session_id = str(uuid.uuid4())
+        db.add(UserSession(
+            username=username,
+            session_id=session_id,
+            ip_address=ip_address,
+            user_agent_id=user_agent_id,
+            is_active=True
+        ))
+        await db.commit()
+        return session_id
+
+
+@workload(WORKLOAD_AUTH)
+async def check_user_active_sessions(username: str) -> int:
+    """Количество активных сессий пользователя (см. models.check_user_active_sessions)"""
+    async with get_async_session() as db:
+        return await db.scalar(
+            select(func.count())
+            .select_from(UserSession)
+            .where(UserSession.username == username, UserSession.is_active == True)
+        )
+
+
+@workload(WORKLOAD_AUTH)
+async def check_session_active(session_id: str) -> bool:
+    """Проверка активности сессии (см. models.check_session_active)"""
+    async with get_async_session() as db:
+        found = await db.scalar(_active_session_query(session_id))
+        return found is not None
+
+
+@workload(WORKLOAD_AUTH)
+async def deactivate_user_session(session_id: str) -> bool:
+    """Деактивация сессии (см. models.deactivate_user_session)"""
+    async with get_async_session() as db:
+        result = await db.execute(
+            update(UserSession)
+            .where(UserSession.session_id == session_id, UserSession.is_active == True)
+            .values(is_active=False)
+            .returning(UserSession.id)
+        )
+        deactivated = result.first() is not None
+        await db.commit()
+
+    if deactivated:
+        get_session_verdict_cache().invalidate(session_id)
+    return deactivated
+
+
+@workload(WORKLOAD_AUTH)
+async def validate_and_touch(session_id: str) -> bool:
+    """Проверка сессии с обновлением активности, в режиме write-behind - через буфер (см. models.validate_and_touch)"""
+    write_behind = is_session_activity_write_behind()
+    session_verdict_cache = get_session_verdict_cache()
+    is_valid = session_verdict_cache.get(session_id)
+    if is_valid is None:
+        async with get_async_session() as db:
+            if write_behind:
+                is_valid = await db.scalar(_active_session_query(session_id)) is not None
+            else:
+                result = await db.execute(
+                    update(UserSession)
+                    .where(UserSession.session_id == session_id, UserSession.is_active == True)
+                    .values(last_activity=func.current_timestamp())
+                    .returning(UserSession.id)
+                )
+                is_valid = result.first() is not None
+                await db.commit()
+        session_verdict_cache.put(session_id, is_valid)
+
+    if is_valid and write_behind:
+        _record_session_activity(session_id)
+    return is_valid
+
+
+@workload(WORKLOAD_AUTH)
+async def update_session_activity(session_id: str) -> bool:
+    """Обновление активности сессии, в том числе через общий write-behind буфер (см. models.update_session_activity)"""
+    if is_session_activity_write_behind():
+        _record_session_activity(session_id)
+        return True
+
+    async with get_async_session() as db:
+        result = await db.execute(
+            update(UserSession)
+            .where(UserSession.session_id == session_id, UserSession.is_active == True)
+            .values(last_activity=func.current_timestamp())
+            .returning(UserSession.id)
+        )
+        updated = result.first() is not None
+        await db.commit()
+        return updated
+
+
+@workload(WORKLOAD_AUTH)
+async def flush_session_heartbeats(heartbeats: list, chunk_size: int = 1000) -> int:
+    """Пакетная запись отметок активности (см. models.flush_session_heartbeats)"""
+    async with get_async_session() as db:
+        updated = 0
+        for start in range(0, len(heartbeats), chunk_size):
+            statement, params = _session_heartbeats_statement(heartbeats[start:start + chunk_size])
+            result = await db.execute(statement, params)
+            updated += result.rowcount
+        await db.commit()
+        return updated
+
+
+@workload(WORKLOAD_MAINTENANCE)
+async def cleanup_inactive_sessions() -> int:
+    """Очистка неактивных сессий (см. models.cleanup_inactive_sessions)"""
+    if is_archive_enabled():
+        # Запись файлов архива не должна блокировать цикл событий
+        return await asyncio.to_thread(archive_inactive_sessions)
+
+    async with get_async_session() as db:
+        result = await db.execute(CLEANUP_INACTIVE_SESSIONS_SQL)
+        await db.commit()
+        return result.rowcount
+
+
+@workload(WORKLOAD_AUTH)
+async def log_unauthorized_login_attempt(username: str, ip_address: str = None, user_agent: str = None, reason: str = None) -> int:
+    """Запись попытки неавторизованного входа (см. models.log_unauthorized_login_attempt)"""
+    record = _unauthorized_attempt_record(username, ip_address, user_agent, reason)
+
+    if get_config_section('unauthorized_attempts').get('async_writer', False):
+        unauthorized_attempt_writer = get_unauthorized_attempt_writer()
+        unauthorized_attempt_writer.start()
+        if unauthorized_attempt_writer.overflow_policy == 'block':
+            # Ожидание места в очереди не должно блокировать цикл событий
+            await asyncio.to_thread(unauthorized_attempt_writer.submit, record)
+        else:
+            unauthorized_attempt_writer.submit(record)
+        return None
+
+    [row] = _unauthorized_attempt_rows([record], await resolve_user_agent_ids([user_agent]))
+    async with get_async_session() as db:
+        attempt_id = await db.scalar(
+            insert(UnauthorizedLoginAttempt).values(**row).returning(UnauthorizedLoginAttempt.id)
+        )
+        await db.commit()
+        return attempt_id
+
+
+@workload(WORKLOAD_AUTH)
+async def write_unauthorized_login_attempts(attempts: list) -> int:
+    """Пакетная запись попыток многострочным INSERT (см. models.write_unauthorized_login_attempts)"""
+    if not attempts:
+        return 0
+
+    user_agent_ids = await resolve_user_agent_ids(attempt.get('user_agent') for attempt in attempts)
+    rows = _unauthorized_attempt_rows(attempts, user_agent_ids)
+    async with get_async_session() as db:
+        await db.execute(insert(UnauthorizedLoginAttempt), rows)
+        await db.commit()
+        return len(attempts)
+
+
+@workload(WORKLOAD_REPORTING)
+async def get_unauthorized_login_attempts(username: str = None, limit: int = 100, since: datetime = None,
+                                          until: datetime = None, cursor: str = None,
+                                          username_pattern: str = None, user_agent_contains: str = None, ip_network: str = None) -> list:
+    """Список попыток неавторизованного входа (см. models.get_unauthorized_login_attempts)"""
+    page = await get_unauthorized_login_attempts_page(
+        username=username, limit=limit, since=since, until=until, cursor=cursor,
+        username_pattern=username_pattern, user_agent_contains=user_agent_contains, ip_network=ip_network
+    )
+    return page['items']
+
+
+@workload(WORKLOAD_REPORTING)
+async def get_unauthorized_login_attempts_page(username: str = None, limit: int = 100, since: datetime = None,
+                                               until: datetime = None, cursor: str = None,
+                                               username_pattern: str = None, user_agent_contains: str = None, ip_network: str = None) -> dict:
+    """Страница попыток неавторизованного входа (см. models.get_unauthorized_login_attempts_page)"""
+    statement, direction = _unauthorized_attempts_page_statement(
+        username=username, limit=limit, since=since, until=until, cursor=cursor,
+        username_pattern=username_pattern, user_agent_contains=user_agent_contains, ip_network=ip_network
+    )
+    async with get_async_session() as db:
+        attempts = [_unauthorized_attempt_to_dict(attempt) for attempt in await db.scalars(statement)]
+        return keyset_page_result(attempts, direction, cursor, limit, 'attempted_at')
+
+
+@workload(WORKLOAD_REPORTING)
+async def get_unauthorized_attempts_summary(username: str = None, since: datetime = None,
+                                            until: datetime = None, username_pattern: str = None, user_agent_contains: str = None, ip_network: str = None) -> dict:
+    """Сводка по попыткам входа за период (см. models.get_unauthorized_attempts_summary)"""
+    query = _unauthorized_attempts_summary_query(
+        username=username, since=since, until=until,
+        username_pattern=username_pattern, user_agent_contains=user_agent_contains, ip_network=ip_network
+    )
+    async with get_async_session() as db:
+        result = await db.execute(query)
+        return _unauthorized_attempts_summary_to_dict(result.one())
+
+
+@workload(WORKLOAD_REPORTING)
+async def get_unauthorized_attempts_by_username(username: str = None, since: datetime = None,
+                                                until: datetime = None, limit: int = 10,
+                                                username_pattern: str = None, user_agent_contains: str = None, ip_network: str = None) -> list:
+    """Агрегаты попыток входа по пользователям (см. models.get_unauthorized_attempts_by_username)"""
+    query = _unauthorized_attempts_grouped_query(
+        UnauthorizedLoginAttempt.username, UnauthorizedLoginAttempt.ip_address,
+        username=username, since=since, until=until, limit=limit,
+        username_pattern=username_pattern, user_agent_contains=user_agent_contains, ip_network=ip_network
+    )
+    async with get_async_session() as db:
+        return [_unauthorized_attempts_by_username_to_dict(row) for row in await db.execute(query)]
+
+
+@workload(WORKLOAD_REPORTING)
+async def get_unauthorized_attempts_by_ip(username: str = None, since: datetime = None,
+                                          until: datetime = None, limit: int = 10,
+                                          username_pattern: str = None, user_agent_contains: str = None, ip_network: str = None) -> list:
+    """Агрегаты попыток входа по IP адресам (см. models.get_unauthorized_attempts_by_ip)"""
+    query = _unauthorized_attempts_grouped_query(
+        UnauthorizedLoginAttempt.ip_address, UnauthorizedLoginAttempt.username,
+        username=username, since=since, until=until, limit=limit,
+        username_pattern=username_pattern, user_agent_contains=user_agent_contains, ip_network=ip_network
+    )
+    async with get_async_session() as db:
+        return [_unauthorized_attempts_by_ip_to_dict(row) for row in await db.execute(query)]
+
+
+@workload(WORKLOAD_REPORTING)
+async def get_unauthorized_attempts_by_subnet(username: str = None, since: datetime = None, until: datetime = None,
+                                              limit: int = 10, ipv4_prefix: int = SUBNET_IPV4_PREFIX,
+                                              ipv6_prefix: int = SUBNET_IPV6_PREFIX, username_pattern: str = None,
+                                              user_agent_contains: str = None, ip_network: str = None) -> list:
+    """Агрегаты попыток входа по подсетям (см. models.get_unauthorized_attempts_by_subnet)"""
+    query = _unauthorized_attempts_by_subnet_query(
+        ipv4_prefix=ipv4_prefix, ipv6_prefix=ipv6_prefix,
+        username=username, since=since, until=until, limit=limit,
+        username_pattern=username_pattern, user_agent_contains=user_agent_contains, ip_network=ip_network
+    )
+    async with get_async_session() as db:
+        return [_unauthorized_attempts_by_subnet_to_dict(row) for row in await db.execute(query)]
+
+
+@workload(WORKLOAD_MAINTENANCE)
+async def cleanup_old_unauthorized_attempts(days: int = 30) -> int:
+    """Очистка старых попыток входа с переносом в архив (см. models.cleanup_old_unauthorized_attempts)"""
+    archived = is_archive_enabled()
+    moved = await asyncio.to_thread(_archive_expired, 'unauthorized_login_attempts', days) if archived else 0
+    async with get_async_engine().connect() as connection:
+        return moved + await connection.run_sync(_cleanup_old_unauthorized_attempts, days, archived)
+
+
+@workload(WORKLOAD_REPORTING)
+async def get_user_sessions(username: str = None, limit: int = 100, active_only: bool = False,
+                            cursor: str = None, username_pattern: str = None, user_agent_contains: str = None, ip_network: str = None) -> list:
+    """Список сессий пользователей (см. models.get_user_sessions)"""
+    page = await get_user_sessions_page(
+        username=username, limit=limit, active_only=active_only, cursor=cursor,
+        username_pattern=username_pattern, user_agent_contains=user_agent_contains, ip_network=ip_network
+    )
+    return page['items']
+
+
+@workload(WORKLOAD_REPORTING)
+async def get_user_sessions_page(username: str = None, limit: int = 100, active_only: bool = False,
+                                 cursor: str = None, username_pattern: str = None, user_agent_contains: str = None, ip_network: str = None) -> dict:
+    """Страница сессий пользователей (см. models.get_user_sessions_page)"""
+    statement, direction = _user_sessions_page_statement(
+        username=username, limit=limit, active_only=active_only, cursor=cursor,
+        username_pattern=username_pattern, user_agent_contains=user_agent_contains, ip_network=ip_network
+    )
+    async with get_async_session() as db:
+        sessions = [_user_session_to_dict(session) for session in await db.scalars(statement)]
+        return keyset_page_result(sessions, direction, cursor, limit, 'created_at')
+
+
+@workload(WORKLOAD_REPORTING)
+async def get_user_sessions_by_subnet(username: str = None, active_only: bool = False, since: datetime = None,
+                                      limit: int = 10, ipv4_prefix: int = SUBNET_IPV4_PREFIX,
+                                      ipv6_prefix: int = SUBNET_IPV6_PREFIX, username_pattern: str = None,
+                                      user_agent_contains: str = None, ip_network: str = None) -> list:
+    """Агрегаты сессий по подсетям (см. models.get_user_sessions_by_subnet)"""
+    query = _user_sessions_by_subnet_query(
+        ipv4_prefix=ipv4_prefix, ipv6_prefix=ipv6_prefix,
+        username=username, active_only=active_only, since=since, limit=limit,
+        username_pattern=username_pattern, user_agent_contains=user_agent_contains, ip_network=ip_network
+    )
+    async with get_async_session() as db:
+        return [_user_sessions_by_subnet_to_dict(row) for row in await db.execute(query)]
+
+
+@workload(WORKLOAD_REPORTING)
+async def get_user_sessions_stats(mode: str = None) -> dict:
+    """Статистика по сессиям пользователей (см. models.get_user_sessions_stats)"""
+    async with get_async_session() as db:
+        result = await db.execute(_user_sessions_stats_statement(mode or get_session_stats_mode()))
+        return _user_sessions_stats_to_dict(result.one())
+
+
+@workload(WORKLOAD_MAINTENANCE)
+async def cleanup_old_user_sessions(days: int = 30) -> int:
+    """Очистка старых неактивных сессий с переносом в архив (см. models.cleanup_old_user_sessions)"""
+    archived = is_archive_enabled()
+    moved = await asyncio.to_thread(_archive_expired, 'user_sessions', days) if archived else 0
+    async with get_async_engine().connect() as connection:
+        return moved + await connection.run_sync(_cleanup_old_user_sessions, days, archived)
+
+
+@workload(WORKLOAD_REPORTING)
+async def get_maintenance_runs(job_name: str = None, limit: int = 50) -> list:
+    """Журнал запусков задач обслуживания (см. models.get_maintenance_runs)"""
+    query = select(MaintenanceRun)
+    if job_name:
+        query = query.where(MaintenanceRun.job_name == job_name)
+    query = query.order_by(MaintenanceRun.finished_at.desc()).limit(limit)
+
+    async with get_async_session() as db:
+        runs = (await db.scalars(query)).all()
+        return [_maintenance_run_to_dict(run) for run in runs]
@@ -0,0 +1,178 @@
+"""
+Постраничный вывод по ключу (keyset pagination) для списков, упорядоченных от новых записей к старым
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+PAGE_NEXT = 'next'
+PAGE_PREV = 'prev'
+
+
+def encode_page_cursor(direction: str, sort_value: datetime, row_id: int) -> str:
+    """
+    Кодирование курсора страницы
+
+    Args:
+        direction: PAGE_NEXT (более старые записи) или PAGE_PREV (более новые)
+        sort_value: Значение столбца сортировки граничной записи
+        row_id: id граничной записи
+
+    Returns:
+        str: Непрозрачный курсор, пригодный для URL
+    """
+    payload = json.dumps([direction, sort_value.isoformat(), row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_page_cursor(cursor: str) -> tuple:
+    """
+    Декодирование курсора страницы
+
+    Args:
+        cursor: Курсор из encode_page_cursor
+
+    Returns:
+        tuple: (направление, значение столбца сортировки, id)
+
+    Raises:
+        ValueError: Курсор поврежден
+    """
+    try:
+        payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        direction, sort_value, row_id = json.loads(payload)
+        if direction not in (PAGE_NEXT, PAGE_PREV):
+            raise ValueError(direction)
+        return direction, datetime.fromisoformat(sort_value), int(row_id)
+    except (ValueError, TypeError, binascii.Error) as e:
+        raise ValueError(f"Некорректный курсор страницы: {cursor!r}") from e
+
+
+def keyset_page_statement(statement, sort_column, id_column, cursor: str = None, limit: int = 100):
+    """
+    Ограничение запроса одной страницей по ключу (sort_column, id_column)
+
+    Страница выбирается сравнением строк (sort_column, id) < (значение, id) по индексу,
+    поэтому ее стоимость не зависит от того, насколько далеко она от начала списка.
+    Запрашивается на одну запись больше limit, чтобы узнать, есть ли следующая страница.
+
+    Args:
+        statement: Запрос select() без сортировки и лимита
+        sort_column: Столбец сортировки (created_at, attempted_at)
+        id_column: Первичный ключ, разрешающий совпадения значений сортировки
+        cursor: Курсор страницы (None - первая страница)
+        limit: Записей на странице
+
+    Returns:
+        tuple: (запрос, направление)
+    """
+    direction = PAGE_NEXT
+    if cursor:
+        direction, sort_value, row_id = decode_page_cursor(cursor)
+        key = tuple_(sort_column, id_column)
+        if direction == PAGE_NEXT:
+            statement = statement.where(key < tuple_(sort_value, row_id))
+        else:
+            statement = statement.where(key > tuple_(sort_value, row_id))
+
+    if direction == PAGE_NEXT:
+        statement = statement.order_by(sort_column.desc(), id_column.desc())
+    else:
+        statement = statement.order_by(sort_column.asc(), id_column.asc())
+    return statement.limit(limit + 1), direction
+
+
+def _neighbour_cursors(direction: str, cursor: str, has_more: bool, first: tuple, last: tuple) -> tuple:
+    """
+    Курсоры соседних страниц по первой и последней записи страницы
+
+    Args:
+        direction: Направление выборки страницы
+        cursor: Курсор, по которому получена страница
+        has_more: Выбрано больше limit записей
+        first: (значение сортировки, id) первой записи или None для пустой страницы
+        last: (значение сортировки, id) последней записи или None для пустой страницы
+
+    Returns:
+        tuple: (next_cursor, prev_cursor)
+    """
+    if direction == PAGE_PREV:
+        has_next, has_prev = bool(cursor), has_more
+    else:
+        has_next, has_prev = has_more, bool(cursor)
+
+    next_cursor = prev_cursor = None
+    if last is not None and has_next:
+        next_cursor = encode_page_cursor(PAGE_NEXT, last[0], int(last[1]))
+    if first is not None and has_prev:
+        prev_cursor = encode_page_cursor(PAGE_PREV, first[0], int(first[1]))
+    return next_cursor, prev_cursor
+
+
+def keyset_page_result(items: list, direction: str, cursor: str, limit: int, sort_key: str) -> dict:
+    """
+    Формирование страницы и курсоров соседних страниц
+
+    Args:
+        items: Записи (словари с id и sort_key) в порядке выборки keyset_page_statement
+        direction: Направление из keyset_page_statement
+        cursor: Курсор, по которому получена страница
+        limit: Записей на странице
+        sort_key: Ключ столбца сортировки в словарях записей
+
+    Returns:
+        dict: items (от новых к старым), next_cursor (более старые записи) и
+              prev_cursor (более новые записи); None, если соседней страницы нет
+    """
+    has_more = len(items) > limit
+    items = items[:limit]
+    if direction == PAGE_PREV:
+        items.reverse()
+
+    next_cursor, prev_cursor = _neighbour_cursors(
+        direction, cursor, has_more,
+        (items[0][sort_key], items[0]['id']) if items else None,
+        (items[-1][sort_key], items[-1]['id']) if items else None,
+    )
+    return {
+        'items': items,
+        'next_cursor': next_cursor,
+        'prev_cursor': prev_cursor,
+    }
+
+
+def keyset_page_frame(frame, direction: str, cursor: str, limit: int, sort_key: str) -> dict:
+    """
+    Формирование страницы в виде DataFrame и курсоров соседних страниц
+
+    Args:
+        frame: DataFrame (столбцы id и sort_key) в порядке выборки keyset_page_statement
+        direction: Направление из keyset_page_statement
+        cursor: Курсор, по которому получена страница
+        limit: Записей на странице
+        sort_key: Столбец сортировки
+
+    Returns:
+        dict: frame (от новых к старым), next_cursor и prev_cursor
+    """
+    has_more = len(frame) > limit
+    frame = frame.iloc[:limit]
+    if direction == PAGE_PREV:
+        frame = frame.iloc[::-1]
+    frame = frame.reset_index(drop=True)
+
+    empty = frame.empty
+    next_cursor, prev_cursor = _neighbour_cursors(
+        direction, cursor, has_more,
+        None if empty else (frame[sort_key].iloc[0].to_pydatetime(), frame['id'].iloc[0]),
+        None if empty else (frame[sort_key].iloc[-1].to_pydatetime(), frame['id'].iloc[-1]),
+    )
+    return {
+        'frame': frame,
+        'next_cursor': next_cursor,
+        'prev_cursor': prev_cursor,
+    }
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Секционирование таблиц по времени: создание будущих секций, удаление секций старше срока хранения
+и перевод существующей таблицы на секционирование.
+
+Секции создаются функцией create_time_partitions из миграции schema/0001_baseline.sql. Срок хранения соблюдается
+отсоединением и удалением целых секций вместо DELETE по строкам.
+
+Пример перевода существующей базы:
+    python partitions.py convert
+    python partitions.py list
+"""
+
+import argparse
+import logging
+import re
+from datetime import datetime
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+PARTITION_DAY = 'day'
+PARTITION_MONTH = 'month'
+
+# Ожидание блокировки таблицы при отсоединении секции (не выстраиваться в очередь за долгими запросами)
+DETACH_LOCK_TIMEOUT_MS = 5000
+
+# Строк секции DEFAULT, удаляемых за одну транзакцию
+DEFAULT_PARTITION_DELETE_BATCH = 10000
+
+_UPPER_BOUND_RE = re.compile(r"TO \('([^']+)'\)")
+
+_IS_PARTITIONED_SQL = text("""
+    SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(:table)
+""")
+
+_LIST_PARTITIONS_SQL = text("""
+    SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = to_regclass(:table)
+    ORDER BY c.relname
+""")
+
+_CREATE_PARTITIONS_SQL = text("""
+    SELECT create_time_partitions(:table, :column, :interval, :ahead)
+""")
+
+
+def is_partitioned(connection, table: str) -> bool:
+    """
+    Проверка, является ли таблица секционированной
+
+    Args:
+        connection: Соединение SQLAlchemy
+        table: Имя таблицы
+
+    Returns:
+        bool: True для секционированной таблицы
+    """
+    result = bool(connection.execute(_IS_PARTITIONED_SQL, {'table': table}).scalar())
+    connection.commit()
+    return result
+
+
+def list_partitions(connection, table: str) -> list:
+    """
+    Список секций таблицы
+
+    Args:
+        connection: Соединение SQLAlchemy
+        table: Имя секционированной таблицы
+
+    Returns:
+        list: Словари name, bound (выражение границ) и upper_bound
+              (None для секции DEFAULT и секций без верхней границы)
+    """
+    partitions = []
+    for name, bound in connection.execute(_LIST_PARTITIONS_SQL, {'table': table}):
+        match = _UPPER_BOUND_RE.search(bound)
+        partitions.append({
+            'name': name,
+            'bound': bound,
+            'upper_bound': datetime.fromisoformat(match.group(1)) if match else None,
+        })
+    connection.commit()
+    return partitions
+
+
+def ensure_partitions(connection, table: str, column: str, interval: str = PARTITION_DAY, ahead: int = 7) -> int:
+    """
+    Создание секций текущего и следующих периодов
+
+    Args:
+        connection: Соединение SQLAlchemy
+        table: Имя секционированной таблицы
+        column: Столбец секционирования
+        interval: Размер секции (day или month)
+        ahead: Количество секций вперед
+
+    Returns:
+        int: Количество созданных секций
+    """
+    created = connection.execute(_CREATE_PARTITIONS_SQL, {
+        'table': table,
+        'column': column,
+        'interval': interval,
+        'ahead': ahead,
+    }).scalar()
+    connection.commit()
+    return created
+
+
+def delete_expired_default_rows(connection, table: str, name: str, column: str, cutoff: datetime,
+                                keep_condition: str = None, batch_size: int = DEFAULT_PARTITION_DELETE_BATCH) -> int:
+    """
+    Удаление строк старше срока хранения из секции DEFAULT пачками (каждая пачка - своя транзакция)
+
+    Секция DEFAULT не имеет верхней границы и никогда не удаляется целиком, поэтому строки,
+    попавшие в нее (до создания секции их периода), удаляются по столбцу секционирования.
+
+    Args:
+        connection: Соединение SQLAlchemy
+        table: Имя секционированной таблицы
+        name: Имя секции DEFAULT
+        column: Столбец секционирования
+        cutoff: Граница срока хранения (удаляются строки с column < cutoff)
+        keep_condition: SQL условие строк, которые нельзя удалять (опционально)
+        batch_size: Количество строк в одной транзакции
+
+    Returns:
+        int: Количество удаленных строк
+    """
+    condition = f'"{column}" < :cutoff'
+    if keep_condition:
+        condition += f' AND NOT ({keep_condition})'
+    statement = text(f"""
+        DELETE FROM "{name}" WHERE ctid = ANY(ARRAY(
+            SELECT ctid FROM "{name}" WHERE {condition} LIMIT :batch_size
+        ))
+    """)
+    removed = 0
+    while True:
+        try:
+            deleted = connection.execute(statement, {'cutoff': cutoff, 'batch_size': batch_size}).rowcount
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        removed += deleted
+        if deleted < batch_size:
+            break
+    if removed:
+        logger.info("Из секции %s таблицы %s удалено %s строк старше срока хранения", name, table, removed)
+    return removed
+
+
+def drop_expired_partitions(connection, table: str, days: int, keep_condition: str = None,
+                            before_drop=None, column: str = None) -> int:
+    """
+    Удаление секций, все строки которых старше срока хранения
+
+    Срок хранения соблюдается с точностью до секции: секция удаляется, когда ее верхняя граница
+    становится старше срока. Если в секции есть строки, удовлетворяющие keep_condition,
+    секция остается, а из нее удаляются только остальные строки. Из секции DEFAULT строки
+    старше срока удаляются пачками по столбцу секционирования column.
+
+    Args:
+        connection: Соединение SQLAlchemy
+        table: Имя секционированной таблицы
+        days: Срок хранения в днях
+        keep_condition: SQL условие строк, которые нельзя удалять (опционально)
+        before_drop: Функция (connection, имя секции), вызываемая после отсоединения секции
+                     и перед ее удалением в той же транзакции (опционально)
+        column: Столбец секционирования (без него секция DEFAULT не очищается)
+
+    Returns:
+        int: Количество удаленных строк
+    """
+    cutoff = connection.execute(
+        text("SELECT LOCALTIMESTAMP - make_interval(days => :days)"), {'days': days}
+    ).scalar()
+    connection.commit()
+
+    removed = 0
+    for partition in list_partitions(connection, table):
+        name = partition['name']
+        if partition['bound'] == 'DEFAULT':
+            if column is not None:
+                removed += delete_expired_default_rows(connection, table, name, column, cutoff, keep_condition)
+            continue
+        if partition['upper_bound'] is None or partition['upper_bound'] > cutoff:
+            continue
+        try:
+            if keep_condition and connection.execute(
+                text(f'SELECT EXISTS (SELECT 1 FROM "{name}" WHERE {keep_condition})')
+            ).scalar():
+                result = connection.execute(text(f'DELETE FROM "{name}" WHERE NOT ({keep_condition})'))
+                connection.commit()
+                removed += result.rowcount
+                continue
+
+            rows = connection.execute(text(f'SELECT COUNT(*) FROM "{name}"')).scalar()
+            connection.execute(text(f"SET LOCAL lock_timeout = {DETACH_LOCK_TIMEOUT_MS}"))
+            connection.execute(text(f'ALTER TABLE "{table}" DETACH PARTITION "{name}"'))
+            if before_drop is not None:
+                before_drop(connection, name)
+            connection.execute(text(f'DROP TABLE "{name}"'))
+            connection.commit()
+            removed += rows
+            logger.info("Секция %s удалена (%s строк)", name, rows)
+        except Exception:
+            connection.rollback()
+            raise
+    return removed
+
+
+def convert_to_partitioned(connection, table: str, column: str, interval: str = PARTITION_DAY, ahead: int = 7):
+    """
+    Перевод существующей таблицы на секционирование по диапазону без копирования данных
+
+    Таблица переименовывается в <table>_legacy и присоединяется к новой секционированной таблице
+    как секция от MINVALUE до конца периода последней строки. Индексы и триггеры переносятся
+    на новую таблицу; уникальные индексы без столбца секционирования становятся неуникальными.
+    Секция <table>_legacy удаляется сроком хранения, как и остальные.
+
+    Args:
+        connection: Соединение SQLAlchemy
+        table: Имя таблицы
+        column: Столбец секционирования
+        interval: Размер секции (day или month)
+        ahead: Количество секций вперед
+    """
+    if is_partitioned(connection, table):
+        logger.info("Таблица %s уже секционирована", table)
+        return
+
+    legacy = f"{table}_legacy"
+    try:
+        connection.execute(text(f'LOCK TABLE "{table}" IN ACCESS EXCLUSIVE MODE'))
+        connection.execute(text(f'UPDATE "{table}" SET "{column}" = LOCALTIMESTAMP WHERE "{column}" IS NULL'))
+
+        triggers = connection.execute(text("""
+            SELECT tgname, pg_get_triggerdef(oid) FROM pg_trigger
+            WHERE tgrelid = to_regclass(:table) AND NOT tgisinternal
+        """), {'table': table}).all()
+        indexes = connection.execute(text("""
+            SELECT c.relname, pg_get_indexdef(i.indexrelid), i.indisprimary, i.indisunique,
+                   EXISTS (
+                       SELECT 1 FROM pg_attribute a
+                       WHERE a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey) AND a.attname = :column
+                   )
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE i.indrelid = to_regclass(:table)
+        """), {'table': table, 'column': column}).all()
+        sequence = connection.execute(
+            text("SELECT pg_get_serial_sequence(:table, 'id')"), {'table': table}
+        ).scalar()
+        boundary = connection.execute(
+            text(f"SELECT date_trunc(:interval, MAX(\"{column}\")) + CAST(:step AS INTERVAL) FROM \"{table}\""),
+            {'interval': interval, 'step': f"1 {interval}"}
+        ).scalar()
+
+        connection.execute(text(f'ALTER TABLE "{table}" RENAME TO "{legacy}"'))
+        for index_name, *_ in indexes:
+            connection.execute(text(f'ALTER INDEX "{index_name}" RENAME TO "{index_name}_legacy"'))
+        for trigger_name, _ in triggers:
+            connection.execute(text(f'DROP TRIGGER "{trigger_name}" ON "{legacy}"'))
+
+        connection.execute(text(f"""
+            CREATE TABLE "{table}" (LIKE "{legacy}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE)
+            PARTITION BY RANGE ("{column}")
+        """))
+        connection.execute(text(f'ALTER TABLE "{table}" ALTER COLUMN "{column}" SET NOT NULL'))
+        connection.execute(text(f'ALTER TABLE "{table}" ADD PRIMARY KEY (id, "{column}")'))
+        if sequence:
+            connection.execute(text(f'ALTER SEQUENCE {sequence} OWNED BY "{table}".id'))
+
+        for index_name, definition, is_primary, is_unique, has_column in indexes:
+            if is_primary:
+                continue
+            if is_unique and not has_column:
+                definition = definition.replace('CREATE UNIQUE INDEX', 'CREATE INDEX', 1)
+            connection.execute(text(definition))
+        for _, definition in triggers:
+            connection.execute(text(definition))
+
+        if boundary is not None:
+            connection.execute(text(
+                f'ALTER TABLE "{table}" ATTACH PARTITION "{legacy}" '
+                f"FOR VALUES FROM (MINVALUE) TO ('{boundary.isoformat(sep=' ')}')"
+            ))
+        connection.execute(text(f'CREATE TABLE "{table}_default" PARTITION OF "{table}" DEFAULT'))
+        connection.execute(_CREATE_PARTITIONS_SQL, {
+            'table': table, 'column': column, 'interval': interval, 'ahead': ahead
+        })
+        if boundary is None:
+            # Таблица была пустой - старая таблица не нужна
+            connection.execute(text(f'DROP TABLE "{legacy}"'))
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    logger.info("Таблица %s переведена на секционирование по %s (%s)", table, column, interval)
+
+
+def main():
+    from models import PARTITIONED_TABLES, WORKLOAD_MAINTENANCE, get_engine, get_partitioning_config
+
+    parser = argparse.ArgumentParser(description="Секционирование таблиц по времени")
+    parser.add_argument('command', choices=('convert', 'ensure', 'list'),
+                        help="convert - перевести таблицы на секционирование, ensure - создать будущие секции, "
+                             "list - показать секции")
+    parser.add_argument('--table', choices=list(PARTITIONED_TABLES), help="Только эта таблица")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    tables = [args.table] if args.table else list(PARTITIONED_TABLES)
+
+    with get_engine(WORKLOAD_MAINTENANCE).connect() as connection:
+        for table in tables:
+            column = PARTITIONED_TABLES[table]
+            config = get_partitioning_config(table)
+            if args.command == 'convert':
+                convert_to_partitioned(connection, table, column, config['interval'], config['ahead'])
+            elif args.command == 'ensure':
+                created = ensure_partitions(connection, table, column, config['interval'], config['ahead'])
+                print(f"{table}: создано секций {created}")
+            else:
+                print(f"{table}:")
+                for partition in list_partitions(connection, table):
+                    print(f"   {partition['name']}: {partition['bound']}")
+
+
+if __name__ == "__main__":
+    main()
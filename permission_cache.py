@@ -0,0 +1,201 @@
+"""
+Кэш профилей прав доступа пользователей (LRU + TTL) с инвалидацией через PostgreSQL LISTEN/NOTIFY
+"""
+
+import logging
+import select
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Канал, в который триггеры из init.sql отправляют ID пользователя ('*' - сбросить всё)
+PERMISSION_CHANGES_CHANNEL = 'permission_profile_changed'
+
+
+class PermissionProfileCache:
+    """Ограниченный по размеру LRU-кэш профилей прав с временем жизни записей"""
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 300):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._epoch = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+        self._listener_thread = None
+        self._stop_event = threading.Event()
+
+    @property
+    def epoch(self) -> int:
+        """Номер поколения кэша, увеличивается при каждой инвалидации"""
+        return self._epoch
+
+    def get(self, user_id: int):
+        """
+        Получение профиля из кэша
+
+        Args:
+            user_id: ID пользователя
+
+        Returns:
+            Профиль пользователя или None если записи нет или она устарела
+        """
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self._misses += 1
+                return None
+
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[user_id]
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(user_id)
+            self._hits += 1
+            return value
+
+    def put(self, user_id: int, value, epoch: int = None) -> bool:
+        """
+        Сохранение профиля в кэш
+
+        Args:
+            user_id: ID пользователя
+            value: Профиль пользователя
+            epoch: Поколение кэша на момент чтения профиля из базы. Если с тех пор
+                   пришла инвалидация, значение могло устареть и не сохраняется.
+
+        Returns:
+            bool: True если значение сохранено
+        """
+        with self._lock:
+            if epoch is not None and epoch != self._epoch:
+                return False
+
+            self._entries[user_id] = (value, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+            return True
+
+    def invalidate(self, user_id: int = None):
+        """
+        Удаление профиля пользователя из кэша
+
+        Args:
+            user_id: ID пользователя (если не указан - очищается весь кэш)
+        """
+        with self._lock:
+            self._epoch += 1
+            self._invalidations += 1
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+    def stats(self) -> dict:
+        """
+        Получение статистики работы кэша
+
+        Returns:
+            dict: Счетчики попаданий, промахов, вытеснений и инвалидаций
+        """
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'invalidations': self._invalidations,
+                'listener_alive': bool(self._listener_thread and self._listener_thread.is_alive())
+            }
+
+    def ensure_listener(self, engine):
+        """
+        Запуск фонового потока, слушающего уведомления об изменении прав (однократно)
+
+        Args:
+            engine: SQLAlchemy движок, параметры подключения которого используются для LISTEN
+        """
+        if self._listener_thread is not None:
+            return
+        with self._lock:
+            if self._listener_thread is not None:
+                return
+            self._stop_event.clear()
+            self._listener_thread = threading.Thread(
+                target=self._listen_loop,
+                args=(engine,),
+                name='permission-cache-listener',
+                daemon=True
+            )
+            self._listener_thread.start()
+
+    def stop_listener(self):
+        """Остановка фонового потока LISTEN"""
+        self._stop_event.set()
+        if self._listener_thread is not None:
+            self._listener_thread.join(timeout=5)
+            self._listener_thread = None
+
+    def _handle_notification(self, payload: str):
+        """Обработка одного уведомления из канала"""
+        if not payload or payload == '*':
+            self.invalidate()
+            return
+        try:
+            self.invalidate(int(payload))
+        except ValueError:
+            logger.warning("Неизвестное уведомление об изменении прав: %r", payload)
+            self.invalidate()
+
+    def _connect(self, engine):
+        """Отдельное соединение вне пула: LISTEN держит его на все время работы процесса"""
+        cargs, cparams = engine.dialect.create_connect_args(engine.url)
+        connection = engine.dialect.connect(*cargs, **cparams)
+        connection.autocommit = True
+        return connection
+
+    def _listen_loop(self, engine):
+        """Цикл ожидания уведомлений с переподключением при обрыве соединения"""
+        backoff = 1
+        while not self._stop_event.is_set():
+            try:
+                connection = self._connect(engine)
+            except Exception as e:
+                logger.warning("Не удалось подключиться для LISTEN %s: %s", PERMISSION_CHANGES_CHANNEL, e)
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, 60)
+                continue
+
+            try:
+                cursor = connection.cursor()
+                cursor.execute(f"LISTEN {PERMISSION_CHANGES_CHANNEL}")
+                backoff = 1
+                # Уведомления, пришедшие пока соединения не было, потеряны - сбрасываем кэш целиком
+                self.invalidate()
+
+                while not self._stop_event.is_set():
+                    if select.select([connection], [], [], 1.0) == ([], [], []):
+                        continue
+                    connection.poll()
+                    while connection.notifies:
+                        notify = connection.notifies.pop(0)
+                        self._handle_notification(notify.payload)
+            except Exception as e:
+                logger.warning("Соединение LISTEN %s прервано: %s", PERMISSION_CHANGES_CHANNEL, e)
+                self._stop_event.wait(backoff)
+            finally:
+                try:
+                    connection.close()
+                except Exception:
+                    pass
@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+Массовая загрузка пользователей и прав доступа к продуктам.
+
+Файлы CSV или JSONL загружаются через COPY во временные таблицы, после чего
+сливаются в users, product_users и product_owners запросами INSERT ... ON CONFLICT.
+Повторная загрузка тех же файлов ничего не меняет.
+
+Пример:
+    python provisioning.py --users users.csv --grants grants.jsonl
+    python provisioning.py --grants grants.csv --dry-run
+    python provisioning.py --users users.csv --ldif users.ldif
+
+Формат пользователей: username[, full_name, email]
+Формат прав: username, product, role (viewer, editor или owner)
+"""
+
+import argparse
+import base64
+import csv
+import json
+import os
+import sys
+import tempfile
+
+from models import WORKLOAD_MAINTENANCE, get_engine
+
+# Роли product_users; роль owner загружается в product_owners
+GRANT_ROLES = ('viewer', 'editor')
+OWNER_ROLE = 'owner'
+USERNAME_MAX_LENGTH = 50
+
+# Размер буфера COPY в памяти, после которого он сбрасывается на диск
+_SPOOL_MAX_SIZE = 16 * 1024 * 1024
+
+
+def read_records(path: str):
+    """
+    Чтение записей из CSV (с заголовком) или JSONL
+
+    Args:
+        path: Путь к файлу (.csv, .jsonl или .ndjson)
+
+    Yields:
+        dict: Очередная запись
+    """
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, encoding='utf-8', newline='') as file:
+        if extension == '.csv':
+            for record in csv.DictReader(file):
+                yield record
+        elif extension in ('.jsonl', '.ndjson'):
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            raise ValueError(f"Неподдерживаемый формат файла: {path}")
+
+
+def _clean(value) -> str:
+    """Нормализация строкового значения из входного файла"""
+    return str(value).strip() if value is not None else ''
+
+
+def _copy_rows(cursor, table: str, columns: tuple, rows):
+    """
+    Загрузка строк во временную таблицу через COPY
+
+    Args:
+        cursor: Курсор psycopg2
+        table: Имя таблицы
+        columns: Имена столбцов
+        rows: Итератор кортежей значений
+
+    Returns:
+        int: Количество загруженных строк
+    """
+    count = 0
+    with tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_SIZE, mode='w+', encoding='utf-8', newline='') as buffer:
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+        buffer.seek(0)
+        cursor.copy_expert(
+            f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+    return count
+
+
+def _iter_user_records(users_path: str, report: dict):
+    """Проверенные записи пользователей: имя и исходная запись"""
+    for record in read_records(users_path):
+        username = _clean(record.get('username'))
+        if not username or len(username) > USERNAME_MAX_LENGTH:
+            report['rejected'].append({'record': record, 'reason': 'invalid username'})
+            continue
+        yield username, record
+
+
+def _iter_users(users_path: str, report: dict):
+    """Проверенные строки пользователей для COPY"""
+    for username, _ in _iter_user_records(users_path, report):
+        yield (username,)
+
+
+def _iter_grants(grants_path: str, report: dict):
+    """Проверенные строки прав для COPY (номер строки нужен, чтобы при повторах побеждала последняя)"""
+    for line_no, record in enumerate(read_records(grants_path), start=1):
+        username = _clean(record.get('username'))
+        product = _clean(record.get('product'))
+        role = _clean(record.get('role')).lower()
+        if not username or len(username) > USERNAME_MAX_LENGTH:
+            report['rejected'].append({'record': record, 'reason': 'invalid username'})
+            continue
+        if not product:
+            report['rejected'].append({'record': record, 'reason': 'missing product'})
+            continue
+        if role not in GRANT_ROLES + (OWNER_ROLE,):
+            report['rejected'].append({'record': record, 'reason': f'invalid role {role!r}'})
+            continue
+        yield (line_no, username, product, role)
+
+
+def provision(users_path: str = None, grants_path: str = None, dry_run: bool = False) -> dict:
+    """
+    Массовая загрузка пользователей и прав доступа в одной транзакции
+
+    Args:
+        users_path: Файл пользователей (CSV/JSONL)
+        grants_path: Файл прав (CSV/JSONL) - пользователи из него тоже создаются
+        dry_run: Выполнить загрузку и откатить транзакцию (только отчет)
+
+    Returns:
+        dict: Количество добавленных, измененных и неизменных строк по таблицам,
+              отклоненные записи и неизвестные продукты
+    """
+    report = {
+        'users': {'inserted': 0, 'updated': 0, 'unchanged': 0},
+        'product_users': {'inserted': 0, 'updated': 0, 'unchanged': 0},
+        'product_owners': {'inserted': 0, 'updated': 0, 'unchanged': 0},
+        'rejected': [],
+        'unknown_products': [],
+        'dry_run': dry_run,
+    }
+
+    connection = get_engine(WORKLOAD_MAINTENANCE).raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("""
+            CREATE TEMP TABLE staging_users (username TEXT NOT NULL) ON COMMIT DROP;
+            CREATE TEMP TABLE staging_grants (
+                line_no INTEGER NOT NULL,
+                username TEXT NOT NULL,
+                product TEXT NOT NULL,
+                role TEXT NOT NULL
+            ) ON COMMIT DROP;
+        """)
+
+        if users_path:
+            _copy_rows(cursor, 'staging_users', ('username',), _iter_users(users_path, report))
+        if grants_path:
+            _copy_rows(
+                cursor, 'staging_grants', ('line_no', 'username', 'product', 'role'),
+                _iter_grants(grants_path, report)
+            )
+
+        # Пользователи: из файла пользователей и из файла прав
+        cursor.execute("""
+            WITH src AS (
+                SELECT username FROM staging_users
+                UNION
+                SELECT username FROM staging_grants
+            ),
+            inserted AS (
+                INSERT INTO users (username)
+                SELECT username FROM src
+                ON CONFLICT (username) DO NOTHING
+                RETURNING 1
+            )
+            SELECT (SELECT COUNT(*) FROM src), (SELECT COUNT(*) FROM inserted)
+        """)
+        total, inserted = cursor.fetchone()
+        report['users'].update(inserted=inserted, unchanged=total - inserted)
+
+        # Продукты сопоставляются по имени (при дублях имени - продукт с меньшим id)
+        cursor.execute("""
+            CREATE TEMP TABLE staging_products ON COMMIT DROP AS
+            SELECT DISTINCT ON (name) id, name FROM products ORDER BY name, id
+        """)
+        cursor.execute("""
+            SELECT DISTINCT g.product
+            FROM staging_grants g
+            LEFT JOIN staging_products p ON p.name = g.product
+            WHERE p.id IS NULL
+            ORDER BY g.product
+        """)
+        report['unknown_products'] = [row[0] for row in cursor.fetchall()]
+
+        # Права пользователей: новая роль перезаписывает прежнюю, одинаковая - не трогается
+        cursor.execute("""
+            WITH src AS (
+                SELECT DISTINCT ON (u.id, p.id) p.id AS product_id, u.id AS user_id, g.role
+                FROM staging_grants g
+                JOIN users u ON u.username = g.username
+                JOIN staging_products p ON p.name = g.product
+                WHERE g.role <> %s
+                ORDER BY u.id, p.id, g.line_no DESC
+            ),
+            merged AS (
+                INSERT INTO product_users (product_id, user_id, role)
+                SELECT product_id, user_id, role FROM src
+                ON CONFLICT (product_id, user_id) DO UPDATE SET role = EXCLUDED.role
+                WHERE product_users.role IS DISTINCT FROM EXCLUDED.role
+                RETURNING (xmax = 0) AS is_insert
+            )
+            SELECT
+                (SELECT COUNT(*) FROM src),
+                COUNT(*) FILTER (WHERE is_insert),
+                COUNT(*) FILTER (WHERE NOT is_insert)
+            FROM merged
+        """, (OWNER_ROLE,))
+        total, inserted, updated = cursor.fetchone()
+        report['product_users'].update(inserted=inserted, updated=updated, unchanged=total - inserted - updated)
+
+        # Владельцы продуктов
+        cursor.execute("""
+            WITH src AS (
+                SELECT DISTINCT p.id AS product_id, u.id AS user_id
+                FROM staging_grants g
+                JOIN users u ON u.username = g.username
+                JOIN staging_products p ON p.name = g.product
+                WHERE g.role = %s
+            ),
+            inserted AS (
+                INSERT INTO product_owners (product_id, user_id)
+                SELECT product_id, user_id FROM src
+                ON CONFLICT (product_id, user_id) DO NOTHING
+                RETURNING 1
+            )
+            SELECT (SELECT COUNT(*) FROM src), (SELECT COUNT(*) FROM inserted)
+        """, (OWNER_ROLE,))
+        total, inserted = cursor.fetchone()
+        report['product_owners'].update(inserted=inserted, unchanged=total - inserted)
+
+        cursor.close()
+        if dry_run:
+            connection.rollback()
+        else:
+            connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+    return report
+
+
+def _escape_dn_value(value: str) -> str:
+    """
+    Экранирование значения атрибута в DN (RFC 4514)
+
+    Args:
+        value: Значение атрибута
+
+    Returns:
+        str: Значение для подстановки в DN
+    """
+    escaped = []
+    for index, char in enumerate(value):
+        leading_or_trailing = (char == '#' and index == 0) or (char == ' ' and index in (0, len(value) - 1))
+        if char in '"+,;<>\\' or leading_or_trailing:
+            escaped.append('\\' + char)
+        elif char == '\0':
+            escaped.append('\\00')
+        else:
+            escaped.append(char)
+    return ''.join(escaped)
+
+
+def _ldif_line(attribute: str, value) -> str:
+    """
+    Строка атрибута LDIF: значение не из SAFE-STRING (RFC 2849) кодируется в base64 (attr:: )
+
+    Args:
+        attribute: Имя атрибута
+        value: Значение атрибута
+
+    Returns:
+        str: Строка LDIF с переводом строки
+    """
+    value = str(value)
+    safe = (
+        value.isascii()
+        and not any(char in '\0\r\n' for char in value)
+        and not value.startswith((' ', ':', '<'))
+        and not value.endswith(' ')
+    )
+    if safe:
+        return f"{attribute}: {value}\n"
+    return f"{attribute}:: {base64.b64encode(value.encode('utf-8')).decode('ascii')}\n"
+
+
+def write_ldif(users_path: str, output, base_dn: str = 'ou=people,dc=test,dc=local',
+               uid_number_start: int = 10000, gid_number: int = 1000) -> int:
+    """
+    Формирование LDIF для загрузки всех пользователей одним вызовом ldapadd -f
+
+    Записи проверяются так же, как при загрузке в базу (provision): отклоненные пользователи
+    в LDIF не попадают, повторы имени записываются один раз.
+
+    Args:
+        users_path: Файл пользователей (CSV/JSONL)
+        output: Файловый объект для записи LDIF
+        base_dn: DN подразделения пользователей
+        uid_number_start: Первый uidNumber
+        gid_number: gidNumber пользователей
+
+    Returns:
+        int: Количество записей LDIF
+    """
+    count = 0
+    written = set()
+    default_domain = base_dn.split('dc=', 1)[-1].replace(',dc=', '.')
+    for username, record in _iter_user_records(users_path, {'rejected': []}):
+        if username in written:
+            continue
+        written.add(username)
+        full_name = _clean(record.get('full_name')) or username
+        name_parts = full_name.split()
+        email = _clean(record.get('email')) or f"{username}@{default_domain}"
+        output.write(
+            _ldif_line('dn', f"uid={_escape_dn_value(username)},{base_dn}")
+            + "objectClass: inetOrgPerson\n"
+            "objectClass: posixAccount\n"
+            "objectClass: top\n"
+            + _ldif_line('cn', full_name)
+            + _ldif_line('sn', name_parts[-1] if name_parts else username)
+            + _ldif_line('uid', username)
+            + f"uidNumber: {uid_number_start + count}\n"
+            f"gidNumber: {gid_number}\n"
+            + _ldif_line('homeDirectory', f"/home/{username}")
+            + "loginShell: /bin/bash\n"
+            + _ldif_line('mail', email)
+            + "\n"
+        )
+        count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Массовая загрузка пользователей и прав доступа")
+    parser.add_argument('--users', help="Файл пользователей (CSV/JSONL): username[, full_name, email]")
+    parser.add_argument('--grants', help="Файл прав (CSV/JSONL): username, product, role")
+    parser.add_argument('--dry-run', action='store_true', help="Откатить транзакцию и только показать отчет")
+    parser.add_argument('--ldif', help="Дополнительно записать LDIF пользователей для ldapadd -f")
+    args = parser.parse_args()
+
+    if not args.users and not args.grants:
+        parser.error("Укажите --users и/или --grants")
+
+    if args.ldif and not args.users:
+        parser.error("Для --ldif нужен --users")
+
+    report = provision(args.users, args.grants, dry_run=args.dry_run)
+
+    # LDIF записывается только после фиксации загрузки: пользователи в LDAP и в базе совпадают
+    if args.ldif and args.dry_run:
+        print("ℹ️ LDIF не записан: dry run")
+    elif args.ldif:
+        with open(args.ldif, 'w', encoding='utf-8') as output:
+            count = write_ldif(args.users, output)
+        print(f"✅ LDIF: {count} пользователей записано в {args.ldif}")
+
+    print("📦 Результат загрузки" + (" (dry run, изменения отменены)" if args.dry_run else ""))
+    for table in ('users', 'product_users', 'product_owners'):
+        counts = report[table]
+        print(f"   {table}: добавлено {counts['inserted']}, изменено {counts['updated']}, без изменений {counts['unchanged']}")
+    if report['unknown_products']:
+        print(f"⚠️ Неизвестные продукты: {', '.join(report['unknown_products'])}")
+    if report['rejected']:
+        print(f"⚠️ Отклонено записей: {len(report['rejected'])}")
+        for rejected in report['rejected'][:20]:
+            print(f"   - {rejected['reason']}: {rejected['record']}")
+
+    return 0 if not report['rejected'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,262 @@
+"""
+Агрегаты по интервалам времени (минута, час, день) для попыток неавторизованного входа и сессий.
+
+Агрегаты дополняются фоновой задачей: каждый запуск обрабатывает только строки с id больше
+сохраненной отметки (watermark) и сдвигает отметку в той же транзакции.
+"""
+
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_MINUTE = 'minute'
+ROLLUP_HOUR = 'hour'
+ROLLUP_DAY = 'day'
+
+# От крупного интервала к мелкому
+ROLLUP_GRANULARITIES = (ROLLUP_DAY, ROLLUP_HOUR, ROLLUP_MINUTE)
+
+ATTEMPTS_WATERMARK = 'unauthorized_login_attempts'
+SESSIONS_WATERMARK = 'user_sessions'
+
+_ENSURE_WATERMARK_SQL = text("""
+    INSERT INTO rollup_watermarks (name, last_id, updated_at)
+    VALUES (:name, 0, CURRENT_TIMESTAMP)
+    ON CONFLICT (name) DO NOTHING
+""")
+
+_LOCK_WATERMARK_SQL = text("""
+    SELECT last_id FROM rollup_watermarks WHERE name = :name FOR UPDATE
+""")
+
+_ADVANCE_WATERMARK_SQL = text("""
+    UPDATE rollup_watermarks SET last_id = :last_id, updated_at = CURRENT_TIMESTAMP WHERE name = :name
+""")
+
+# Верхняя граница пачки - наибольший id среди строк, вставленных (inserted_at, часы базы) раньше границы:
+# settle_seconds назад, но не позже начала самой старой из открытых транзакций базы. Транзакция, которая
+# еще не зафиксирована, получила свои id после своего начала, то есть больше любого id строки,
+# вставленной до границы, поэтому строки с id не больше верхней границы уже не появятся.
+# NULL в inserted_at - строка вставлена до миграции 6. Начало транзакций других ролей
+# pg_stat_activity не показывает (без pg_read_all_stats) - для них остается только задержка settle_seconds.
+_SETTLED_BEFORE_SQL = """
+    LEAST(
+        LOCALTIMESTAMP - make_interval(secs => :settle_seconds),
+        (SELECT MIN(xact_start)::timestamp FROM pg_stat_activity
+         WHERE datname = current_database() AND pid <> pg_backend_pid())
+    )
+"""
+
+_ATTEMPTS_HIGH_WATERMARK_SQL = text(f"""
+    SELECT LEAST(
+        :last_id + :batch_size,
+        COALESCE(
+            (SELECT MAX(id) FROM unauthorized_login_attempts
+             WHERE id > :last_id AND (inserted_at IS NULL OR inserted_at < {_SETTLED_BEFORE_SQL})),
+            :last_id
+        )
+    )
+""")
+
+_SESSIONS_HIGH_WATERMARK_SQL = text(f"""
+    SELECT LEAST(
+        :last_id + :batch_size,
+        COALESCE(
+            (SELECT MAX(id) FROM user_sessions
+             WHERE id > :last_id AND (inserted_at IS NULL OR inserted_at < {_SETTLED_BEFORE_SQL})),
+            :last_id
+        )
+    )
+""")
+
+_ROLLUP_ATTEMPTS_SQL = text("""
+    INSERT INTO unauthorized_attempt_rollups AS r
+        (granularity, bucket_start, username, ip_address, reason, attempts)
+    SELECT g.granularity, date_trunc(g.granularity, a.attempted_at), a.username, a.ip_address, a.reason, COUNT(*)
+    FROM unauthorized_login_attempts a
+    CROSS JOIN (VALUES ('minute'), ('hour'), ('day')) AS g(granularity)
+    WHERE a.id > :low AND a.id <= :high AND a.attempted_at IS NOT NULL
+    GROUP BY 1, 2, 3, 4, 5
+    ON CONFLICT ON CONSTRAINT uq_unauthorized_attempt_rollups
+    DO UPDATE SET attempts = r.attempts + EXCLUDED.attempts
+""")
+
+_ROLLUP_SESSIONS_SQL = text("""
+    INSERT INTO user_session_rollups AS r (granularity, bucket_start, logins, peak_active_sessions)
+    SELECT g.granularity, date_trunc(g.granularity, s.created_at), COUNT(*), 0
+    FROM user_sessions s
+    CROSS JOIN (VALUES ('minute'), ('hour'), ('day')) AS g(granularity)
+    WHERE s.id > :low AND s.id <= :high AND s.created_at IS NOT NULL
+    GROUP BY 1, 2
+    ON CONFLICT (granularity, bucket_start)
+    DO UPDATE SET logins = r.logins + EXCLUDED.logins
+""")
+
+# Количество активных сессий - мгновенное значение: в интервал записывается максимум замеров
+_SAMPLE_ACTIVE_SESSIONS_SQL = text("""
+    INSERT INTO user_session_rollups AS r (granularity, bucket_start, logins, peak_active_sessions)
+    SELECT g.granularity, date_trunc(g.granularity, LOCALTIMESTAMP), 0, active.sessions
+    FROM (VALUES ('minute'), ('hour'), ('day')) AS g(granularity)
+    CROSS JOIN (SELECT COUNT(*) AS sessions FROM user_sessions WHERE is_active = TRUE) AS active
+    ON CONFLICT (granularity, bucket_start)
+    DO UPDATE SET peak_active_sessions = GREATEST(r.peak_active_sessions, EXCLUDED.peak_active_sessions)
+""")
+
+_PRUNE_ROLLUPS_SQL = (
+    text("""
+        DELETE FROM unauthorized_attempt_rollups
+        WHERE granularity = :granularity AND bucket_start < LOCALTIMESTAMP - make_interval(days => :days)
+    """),
+    text("""
+        DELETE FROM user_session_rollups
+        WHERE granularity = :granularity AND bucket_start < LOCALTIMESTAMP - make_interval(days => :days)
+    """),
+)
+
+
+def truncate_to_granularity(value: datetime, granularity: str) -> datetime:
+    """
+    Начало интервала, содержащего момент времени (аналог date_trunc)
+
+    Args:
+        value: Момент времени
+        granularity: minute, hour или day
+
+    Returns:
+        datetime: Начало интервала
+    """
+    if granularity == ROLLUP_MINUTE:
+        return value.replace(second=0, microsecond=0)
+    if granularity == ROLLUP_HOUR:
+        return value.replace(minute=0, second=0, microsecond=0)
+    if granularity == ROLLUP_DAY:
+        return value.replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"Неизвестный интервал агрегатов: {granularity}")
+
+
+def choose_granularity(since: datetime = None, until: datetime = None, retention_days: dict = None,
+                       now: datetime = None) -> str:
+    """
+    Выбор самого крупного интервала агрегатов, подходящего для периода
+
+    Интервал подходит, если границы периода совпадают с границами его интервалов и агрегаты
+    этого интервала еще хранятся за весь период. Если ни один интервал не выровнен по границам,
+    выбирается самый мелкий из хранящихся (границы округляются вниз до его интервала).
+
+    Args:
+        since: Начало периода (None - без ограничения)
+        until: Конец периода (None - без ограничения)
+        retention_days: Срок хранения агрегатов по интервалам в днях (None - бессрочно)
+        now: Текущее время (для проверки срока хранения)
+
+    Returns:
+        str: minute, hour или day
+    """
+    retention_days = retention_days or {}
+    now = now or datetime.now()
+
+    retained = []
+    for granularity in ROLLUP_GRANULARITIES:
+        days = retention_days.get(granularity)
+        if days is not None and (since is None or since < now - timedelta(days=days)):
+            continue
+        retained.append(granularity)
+    if not retained:
+        return ROLLUP_DAY
+
+    for granularity in retained:
+        if all(value is None or truncate_to_granularity(value, granularity) == value for value in (since, until)):
+            return granularity
+    return retained[-1]
+
+
+def _refresh_source(connection, name: str, high_watermark_sql, rollup_sql, batch_size: int, settle_seconds: float) -> int:
+    """
+    Дополнение агрегатов одного источника пачками от сохраненной отметки
+
+    Returns:
+        int: Количество обработанных id исходной таблицы
+    """
+    connection.execute(_ENSURE_WATERMARK_SQL, {'name': name})
+    connection.commit()
+
+    processed = 0
+    while True:
+        low = connection.execute(_LOCK_WATERMARK_SQL, {'name': name}).scalar()
+        high = connection.execute(high_watermark_sql, {
+            'last_id': low,
+            'batch_size': batch_size,
+            'settle_seconds': settle_seconds,
+        }).scalar()
+        if high is None or high <= low:
+            connection.rollback()
+            return processed
+
+        connection.execute(rollup_sql, {'low': low, 'high': high})
+        connection.execute(_ADVANCE_WATERMARK_SQL, {'name': name, 'last_id': high})
+        connection.commit()
+        processed += high - low
+        logger.debug("Агрегаты %s дополнены до id %s", name, high)
+
+
+def refresh_attempt_rollups(connection, batch_size: int = 50000, settle_seconds: float = 60) -> int:
+    """
+    Дополнение агрегатов попыток неавторизованного входа
+
+    Args:
+        connection: Соединение SQLAlchemy
+        batch_size: Количество id исходной таблицы в одной транзакции
+        settle_seconds: Задержка обработки свежих строк
+
+    Returns:
+        int: Количество обработанных id
+    """
+    return _refresh_source(
+        connection, ATTEMPTS_WATERMARK, _ATTEMPTS_HIGH_WATERMARK_SQL, _ROLLUP_ATTEMPTS_SQL,
+        batch_size, settle_seconds
+    )
+
+
+def refresh_session_rollups(connection, batch_size: int = 50000, settle_seconds: float = 60) -> int:
+    """
+    Дополнение агрегатов сессий (входы) и замер количества активных сессий
+
+    Args:
+        connection: Соединение SQLAlchemy
+        batch_size: Количество id исходной таблицы в одной транзакции
+        settle_seconds: Задержка обработки свежих строк
+
+    Returns:
+        int: Количество обработанных id
+    """
+    processed = _refresh_source(
+        connection, SESSIONS_WATERMARK, _SESSIONS_HIGH_WATERMARK_SQL, _ROLLUP_SESSIONS_SQL,
+        batch_size, settle_seconds
+    )
+    connection.execute(_SAMPLE_ACTIVE_SESSIONS_SQL)
+    connection.commit()
+    return processed
+
+
+def prune_rollups(connection, retention_days: dict) -> int:
+    """
+    Удаление агрегатов старше срока хранения их интервала
+
+    Args:
+        connection: Соединение SQLAlchemy
+        retention_days: Срок хранения по интервалам в днях (None - бессрочно)
+
+    Returns:
+        int: Количество удаленных строк агрегатов
+    """
+    deleted = 0
+    for granularity, days in retention_days.items():
+        if days is None:
+            continue
+        for statement in _PRUNE_ROLLUPS_SQL:
+            deleted += connection.execute(statement, {'granularity': granularity, 'days': days}).rowcount
+    connection.commit()
+    return deleted
@@ -0,0 +1,409 @@
+-- Миграция 1: схема до введения версий (init.sql до таблицы schema_migrations).
+-- Файлы миграций не изменяются после выпуска: изменения схемы - только новыми файлами.
+-- Все операции идемпотентны, поэтому миграция применима и к базе, созданной прежним init.sql.
+
+-- Триграммные индексы для поиска по подстроке (ILIKE '%...%') в административной панели
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Создание таблицы пользователей
+CREATE TABLE IF NOT EXISTS users (
+    id SERIAL PRIMARY KEY,
+    username VARCHAR(50) UNIQUE NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Создание таблицы продуктов
+CREATE TABLE IF NOT EXISTS products (
+    id SERIAL PRIMARY KEY,
+    name TEXT NOT NULL,
+    description TEXT,
+    created_at TIMESTAMP DEFAULT now()
+);
+
+-- Создание таблица пользователей с правами
+CREATE TABLE IF NOT EXISTS product_users (
+    id SERIAL PRIMARY KEY,
+    product_id INT NOT NULL REFERENCES products(id) ON DELETE CASCADE,
+    user_id INT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    role TEXT CHECK (role IN ('viewer', 'editor')) DEFAULT 'viewer',
+    UNIQUE (product_id, user_id)
+);
+
+-- Сооздание таблицы владельцев проектов
+CREATE TABLE IF NOT EXISTS product_owners (
+    id SERIAL PRIMARY KEY,
+    product_id INT NOT NULL REFERENCES products(id) ON DELETE CASCADE,
+    user_id INT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    UNIQUE (product_id, user_id)
+);
+
+-- Создание индексов
+CREATE INDEX IF NOT EXISTS idx_users_username ON users(username);
+
+-- Создание секций по времени для таблиц, секционированных по диапазону (partition_column).
+-- Создаются секции текущего периода и ahead следующих; строки, уже попавшие в секцию DEFAULT
+-- в диапазоне новой секции, переносятся в нее. Существующие и пересекающиеся секции пропускаются.
+CREATE OR REPLACE FUNCTION create_time_partitions(parent TEXT, partition_column TEXT, step TEXT, ahead INTEGER)
+RETURNS INTEGER AS $$
+DECLARE
+    period_start TIMESTAMP := date_trunc(step, LOCALTIMESTAMP);
+    period_end TIMESTAMP;
+    partition_name TEXT;
+    default_has_rows BOOLEAN;
+    created INTEGER := 0;
+BEGIN
+    FOR i IN 0..ahead LOOP
+        period_end := period_start + ('1 ' || step)::INTERVAL;
+        partition_name := parent || '_p' || to_char(period_start, CASE step WHEN 'month' THEN 'YYYYMM' ELSE 'YYYYMMDD' END);
+
+        IF to_regclass(partition_name) IS NULL THEN
+            BEGIN
+                EXECUTE format('SELECT EXISTS (SELECT 1 FROM %I WHERE %I >= %L AND %I < %L)',
+                               parent || '_default', partition_column, period_start, partition_column, period_end)
+                INTO default_has_rows;
+
+                IF default_has_rows THEN
+                    EXECUTE format('CREATE TEMP TABLE partition_rows (LIKE %I) ON COMMIT DROP', parent);
+                    EXECUTE format('WITH moved AS (DELETE FROM %I WHERE %I >= %L AND %I < %L RETURNING *) '
+                                   'INSERT INTO partition_rows SELECT * FROM moved',
+                                   parent || '_default', partition_column, period_start, partition_column, period_end);
+                END IF;
+
+                EXECUTE format('CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                               partition_name, parent, period_start, period_end);
+
+                IF default_has_rows THEN
+                    EXECUTE format('INSERT INTO %I SELECT * FROM partition_rows', parent);
+                    DROP TABLE partition_rows;
+                END IF;
+                created := created + 1;
+            EXCEPTION WHEN invalid_object_definition THEN
+                -- Период уже покрыт другой секцией (например, секцией с данными до секционирования)
+                NULL;
+            END;
+        END IF;
+
+        period_start := period_end;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Схема базы данных для управления сессиями пользователей
+-- Создание таблицы для хранения активных сессий (секции по месяцам created_at)
+
+CREATE TABLE IF NOT EXISTS user_sessions (
+    id SERIAL,
+    username VARCHAR(255) NOT NULL,
+    session_id VARCHAR(255) NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    last_activity TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    ip_address INET,
+    user_agent TEXT,
+    is_active BOOLEAN DEFAULT TRUE,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+-- Таблица, созданная до секционирования, переводится командой python partitions.py convert
+DO $$
+BEGIN
+    IF (SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass('user_sessions')) THEN
+        CREATE TABLE IF NOT EXISTS user_sessions_default PARTITION OF user_sessions DEFAULT;
+        PERFORM create_time_partitions('user_sessions', 'created_at', 'month', 2);
+    END IF;
+END
+$$;
+
+-- Индекс для быстрого поиска по username
+CREATE INDEX IF NOT EXISTS idx_user_sessions_username ON user_sessions(username);
+
+-- Индекс для быстрого поиска по session_id (уникальность обеспечивается генерацией uuid:
+-- уникальный индекс секционированной таблицы обязан включать created_at)
+CREATE INDEX IF NOT EXISTS idx_user_sessions_session_id ON user_sessions(session_id);
+
+-- Индекс для поиска активных сессий
+CREATE INDEX IF NOT EXISTS idx_user_sessions_active ON user_sessions(is_active) WHERE is_active = TRUE;
+
+-- Индексы для постраничного вывода по ключу (created_at, id)
+CREATE INDEX IF NOT EXISTS idx_user_sessions_created_at_id ON user_sessions(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_user_sessions_username_created_at_id ON user_sessions(username, created_at, id);
+
+-- Индексы для поиска по шаблону имени и подстроке User Agent (ILIKE) и по сети IP адреса (<<=)
+CREATE INDEX IF NOT EXISTS idx_user_sessions_username_trgm ON user_sessions USING GIN (username gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_user_sessions_user_agent_trgm ON user_sessions USING GIN (user_agent gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_user_sessions_ip ON user_sessions(ip_address);
+
+-- Функция для очистки неактивных сессий (старше 9 часов)
+CREATE OR REPLACE FUNCTION cleanup_inactive_sessions()
+RETURNS INTEGER AS $$
+DECLARE
+    deleted_count INTEGER;
+BEGIN
+    DELETE FROM user_sessions 
+    WHERE last_activity < NOW() - INTERVAL '9 hours' 
+    OR (is_active = FALSE AND created_at < NOW() - INTERVAL '1 hour');
+    
+    GET DIAGNOSTICS deleted_count = ROW_COUNT;
+    RETURN deleted_count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Создание триггера для автоматического обновления last_activity
+CREATE OR REPLACE FUNCTION update_last_activity()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- Явно переданное время (пакетная запись активности) не перезаписываем
+    IF NEW.last_activity IS NOT DISTINCT FROM OLD.last_activity THEN
+        NEW.last_activity = CURRENT_TIMESTAMP;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Применение триггера к таблице (если нужно автоматическое обновление)
+CREATE OR REPLACE TRIGGER trigger_update_last_activity
+    BEFORE UPDATE ON user_sessions
+    FOR EACH ROW
+    EXECUTE FUNCTION update_last_activity();
+
+-- Счетчики сессий, поддерживаемые триггерами (режим session_stats.mode: counters).
+-- Счетчики разнесены по 16 строкам (slot), чтобы одновременные входы не ждали друг друга
+-- на одной строке; итог - сумма по всем строкам.
+CREATE TABLE IF NOT EXISTS user_session_counters (
+    slot SMALLINT PRIMARY KEY,
+    total_sessions BIGINT NOT NULL DEFAULT 0,
+    active_sessions BIGINT NOT NULL DEFAULT 0,
+    unique_users BIGINT NOT NULL DEFAULT 0
+);
+
+-- Количество сессий каждого пользователя (для счетчика уникальных пользователей)
+CREATE TABLE IF NOT EXISTS user_session_user_counts (
+    username VARCHAR(255) PRIMARY KEY,
+    sessions BIGINT NOT NULL
+);
+
+CREATE OR REPLACE FUNCTION maintain_user_session_counters()
+RETURNS TRIGGER AS $$
+DECLARE
+    total_delta BIGINT := 0;
+    active_delta BIGINT := 0;
+    users_delta BIGINT := 0;
+    user_sessions_left BIGINT;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        total_delta := 1;
+        active_delta := CASE WHEN NEW.is_active THEN 1 ELSE 0 END;
+        INSERT INTO user_session_user_counts AS c (username, sessions) VALUES (NEW.username, 1)
+        ON CONFLICT (username) DO UPDATE SET sessions = c.sessions + 1
+        RETURNING sessions INTO user_sessions_left;
+        IF user_sessions_left = 1 THEN
+            users_delta := 1;
+        END IF;
+    ELSIF TG_OP = 'DELETE' THEN
+        total_delta := -1;
+        active_delta := CASE WHEN OLD.is_active THEN -1 ELSE 0 END;
+        UPDATE user_session_user_counts SET sessions = sessions - 1
+        WHERE username = OLD.username
+        RETURNING sessions INTO user_sessions_left;
+        IF user_sessions_left = 0 THEN
+            DELETE FROM user_session_user_counts WHERE username = OLD.username AND sessions = 0;
+            users_delta := -1;
+        END IF;
+    ELSE
+        active_delta := (CASE WHEN NEW.is_active THEN 1 ELSE 0 END) - (CASE WHEN OLD.is_active THEN 1 ELSE 0 END);
+        IF active_delta = 0 THEN
+            RETURN NULL;
+        END IF;
+    END IF;
+
+    INSERT INTO user_session_counters AS c (slot, total_sessions, active_sessions, unique_users)
+    VALUES (pg_backend_pid() % 16, total_delta, active_delta, users_delta)
+    ON CONFLICT (slot) DO UPDATE SET
+        total_sessions = c.total_sessions + EXCLUDED.total_sessions,
+        active_sessions = c.active_sessions + EXCLUDED.active_sessions,
+        unique_users = c.unique_users + EXCLUDED.unique_users;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Пересчет счетчиков по таблице user_sessions (после TRUNCATE или при включении на существующей базе)
+CREATE OR REPLACE FUNCTION rebuild_user_session_counters()
+RETURNS VOID AS $$
+BEGIN
+    LOCK TABLE user_sessions IN SHARE MODE;
+    DELETE FROM user_session_counters;
+    DELETE FROM user_session_user_counts;
+    INSERT INTO user_session_user_counts (username, sessions)
+    SELECT username, COUNT(*) FROM user_sessions GROUP BY username;
+    INSERT INTO user_session_counters (slot, total_sessions, active_sessions, unique_users)
+    SELECT 0, COUNT(*), COUNT(*) FILTER (WHERE is_active), COUNT(DISTINCT username)
+    FROM user_sessions;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Вычитание строк отсоединенной секции user_sessions из счетчиков (перед удалением секции)
+CREATE OR REPLACE FUNCTION subtract_user_session_partition(partition_table REGCLASS)
+RETURNS VOID AS $$
+DECLARE
+    removed_users BIGINT;
+BEGIN
+    EXECUTE format(
+        'UPDATE user_session_user_counts c SET sessions = c.sessions - r.sessions '
+        'FROM (SELECT username, COUNT(*) AS sessions FROM %s GROUP BY username) r '
+        'WHERE c.username = r.username', partition_table);
+    DELETE FROM user_session_user_counts WHERE sessions <= 0;
+    GET DIAGNOSTICS removed_users = ROW_COUNT;
+
+    EXECUTE format(
+        'INSERT INTO user_session_counters AS c (slot, total_sessions, active_sessions, unique_users) '
+        'SELECT 0, -COUNT(*), -COUNT(*) FILTER (WHERE is_active), -$1 FROM %s '
+        'ON CONFLICT (slot) DO UPDATE SET '
+        'total_sessions = c.total_sessions + EXCLUDED.total_sessions, '
+        'active_sessions = c.active_sessions + EXCLUDED.active_sessions, '
+        'unique_users = c.unique_users + EXCLUDED.unique_users', partition_table)
+    USING removed_users;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION reset_user_session_counters()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM rebuild_user_session_counters();
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER trigger_user_session_counters
+    AFTER INSERT OR DELETE OR UPDATE OF is_active ON user_sessions
+    FOR EACH ROW
+    EXECUTE FUNCTION maintain_user_session_counters();
+
+CREATE OR REPLACE TRIGGER trigger_user_session_counters_truncate
+    AFTER TRUNCATE ON user_sessions
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION reset_user_session_counters();
+
+-- Создание таблицы для записи попыток входа неавторизованных пользователей
+CREATE TABLE IF NOT EXISTS unauthorized_login_attempts (
+    id SERIAL,
+    username VARCHAR(255) NOT NULL,
+    ip_address INET,
+    user_agent TEXT,
+    attempted_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    reason TEXT DEFAULT 'User not found in product_users table',
+    PRIMARY KEY (id, attempted_at)
+) PARTITION BY RANGE (attempted_at);
+
+-- Секции по дням attempted_at
+-- Таблица, созданная до секционирования, переводится командой python partitions.py convert
+DO $$
+BEGIN
+    IF (SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass('unauthorized_login_attempts')) THEN
+        CREATE TABLE IF NOT EXISTS unauthorized_login_attempts_default PARTITION OF unauthorized_login_attempts DEFAULT;
+        PERFORM create_time_partitions('unauthorized_login_attempts', 'attempted_at', 'day', 7);
+    END IF;
+END
+$$;
+
+-- Индекс для быстрого поиска по username
+CREATE INDEX IF NOT EXISTS idx_unauthorized_login_attempts_username ON unauthorized_login_attempts(username);
+
+-- Индекс для поиска по времени попытки и постраничного вывода по ключу (attempted_at, id)
+CREATE INDEX IF NOT EXISTS idx_unauthorized_login_attempts_attempted_at_id ON unauthorized_login_attempts(attempted_at, id);
+CREATE INDEX IF NOT EXISTS idx_unauthorized_login_attempts_username_attempted_at_id ON unauthorized_login_attempts(username, attempted_at, id);
+
+-- Индекс для поиска по IP адресу и по сети (ip_address <<= '10.0.0.0/8' использует диапазон btree)
+CREATE INDEX IF NOT EXISTS idx_unauthorized_login_attempts_ip ON unauthorized_login_attempts(ip_address);
+
+-- Индексы для поиска по шаблону имени и подстроке User Agent (ILIKE)
+CREATE INDEX IF NOT EXISTS idx_unauthorized_login_attempts_username_trgm ON unauthorized_login_attempts USING GIN (username gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_unauthorized_login_attempts_user_agent_trgm ON unauthorized_login_attempts USING GIN (user_agent gin_trgm_ops);
+
+-- Уведомления об изменении прав доступа для сброса кэша профилей в процессах приложения
+CREATE OR REPLACE FUNCTION notify_permission_profile_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_TABLE_NAME = 'products' THEN
+        -- Изменение продукта затрагивает всех пользователей с доступом к нему
+        PERFORM pg_notify('permission_profile_changed', '*');
+    ELSIF TG_TABLE_NAME = 'users' THEN
+        PERFORM pg_notify('permission_profile_changed', OLD.id::text);
+    ELSE
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            PERFORM pg_notify('permission_profile_changed', OLD.user_id::text);
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            PERFORM pg_notify('permission_profile_changed', NEW.user_id::text);
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER trigger_product_users_permission_changed
+    AFTER INSERT OR UPDATE OR DELETE ON product_users
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_permission_profile_changed();
+
+CREATE OR REPLACE TRIGGER trigger_product_owners_permission_changed
+    AFTER INSERT OR UPDATE OR DELETE ON product_owners
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_permission_profile_changed();
+
+CREATE OR REPLACE TRIGGER trigger_products_permission_changed
+    AFTER UPDATE OR DELETE OR TRUNCATE ON products
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION notify_permission_profile_changed();
+
+CREATE OR REPLACE TRIGGER trigger_users_permission_changed
+    AFTER UPDATE OR DELETE ON users
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_permission_profile_changed();
+
+
+-- Журнал запусков фоновых задач обслуживания
+CREATE TABLE IF NOT EXISTS maintenance_runs (
+    id SERIAL PRIMARY KEY,
+    job_name VARCHAR(100) NOT NULL,
+    started_at TIMESTAMP NOT NULL,
+    finished_at TIMESTAMP NOT NULL,
+    duration_seconds DOUBLE PRECISION NOT NULL,
+    rows_deleted INTEGER NOT NULL DEFAULT 0,
+    status VARCHAR(20) NOT NULL,
+    error TEXT
+);
+
+-- Индекс для поиска последнего запуска задачи
+CREATE INDEX IF NOT EXISTS idx_maintenance_runs_job_finished ON maintenance_runs(job_name, finished_at DESC);
+
+-- Агрегаты попыток неавторизованного входа по интервалам (minute, hour, day)
+CREATE TABLE IF NOT EXISTS unauthorized_attempt_rollups (
+    id BIGSERIAL PRIMARY KEY,
+    granularity VARCHAR(10) NOT NULL,
+    bucket_start TIMESTAMP NOT NULL,
+    username VARCHAR(255) NOT NULL,
+    ip_address INET,
+    reason TEXT,
+    attempts BIGINT NOT NULL,
+    CONSTRAINT uq_unauthorized_attempt_rollups
+        UNIQUE NULLS NOT DISTINCT (granularity, bucket_start, username, ip_address, reason)
+);
+
+-- Индекс для выборки агрегатов за период
+CREATE INDEX IF NOT EXISTS idx_unauthorized_attempt_rollups_bucket ON unauthorized_attempt_rollups(granularity, bucket_start);
+
+-- Агрегаты сессий по интервалам: количество входов и максимум активных сессий
+CREATE TABLE IF NOT EXISTS user_session_rollups (
+    granularity VARCHAR(10) NOT NULL,
+    bucket_start TIMESTAMP NOT NULL,
+    logins BIGINT NOT NULL DEFAULT 0,
+    peak_active_sessions BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (granularity, bucket_start)
+);
+
+-- Отметки (последний обработанный id) фонового обновления агрегатов
+CREATE TABLE IF NOT EXISTS rollup_watermarks (
+    name VARCHAR(100) PRIMARY KEY,
+    last_id BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP
+);
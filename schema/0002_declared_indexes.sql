@@ -0,0 +1,19 @@
+-- Миграция 2: индексы для поиска прав и активных сессий, триграммные индексы и индекс IP;
+-- удаление индексов, дублирующих UNIQUE (username) и составные индексы с тем же первым столбцом
+
+CREATE INDEX IF NOT EXISTS idx_product_users_user_id ON product_users(user_id);
+CREATE INDEX IF NOT EXISTS idx_product_owners_user_id ON product_owners(user_id);
+CREATE INDEX IF NOT EXISTS idx_user_sessions_session_id_active ON user_sessions(session_id) WHERE is_active;
+CREATE INDEX IF NOT EXISTS idx_user_sessions_username_trgm ON user_sessions USING GIN (username gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_user_sessions_user_agent_trgm ON user_sessions USING GIN (user_agent gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_user_sessions_ip ON user_sessions(ip_address);
+CREATE INDEX IF NOT EXISTS idx_unauthorized_login_attempts_username_trgm ON unauthorized_login_attempts USING GIN (username gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_unauthorized_login_attempts_user_agent_trgm ON unauthorized_login_attempts USING GIN (user_agent gin_trgm_ops);
+
+DROP INDEX IF EXISTS idx_users_username;
+DROP INDEX IF EXISTS idx_user_sessions_username;
+DROP INDEX IF EXISTS idx_user_sessions_session_id;
+DROP INDEX IF EXISTS idx_unauthorized_login_attempts_username;
+
+UPDATE product_users SET role = 'viewer' WHERE role IS NULL;
+ALTER TABLE product_users ALTER COLUMN role SET NOT NULL;
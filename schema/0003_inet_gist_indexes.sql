@@ -0,0 +1,7 @@
+-- Миграция 3: GiST inet_ops обслуживает и равенство, и вхождение в сеть (<<=, >>=, &&) для фильтров по CIDR
+
+CREATE INDEX IF NOT EXISTS idx_user_sessions_ip_gist ON user_sessions USING GIST (ip_address inet_ops);
+CREATE INDEX IF NOT EXISTS idx_unauthorized_login_attempts_ip_gist ON unauthorized_login_attempts USING GIST (ip_address inet_ops);
+
+DROP INDEX IF EXISTS idx_user_sessions_ip;
+DROP INDEX IF EXISTS idx_unauthorized_login_attempts_ip;
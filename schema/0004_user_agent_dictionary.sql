@@ -0,0 +1,64 @@
+-- Миграция 4: словарь User Agent. Строка хранится один раз (ключ - SHA-256 от UTF-8, как
+-- user_agents.user_agent_hash), сессии и попытки входа ссылаются на нее по user_agent_id
+
+CREATE TABLE IF NOT EXISTS user_agents (
+    id SERIAL PRIMARY KEY,
+    hash BYTEA UNIQUE NOT NULL,
+    value TEXT NOT NULL
+);
+
+-- Поиск по подстроке User Agent (ILIKE) выполняется по словарю, а не по большим таблицам
+CREATE INDEX IF NOT EXISTS idx_user_agents_value_trgm ON user_agents USING GIN (value gin_trgm_ops);
+
+ALTER TABLE user_sessions ADD COLUMN IF NOT EXISTS user_agent_id INTEGER REFERENCES user_agents (id);
+ALTER TABLE unauthorized_login_attempts ADD COLUMN IF NOT EXISTS user_agent_id INTEGER REFERENCES user_agents (id);
+
+-- Перенос строк в словарь
+INSERT INTO user_agents (hash, value)
+SELECT sha256(convert_to(user_agent, 'UTF8')), user_agent
+FROM (
+    SELECT user_agent FROM user_sessions WHERE user_agent <> ''
+    UNION
+    SELECT user_agent FROM unauthorized_login_attempts WHERE user_agent <> ''
+) AS distinct_user_agents
+ON CONFLICT (hash) DO NOTHING;
+
+-- Заполнение ссылки - не активность сессии: BEFORE UPDATE триггер trigger_update_last_activity
+-- записал бы в last_activity время миграции (NEW.last_activity совпадает с OLD), поэтому на время
+-- заполнения он отключается. Один блок DO - одна транзакция и при выполнении init.sql через psql;
+-- после заполнения проверяется, что last_activity ни одной сессии не изменилось.
+DO $$
+DECLARE
+    activity_before RECORD;
+    activity_after RECORD;
+BEGIN
+    SELECT COUNT(last_activity) AS activity_count, SUM(EXTRACT(EPOCH FROM last_activity)) AS activity_sum
+    INTO activity_before FROM user_sessions;
+
+    ALTER TABLE user_sessions DISABLE TRIGGER trigger_update_last_activity;
+    UPDATE user_sessions AS t SET user_agent_id = a.id
+    FROM user_agents AS a
+    WHERE a.value = t.user_agent AND t.user_agent_id IS NULL;
+    ALTER TABLE user_sessions ENABLE TRIGGER trigger_update_last_activity;
+
+    SELECT COUNT(last_activity) AS activity_count, SUM(EXTRACT(EPOCH FROM last_activity)) AS activity_sum
+    INTO activity_after FROM user_sessions;
+    IF (activity_before.activity_count, activity_before.activity_sum)
+        IS DISTINCT FROM (activity_after.activity_count, activity_after.activity_sum) THEN
+        RAISE EXCEPTION 'Миграция 4 изменила last_activity сессий';
+    END IF;
+END
+$$;
+
+UPDATE unauthorized_login_attempts AS t SET user_agent_id = a.id
+FROM user_agents AS a
+WHERE a.value = t.user_agent AND t.user_agent_id IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_user_sessions_user_agent_id ON user_sessions(user_agent_id);
+CREATE INDEX IF NOT EXISTS idx_unauthorized_login_attempts_user_agent_id ON unauthorized_login_attempts(user_agent_id);
+
+DROP INDEX IF EXISTS idx_user_sessions_user_agent_trgm;
+DROP INDEX IF EXISTS idx_unauthorized_login_attempts_user_agent_trgm;
+
+ALTER TABLE user_sessions DROP COLUMN IF EXISTS user_agent;
+ALTER TABLE unauthorized_login_attempts DROP COLUMN IF EXISTS user_agent;
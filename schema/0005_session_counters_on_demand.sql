@@ -0,0 +1,11 @@
+-- Миграция 5: триггеры счетчиков сессий работают только в режиме session_stats.mode: counters.
+-- В режиме query (по умолчанию) они лишь удорожают каждую запись в user_sessions, поэтому
+-- отключаются; включает их и пересчитывает счетчики задача обслуживания sync_session_counters.
+-- ALTER TABLE ... ENABLE/DISABLE TRIGGER на секционированной таблице действует и на все ее секции,
+-- в том числе создаваемые позже.
+
+ALTER TABLE user_sessions DISABLE TRIGGER trigger_user_session_counters;
+ALTER TABLE user_sessions DISABLE TRIGGER trigger_user_session_counters_truncate;
+
+-- Без триггеров счетчики устаревают: пустые таблицы не дают прочитать неверные значения
+TRUNCATE user_session_counters, user_session_user_counts;
@@ -0,0 +1,13 @@
+-- Миграция 6: время вставки строки по часам базы для отметки агрегатов (rollups.py).
+-- attempted_at и created_at задает приложение (попытки из буфера записываются позже), поэтому по ним
+-- нельзя понять, какие id уже зафиксированы. inserted_at заполняется clock_timestamp() при вставке -
+-- почти одновременно с выдачей id из последовательности.
+-- Столбец без значения по умолчанию добавляется без перезаписи таблиц; у существующих строк он NULL
+-- (строки вставлены до миграции и считаются давно зафиксированными). SET DEFAULT на секционированной
+-- таблице действует и на ее секции.
+
+ALTER TABLE unauthorized_login_attempts ADD COLUMN IF NOT EXISTS inserted_at TIMESTAMP;
+ALTER TABLE unauthorized_login_attempts ALTER COLUMN inserted_at SET DEFAULT clock_timestamp();
+
+ALTER TABLE user_sessions ADD COLUMN IF NOT EXISTS inserted_at TIMESTAMP;
+ALTER TABLE user_sessions ALTER COLUMN inserted_at SET DEFAULT clock_timestamp();
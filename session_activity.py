@@ -0,0 +1,219 @@
+"""
+Буфер отложенной записи (write-behind) активности сессий и кэш результатов проверки сессий
+"""
+
+import atexit
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class SessionActivityBuffer:
+    """
+    Накопление отметок активности сессий в памяти с периодическим сбросом одной пачкой.
+    Для каждой сессии хранится только последняя отметка.
+    """
+
+    def __init__(self, flush_callback, flush_interval_seconds: float = 5, max_pending: int = 100000):
+        """
+        Args:
+            flush_callback: Функция записи пачки, принимает список (session_id, age_seconds),
+                            где age_seconds - сколько секунд назад была активность
+            flush_interval_seconds: Период сброса буфера
+            max_pending: Количество сессий в буфере, при котором сброс запускается досрочно
+        """
+        self.flush_callback = flush_callback
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_pending = max_pending
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._stats = {
+            'recorded': 0,
+            'flushes': 0,
+            'flushed_sessions': 0,
+            'failed_flushes': 0,
+            'last_batch_size': 0,
+            'last_flush_seconds': 0.0,
+            'max_flush_seconds': 0.0,
+        }
+
+    def record(self, session_id: str):
+        """
+        Запись отметки активности сессии
+
+        Args:
+            session_id: ID сессии
+        """
+        with self._lock:
+            self._pending[session_id] = time.monotonic()
+            self._stats['recorded'] += 1
+            overflow = len(self._pending) >= self.max_pending
+        if overflow:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        """
+        Сброс накопленных отметок в базу данных
+
+        Returns:
+            int: Количество сессий в записанной пачке
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+
+            now = time.monotonic()
+            heartbeats = [(session_id, now - seen_at) for session_id, seen_at in pending.items()]
+
+            started = time.perf_counter()
+            try:
+                self.flush_callback(heartbeats)
+            except Exception as e:
+                logger.warning("Не удалось записать активность %d сессий: %s", len(pending), e)
+                with self._lock:
+                    self._stats['failed_flushes'] += 1
+                    # Возвращаем отметки в буфер, не затирая более свежие
+                    for session_id, seen_at in pending.items():
+                        if self._pending.get(session_id, 0) < seen_at:
+                            self._pending[session_id] = seen_at
+                return 0
+            elapsed = time.perf_counter() - started
+
+            with self._lock:
+                self._stats['flushes'] += 1
+                self._stats['flushed_sessions'] += len(heartbeats)
+                self._stats['last_batch_size'] = len(heartbeats)
+                self._stats['last_flush_seconds'] = elapsed
+                self._stats['max_flush_seconds'] = max(self._stats['max_flush_seconds'], elapsed)
+            return len(heartbeats)
+
+    def start(self):
+        """Запуск фонового потока периодического сброса (однократно)"""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name='session-activity-flusher', daemon=True)
+            self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Остановка фонового потока с финальным сбросом буфера"""
+        self._stop_event.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval_seconds + 5)
+            self._thread = None
+        self.flush()
+
+    def stats(self) -> dict:
+        """
+        Получение статистики буфера
+
+        Returns:
+            dict: Размер буфера, размер последней пачки и длительность сбросов
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pending'] = len(self._pending)
+            stats['flush_interval_seconds'] = self.flush_interval_seconds
+            return stats
+
+    def _run(self):
+        """Цикл периодического сброса буфера"""
+        while not self._stop_event.is_set():
+            self._wakeup.wait(self.flush_interval_seconds)
+            self._wakeup.clear()
+            self.flush()
+
+
+class SessionVerdictCache:
+    """
+    Короткоживущий кэш результатов проверки сессий в процессе приложения.
+    Позволяет не обращаться к базе при частых перезапусках скрипта от виджетов.
+    """
+
+    def __init__(self, ttl_seconds: float = 0.5, max_size: int = 10000):
+        """
+        Args:
+            ttl_seconds: Время жизни результата проверки (0 - кэш отключен)
+            max_size: Максимальное количество сессий в кэше
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, session_id: str):
+        """
+        Получение результата проверки сессии
+
+        Args:
+            session_id: ID сессии
+
+        Returns:
+            bool: Результат проверки или None если его нет в кэше или он устарел
+        """
+        if self.ttl_seconds <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None or entry[1] <= time.monotonic():
+                self._misses += 1
+                return None
+            self._hits += 1
+            return entry[0]
+
+    def put(self, session_id: str, is_valid: bool):
+        """
+        Сохранение результата проверки сессии
+
+        Args:
+            session_id: ID сессии
+            is_valid: Результат проверки
+        """
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[session_id] = (is_valid, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, session_id: str):
+        """
+        Удаление результата проверки сессии из кэша
+
+        Args:
+            session_id: ID сессии
+        """
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def stats(self) -> dict:
+        """
+        Получение статистики кэша
+
+        Returns:
+            dict: Размер кэша и счетчики попаданий/промахов
+        """
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self._hits,
+                'misses': self._misses
+            }
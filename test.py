@@ -1,37 +1,40 @@
 import streamlit as st
 import streamlit_authenticator as stauth
-import yaml
-from yaml.loader import SafeLoader
 from utils import PAGE_PERMISSIONS
 from app_pages.admin import show_admin_page
 from app_pages.user import show_user_page
 from app_pages.velkome_page import show_velkome_page
 from models import (
     authenticate_user, 
+    get_login_lockout,
     get_user_by_username, 
     get_available_pages_for_user,
     create_user_session,
     check_user_active_sessions,
-    check_session_active,
     deactivate_user_session,
-    update_session_activity,
-    cleanup_inactive_sessions
+    validate_and_touch,
+    start_maintenance_scheduler,
+    get_config
 )
 
-# Конфигурация для cookie (остается в config.yaml)
-with open('config.yaml') as file:
-    config = yaml.load(file, Loader=SafeLoader)
+@st.cache_resource
+def get_authenticator():
+    """Создание аутентификатора один раз на процесс (а не при каждом перезапуске скрипта)"""
+    # Конфигурация для cookie (остается в config.yaml)
+    config = get_config()
+    
+    # Передаем минимальную структуру, которую ожидает streamlit_authenticator
+    fake_credentials = {
+        'usernames': {}
+    }
+    return stauth.Authenticate(
+        fake_credentials,
+        config['cookie']['name'],
+        config['cookie']['key'],
+        config['cookie']['expiry_days'],
+    )
 
-# Передаем минимальную структуру, которую ожидает streamlit_authenticator
-fake_credentials = {
-    'usernames': {}
-}
-authenticator = stauth.Authenticate(
-    fake_credentials,
-    config['cookie']['name'],
-    config['cookie']['key'],
-    config['cookie']['expiry_days'],
-)
+authenticator = get_authenticator()
 
 def force_logout():
     """Принудительный выход пользователя из системы"""
@@ -42,16 +45,16 @@ def force_logout():
     st.rerun()
 
 def check_session_validity():
-    """Проверка валидности текущей сессии"""
+    """Проверка валидности текущей сессии с обновлением времени ее активности"""
     if st.session_state.authenticated and st.session_state.session_id:
-        if not check_session_active(st.session_state.session_id):
+        if not validate_and_touch(st.session_state.session_id):
             force_logout()
             return False
     return True
 
 def main():
-    # Периодическая очистка неактивных сессий (выполняется при каждом запуске)
-    cleanup_inactive_sessions()
+    # Очистка неактивных сессий выполняется фоновым планировщиком (запускается один раз на процесс)
+    start_maintenance_scheduler()
     
     # Инициализация session_state в самом начале
     if "ip_address" not in st.session_state:
@@ -67,7 +70,7 @@ def main():
     if 'session_id' not in st.session_state:
         st.session_state.session_id = None
     
-    # Проверяем валидность сессии перед отображением интерфейса
+    # Проверяем валидность сессии и обновляем ее активность одним запросом
     if not check_session_validity():
         return
 
@@ -104,7 +107,11 @@ def main():
                             st.success(f"Добро пожаловать, {username}!")
                             st.rerun()
                         else:
-                            st.error("Неверный логин или пароль")
+                            lockout = get_login_lockout(username=username, ip_address=st.session_state.ip_address)
+                            if lockout:
+                                st.error(f"Слишком много неудачных попыток входа. Повторите через {int(lockout['retry_after']) + 1} с")
+                            else:
+                                st.error("Неверный логин или пароль")
                     else:
                         st.error("Пожалуйста, заполните все поля")
         else:
@@ -126,14 +133,7 @@ def main():
 
     # Основной контент
     if st.session_state.authenticated:
-        # Проверяем валидность сессии перед обновлением активности
-        if not check_session_validity():
-            return  # Если сессия невалидна, функция уже выполнила принудительный выход
-        
-        # Обновляем активность сессии
-        if st.session_state.session_id:
-            update_session_activity(st.session_state.session_id)
-        
+        # Сессия уже проверена и ее активность обновлена в начале перезапуска
         user_info = st.session_state.user_info
         
         with st.sidebar:
@@ -0,0 +1,125 @@
+"""
+Словарь User Agent.
+
+Различных User Agent немного (сотни), а строк сессий и попыток входа - миллионы, поэтому строка
+хранится один раз в таблице user_agents с уникальным ключом по SHA-256 (индекс по хэшу фиксированной
+длины вместо индекса по длинной строке), а таблицы ссылаются на нее по user_agent_id.
+Соответствие строка -> id кэшируется в процессе (LRU ограниченного размера): при попадании запись
+строки не требует обращения к базе, при промахе недостающие строки добавляются одним INSERT
+... ON CONFLICT DO NOTHING и их id читаются одним SELECT.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+
+def user_agent_hash(value: str) -> bytes:
+    """Ключ строки User Agent в таблице user_agents (SHA-256 от UTF-8)"""
+    return hashlib.sha256(value.encode('utf-8')).digest()
+
+
+def upsert_user_agents(connection, model, values) -> dict:
+    """
+    Добавление строк User Agent в словарь и получение их id
+
+    Args:
+        connection: Соединение или сессия SQLAlchemy (фиксация - на стороне вызывающего)
+        model: Модель таблицы user_agents (столбцы id, hash, value)
+        values: Строки User Agent
+
+    Returns:
+        dict: Строка -> id
+    """
+    by_hash = {user_agent_hash(value): value for value in values}
+    if not by_hash:
+        return {}
+    # Одинаковый порядок вставки в параллельных транзакциях исключает взаимную блокировку
+    connection.execute(
+        insert(model)
+        .values([{'hash': key, 'value': value} for key, value in sorted(by_hash.items())])
+        .on_conflict_do_nothing(index_elements=['hash'])
+    )
+    # Отдельный запрос видит и свои строки, и строки, добавленные параллельно другими процессами
+    rows = connection.execute(select(model.id, model.hash).where(model.hash.in_(list(by_hash))))
+    return {by_hash[bytes(key)]: user_agent_id for user_agent_id, key in rows}
+
+
+class UserAgentCache:
+    """
+    LRU соответствия строка User Agent -> id
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        """
+        Args:
+            max_entries: Максимальное количество строк в кэше
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get_many(self, values) -> tuple:
+        """
+        Поиск id строк в кэше
+
+        Args:
+            values: Строки User Agent (пустые и None пропускаются)
+
+        Returns:
+            tuple: (словарь строка -> id найденных, список отсутствующих строк без повторов)
+        """
+        found = {}
+        missing = []
+        with self._lock:
+            for value in values:
+                if not value or value in found:
+                    continue
+                user_agent_id = self._entries.get(value)
+                if user_agent_id is None:
+                    if value not in missing:
+                        missing.append(value)
+                    continue
+                self._entries.move_to_end(value)
+                found[value] = user_agent_id
+            self._hits += len(found)
+            self._misses += len(missing)
+        return found, missing
+
+    def put_many(self, ids: dict):
+        """
+        Сохранение id строк (только после фиксации транзакции, добавившей строки)
+
+        Args:
+            ids: Строка -> id
+        """
+        with self._lock:
+            for value, user_agent_id in ids.items():
+                self._entries[value] = user_agent_id
+                self._entries.move_to_end(value)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Удаление всех строк (после очистки таблицы user_agents)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Получение статистики кэша
+
+        Returns:
+            dict: Размер кэша, попадания и промахи
+        """
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'hits': self._hits,
+                'misses': self._misses,
+            }
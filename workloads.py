@@ -0,0 +1,114 @@
+"""
+Нагрузки (workloads) и выбор пула соединений.
+
+Вход и проверка сессий (auth) не должны ждать соединений, занятых тяжелыми запросами административной
+панели (reporting) и фоновых задач обслуживания (maintenance), поэтому у каждой нагрузки свой пул
+с собственными размерами и statement_timeout, а reporting может читать с реплики.
+Функции models.py объявляют нагрузку декоратором @workload; вложенные вызовы и get_engine() без аргументов
+используют нагрузку ближайшей объявленной функции (contextvars, в том числе внутри задач asyncio).
+"""
+
+import contextvars
+import functools
+import inspect
+from contextlib import contextmanager
+
+# Вход, проверка и продление сессий, запись попыток входа (основная база, короткие запросы)
+WORKLOAD_AUTH = 'auth'
+# Сводки, страницы и выгрузки административной панели (только чтение, можно с реплики)
+WORKLOAD_REPORTING = 'reporting'
+# Очистка, архив, агрегаты, секции и миграции (основная база, фоновые задачи)
+WORKLOAD_MAINTENANCE = 'maintenance'
+
+WORKLOADS = (WORKLOAD_AUTH, WORKLOAD_REPORTING, WORKLOAD_MAINTENANCE)
+
+# Вызовы вне объявленных функций относятся к входу: задержка важнее всего для него
+_current_workload = contextvars.ContextVar('workload', default=WORKLOAD_AUTH)
+
+
+def _check_workload(name: str):
+    if name not in WORKLOADS:
+        raise ValueError(f"Неизвестная нагрузка: {name!r} (допустимые: {', '.join(WORKLOADS)})")
+
+
+def current_workload() -> str:
+    """Нагрузка текущего вызова"""
+    return _current_workload.get()
+
+
+@contextmanager
+def use_workload(name: str):
+    """
+    Выполнение блока в указанной нагрузке
+
+    Args:
+        name: WORKLOAD_AUTH, WORKLOAD_REPORTING или WORKLOAD_MAINTENANCE
+
+    Raises:
+        ValueError: Неизвестная нагрузка
+    """
+    _check_workload(name)
+    token = _current_workload.set(name)
+    try:
+        yield
+    finally:
+        _current_workload.reset(token)
+
+
+def workload(name: str):
+    """
+    Декоратор, объявляющий нагрузку функции (синхронной или async)
+
+    Args:
+        name: WORKLOAD_AUTH, WORKLOAD_REPORTING или WORKLOAD_MAINTENANCE
+
+    Raises:
+        ValueError: Неизвестная нагрузка
+    """
+    _check_workload(name)
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with use_workload(name):
+                    return await func(*args, **kwargs)
+            async_wrapper.workload = name
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with use_workload(name):
+                return func(*args, **kwargs)
+        wrapper.workload = name
+        return wrapper
+
+    return decorator
+
+
+def workload_database_config(db_config: dict, name: str) -> dict:
+    """
+    Настройки базы данных нагрузки: раздел database с переопределениями из database.workloads.<name>
+
+    Args:
+        db_config: Раздел database из config.yaml
+        name: Имя нагрузки
+
+    Returns:
+        dict: Настройки для build_engine (url без переопределения - основная база,
+              параметры pool дополняют общие)
+
+    Raises:
+        ValueError: Неизвестная нагрузка
+    """
+    _check_workload(name)
+    overrides = (db_config.get('workloads') or {}).get(name) or {}
+    config = {key: value for key, value in db_config.items() if key != 'workloads'}
+    for key, value in overrides.items():
+        if value is None:
+            continue
+        if key == 'pool':
+            config['pool'] = {**(config.get('pool') or {}), **value}
+        else:
+            config[key] = value
+    return config